@@ -0,0 +1,111 @@
+import glob
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from log_config import setup_logging
+from posting_ledger import DEFAULT_LEDGER_FILE, PostingLedger, content_hash
+
+logger = logging.getLogger(__name__)
+
+MAX_ACCOUNTS = 100  # ACCOUNT_1_* .. ACCOUNT_100_*
+
+
+class Account:
+    """Credentials of one posting account; user_id is looked up after login if not given"""
+
+    def __init__(self, username, password, user_id=None):
+        self.username = username
+        self.password = password
+        self.user_id = user_id
+
+    @property
+    def ledger_file(self):
+        """Each account's worker keeps its own ledger, so processes never share a file"""
+        stem, ext = os.path.splitext(DEFAULT_LEDGER_FILE)
+        return f"{stem}.{self.username}{ext}"
+
+    def __repr__(self):
+        return f"Account({self.username!r})"
+
+
+def load_accounts():
+    """
+    The credential pool from the environment (and .env): ACCOUNT_<n>_USERNAME,
+    ACCOUNT_<n>_PASSWORD and optional ACCOUNT_<n>_USERID for n = 1, 2, ...
+    Without any, the single USERNAME/PASSWORD/USERID account is used, and an
+    empty list means auth's defaults.
+    """
+    load_dotenv()
+    accounts = []
+    for n in range(1, MAX_ACCOUNTS + 1):
+        username = os.getenv(f'ACCOUNT_{n}_USERNAME')
+        password = os.getenv(f'ACCOUNT_{n}_PASSWORD')
+        if username and password:
+            accounts.append(Account(username, password, os.getenv(f'ACCOUNT_{n}_USERID')))
+    if not accounts and os.getenv('USERNAME') and os.getenv('PASSWORD'):
+        accounts.append(Account(os.getenv('USERNAME'), os.getenv('PASSWORD'), os.getenv('USERID')))
+    return accounts
+
+
+def shard_for(key, accounts):
+    """
+    The account an ad with this key belongs to (rendezvous hashing): the
+    same ad always goes to the same account, and adding or removing an
+    account only moves the ads that account wins or held.
+    """
+    return max(accounts, key=lambda account: hashlib.sha1(f"{account.username}\0{key}".encode('utf-8')).digest())
+
+
+def assign(ads, accounts):
+    """Split ads into {username: [ads]} by content hash"""
+    shards = {account.username: [] for account in accounts}
+    for ad in ads:
+        shards[shard_for(content_hash(ad), accounts).username].append(ad)
+    return shards
+
+
+def posted_anywhere(ads):
+    """
+    Drop ads any account's ledger already has as posted, so an ad that
+    moves to another shard after the pool changes is not posted again
+    """
+    ledger_files = glob.glob(os.path.splitext(DEFAULT_LEDGER_FILE)[0] + '*.json')
+    ledgers = [PostingLedger(path) for path in ledger_files]
+    fresh = [ad for ad in ads if not any(ledger.is_posted(content_hash(ad)) for ledger in ledgers)]
+    if len(fresh) < len(ads):
+        logger.info("⏭️  %s ad(s) already posted by some account, skipping", len(ads) - len(fresh))
+    return fresh
+
+
+def run_sharded(ads, accounts, post_shard, processes=None):
+    """
+    Post ads across accounts: each account's shard runs in its own worker
+    process with its own session, calling post_shard(account, ads,
+    ledger_file) (a module-level function, so it can be pickled). At most
+    one process per account and per CPU. Returns the total ads posted.
+    """
+    shards = assign(posted_anywhere(ads), accounts)
+    jobs = [(account, shards[account.username]) for account in accounts if shards[account.username]]
+    if not jobs:
+        return 0
+    for account, shard in jobs:
+        logger.info("👥 %s: %s ad(s)", account.username, len(shard))
+
+    workers = min(len(jobs), processes or os.cpu_count() or 1)
+    posted = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=setup_logging) as pool:
+        futures = {pool.submit(post_shard, account, shard, account.ledger_file): account for account, shard in jobs}
+        for future in as_completed(futures):
+            account = futures[future]
+            try:
+                count = future.result()
+            except Exception as e:
+                logger.error("❌ Worker for %s failed: %s", account.username, e)
+                continue
+            logger.info("👥 %s posted %s/%s ad(s)", account.username, count, len(shards[account.username]))
+            posted += count
+    return posted
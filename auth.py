@@ -1,15 +1,25 @@
+import logging
 import requests
 import os
 import re
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
+from instrumentation import span
+from log_config import setup_logging
+from debug_capture import capture
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 LOGIN_POST_URL = 'https://november2024version01.dicewebfreelancers.com/index.php/login?task=user.login'
 
 LOGIN_URL = 'https://november2024version01.dicewebfreelancers.com/index.php/login?task=user.login'
 
+POST_AD_URL = 'https://november2024version01.dicewebfreelancers.com/index.php/post-free-ad/user/add'
+
+USER_ID_PATTERN = re.compile(r'name="userid" value="(\d+)"')
+
 
 
 def extract_csrf_token(html_content):
@@ -37,7 +47,25 @@ def extract_csrf_token(html_content):
     
     return None
 
-def main():
+def extract_user_id(html_content):
+    """
+    The logged-in account's user ID from the post-ad form's hidden userid
+    input, or None
+    """
+    match = USER_ID_PATTERN.search(html_content or '')
+    return match.group(1) if match else None
+
+def fetch_user_id(session):
+    """Look up the user ID of the account session is logged in as"""
+    with span('fetch', page='post_ad'):
+        response = session.get(POST_AD_URL, timeout=30)
+    return extract_user_id(response.text)
+
+def main(username=None, password=None):
+    """
+    Log in and return (session, csrf_token), or (None, None) on failure.
+    Credentials default to USERNAME/PASSWORD from the environment (.env).
+    """
     # Create a session to maintain cookies and session state
     session = requests.Session()
     
@@ -53,76 +81,77 @@ def main():
     })
     
     # First request: GET the login page to get CSRF token and establish session
-    print("Making GET request to login page...")
-    response = session.get(LOGIN_URL)
+    logger.info("Making GET request to login page...")
+    with span('fetch', page='login'):
+        response = session.get(LOGIN_URL)
     
     if response.status_code != 200:
-        print(f"Failed to get login page. Status code: {response.status_code}")
+        logger.error("Failed to get login page. Status code: %s", response.status_code)
         return None, None
     
-    print(f"GET request successful. Status code: {response.status_code}")
-    print(f"Cookies received: {dict(session.cookies)}")
+    logger.info("GET request successful. Status code: %s", response.status_code)
+    logger.debug("Cookies received: %s", dict(session.cookies))
     
     html_content = response.text
     csrf_token = extract_csrf_token(html_content)
     
     if not csrf_token:
-        print("CSRF Token not found")
+        logger.error("CSRF Token not found")
         return None, None
     
-    print(f"CSRF Token extracted: {csrf_token}")
+    logger.debug("CSRF Token extracted: %s", csrf_token)
 
     # Prepare login payload
     payload = {
-        'username': 'rajat',  # Hardcoded for testing
-        'password': '@Rajatraikar0038',  # Hardcoded for testing
+        'username': username or os.getenv('USERNAME', 'rajat'),
+        'password': password or os.getenv('PASSWORD', '@Rajatraikar0038'),
         'return': 'aHR0cHM6Ly9ub3ZlbWJlcjIwMjR2ZXJzaW9uMDEuZGljZXdlYmZyZWVsYW5jZXJzLmNvbS9pbmRleC5waHAvcG9zdC1mcmVlLWFkL3VzZXIvYWRk',
         csrf_token: 1,
     }
     
-    print(f"Login payload: {payload}")
+    logger.debug("Logging in as: %s", payload['username'])
     
     # Second request: POST login credentials using the same session
-    print("Making POST request to login...")
-    response = session.post(LOGIN_POST_URL, data=payload)
-    
-    print(f"POST request completed. Status code: {response.status_code}")
-    print(f"Final cookies: {dict(session.cookies)}")
-    print(f"Response URL: {response.url}")
+    logger.info("Making POST request to login...")
+    with span('login'):
+        response = session.post(LOGIN_POST_URL, data=payload)
     
-    # Save the response
-    with open('response.html', 'w', encoding='utf-8') as f:
-        f.write(response.text)
+    logger.info("POST request completed. Status code: %s", response.status_code)
+    logger.debug("Final cookies: %s", dict(session.cookies))
+    logger.info("Response URL: %s", response.url)
     
-    print("Response saved to response.html")
+    # Keep the login response if debug capture is enabled
+    capture('login_response', response.text, failed="post-free-ad" not in response.url.lower(),
+            url=response.url, status=response.status_code)
     
     # Check if login was successful
     if "post-free-ad" in response.url.lower():
-        print("Login appears to have succeeded - redirected to post-ad page")
+        logger.info("Login appears to have succeeded - redirected to post-ad page")
         
         # Verify we can access the post-ad page
-        print("Verifying access to post-ad page...")
-        post_ad_url = 'https://november2024version01.dicewebfreelancers.com/index.php/post-free-ad/user/add'
-        verify_response = session.get(post_ad_url)
+        logger.info("Verifying access to post-ad page...")
+        with span('verify', page='post_ad'):
+            verify_response = session.get(POST_AD_URL)
         
         if verify_response.status_code == 200:
             # Check if we can see the ad posting form and user is logged in
             if "jomclForm" in verify_response.text and "logout" in verify_response.text.lower():
-                print("Successfully accessed post-ad page - user is logged in")
+                logger.info("Successfully accessed post-ad page - user is logged in")
             else:
-                print("Access denied to post-ad page - login may have failed")
+                logger.error("Access denied to post-ad page - login may have failed")
                 return None, None
         else:
-            print(f"Failed to access post-ad page: {verify_response.status_code}")
+            logger.warning("Failed to access post-ad page: %s", verify_response.status_code)
     elif "login" in response.url.lower():
-        print("Login appears to have failed - still on login page")
+        logger.error("Login appears to have failed - still on login page")
         return None, None
     else:
-        print("Login status unclear - check response")
+        logger.warning("Login status unclear - check response")
     
     return session, csrf_token
 
 if __name__ == "__main__":
+    setup_logging()
     main()
 
 
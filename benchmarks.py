@@ -0,0 +1,401 @@
+"""
+Offline micro-benchmarks for the parsing hot paths, run against the HTML
+pages saved in the repository.
+
+    python benchmarks.py                  # run, compare with the baseline
+    python benchmarks.py --save           # run and record a new baseline
+    python benchmarks.py -k trademe       # only benchmarks matching 'trademe'
+    python benchmarks.py -k import        # only the import-time budgets
+
+Each benchmark is a setup function registered with @benchmark: it loads
+its fixtures and returns the zero-argument callable that is timed, so only
+the parsing itself is measured. A benchmark whose median is more than
+--threshold slower than the baseline is flagged and makes the run fail.
+
+Cold-start cost is checked too: each entry module is imported in a fresh
+interpreter under -X importtime, and the run fails if it takes longer than
+its budget or loads a module it should only load on demand.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Learned selectors must not leak into (or come from) the real template cache
+os.environ.setdefault('SCRAPER_TEMPLATE_CACHE', os.path.join(tempfile.gettempdir(), 'benchmark_template_cache.json'))
+
+from bs4 import BeautifulSoup
+
+from log_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE_FILE = os.path.join(ROOT, 'benchmarks_baseline.json')
+DEFAULT_THRESHOLD = 0.20   # 20% slower than the baseline median is a regression
+DEFAULT_MIN_TIME = 1.0     # seconds spent timing each benchmark
+MIN_ROUNDS = 5
+MAX_ROUNDS = 1000
+
+TRADEME_URL = 'https://www.trademe.co.nz/a/motors/cars/ford/puma/listing/5488658414'
+BIKROY_URL = 'https://bikroy.com/en/ad/toyota-premio-f-2005-for-sale-dhaka-2175'
+
+BENCHMARKS = {}
+
+# Entry module -> (cumulative import budget in ms, modules it must not load).
+# Short-lived workers pay the import time on every start, so the browser,
+# login and image stacks are only imported by the code paths that use them.
+IMPORT_BUDGETS = {
+    'cli': (100, ('requests', 'bs4', 'selenium', 'auth', 'main')),
+    'extract': (300, ('selenium', 'webdriver_manager', 'auth', 'PIL')),
+    'extract_trademe': (350, ('selenium', 'webdriver_manager', 'browser')),
+    'main': (300, ('selenium', 'auth', 'accounts', 'dotenv', 'PIL')),
+}
+IMPORT_ROUNDS = 5
+IMPORTTIME_LINE = re.compile(r'^import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*(\S+)\s*$')
+
+
+def benchmark(name):
+    """Register a setup function returning the callable to time"""
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+def fixture(filename, binary=False):
+    """Contents of a page saved in the repository"""
+    with open(os.path.join(ROOT, filename), 'rb' if binary else 'r', **({} if binary else {'encoding': 'utf-8'})) as f:
+        return f.read()
+
+
+# ----------------------------------------------------------------------
+# Offline stand-ins for the network and the browser
+# ----------------------------------------------------------------------
+
+class FixtureResponse:
+    """The parts of requests.Response the extractors use"""
+
+    def __init__(self, url, content, content_type='text/html; charset=utf-8'):
+        self.url = url
+        self.content = content
+        self.status_code = 200
+        self.headers = {'content-type': content_type}
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def raise_for_status(self):
+        pass
+
+
+class FixtureSession:
+    """Answers every GET with the same saved page"""
+
+    def __init__(self, content):
+        self.content = content
+        self.headers = {}
+
+    def get(self, url, **kwargs):
+        return FixtureResponse(url, self.content)
+
+
+class _FixtureElement:
+    def __init__(self, elem):
+        self._elem = elem
+
+    @property
+    def text(self):
+        return self._elem.get_text(' ', strip=True)
+
+    def get_attribute(self, name):
+        return self._elem.get(name)
+
+
+class FixtureDriver:
+    """
+    A 'browser' that has already rendered a saved page: the DOM queries
+    the scraper makes are answered from the parsed page, so what is timed
+    is the scraper's own work rather than WebDriver round trips.
+    """
+
+    def __init__(self, html):
+        self.page_source = html
+        self._soup = BeautifulSoup(html, 'html.parser')
+
+    def _select(self, by, value):
+        if by == 'css selector':
+            return self._soup.select(value)
+        return self._soup.find_all(value)
+
+    def find_element(self, by, value):
+        found = self._select(by, value)
+        if not found:
+            raise LookupError(f"No element matches {value!r}")
+        return _FixtureElement(found[0])
+
+    def find_elements(self, by, value):
+        return [_FixtureElement(elem) for elem in self._select(by, value)]
+
+
+def bikroy_page():
+    """
+    A Bikroy ad page: none is saved in the repository, so the ad from
+    ad_details.json is embedded as window.initialData (with the same ad
+    repeated as related ads, for a realistically sized blob) in the saved
+    classifieds page
+    """
+    from site_adapters import BIKROY
+
+    details = json.loads(fixture('ad_details.json'))
+    ad = {
+        'title': details['title'],
+        'adDate': details['posted_on'],
+        'money': {'amount': details['price'].replace('Tk', '').replace(',', '').strip()},
+        'shop': {'name': details['seller_name']},
+        'contactCard': {'phoneNumbers': details['contact']},
+        'location': {'name': 'Dhaka'},
+        'images': {'meta': [{'src': img['src'].rsplit('/620/', 1)[0], 'alt': img.get('alt', '')}
+                            for img in details['images']]},
+        'properties': [{'label': label, 'value': details.get(field)} for label, field in BIKROY.field_map.items()],
+        'description': details['description'],
+    }
+    initial_data = {'adDetail': {'data': {'ad': ad, 'relatedAds': [ad] * 30}}}
+    script = f"<script>window.initialData = {json.dumps(initial_data)}</script>"
+    return fixture('response.html').replace('</body>', script + '</body>')
+
+
+# ----------------------------------------------------------------------
+# Benchmarks
+# ----------------------------------------------------------------------
+
+def _csrf_benchmark(filename):
+    from auth import extract_csrf_token
+
+    html = fixture(filename)
+    return lambda: extract_csrf_token(html)
+
+
+@benchmark('auth.extract_csrf_token[post_ad_page]')
+def bench_csrf_post_ad_page():
+    return _csrf_benchmark('response.html')
+
+
+@benchmark('auth.extract_csrf_token[my_ads]')
+def bench_csrf_my_ads():
+    return _csrf_benchmark('post_ad_response.html')
+
+
+@benchmark('auth.extract_csrf_token[login_page]')
+def bench_csrf_login_page():
+    return _csrf_benchmark('submission_result_improved.html')
+
+
+@benchmark('bikroy.initial_data')
+def bench_bikroy_initial_data():
+    from site_adapters import BIKROY, extract_embedded_json
+
+    html = bikroy_page()
+
+    def run():
+        data = extract_embedded_json(html, BIKROY.embedded_marker)
+        return BIKROY.map(BIKROY.select_data(data), BIKROY_URL)
+    return run
+
+
+def _trademe_benchmark(filename, method):
+    from extract_trademe import TradeMeScraper
+
+    scraper = TradeMeScraper(session=FixtureSession(fixture(filename, binary=True)))
+    extract = getattr(scraper, method)
+    return lambda: extract(TRADEME_URL)
+
+
+# The raw page is the app shell a plain GET receives; the rendered page
+# exercises the full selector cascades
+
+@benchmark('trademe.extract_car_listing[raw]')
+def bench_trademe_listing_raw():
+    return _trademe_benchmark('trademe_raw_page.html', 'extract_car_listing')
+
+
+@benchmark('trademe.extract_car_listing[rendered]')
+def bench_trademe_listing_rendered():
+    return _trademe_benchmark('trademe_selenium_rendered.html', 'extract_car_listing')
+
+
+@benchmark('trademe.extract_car_listing_form_fields[raw]')
+def bench_trademe_form_fields_raw():
+    return _trademe_benchmark('trademe_raw_page.html', 'extract_car_listing_form_fields')
+
+
+@benchmark('trademe.extract_car_listing_form_fields[rendered]')
+def bench_trademe_form_fields_rendered():
+    return _trademe_benchmark('trademe_selenium_rendered.html', 'extract_car_listing_form_fields')
+
+
+@benchmark('trademe.scrape_rendered_page')
+def bench_trademe_rendered():
+    from extract_trademe import TradeMeScraper
+
+    scraper = TradeMeScraper(session=FixtureSession(b''))
+    driver = FixtureDriver(fixture('trademe_selenium_rendered.html'))
+    return lambda: scraper.scrape_rendered_page(driver, TRADEME_URL)
+
+
+# ----------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------
+
+def measure(func, min_time=DEFAULT_MIN_TIME):
+    """Time func repeatedly (after one warm-up call) and summarise the rounds"""
+    func()
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < MAX_ROUNDS and (len(timings) < MIN_ROUNDS or time.perf_counter() - started < min_time):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'rounds': len(timings),
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+        'stddev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+def run_benchmarks(selected=None, min_time=DEFAULT_MIN_TIME):
+    """Run the registered benchmarks whose name contains selected; returns {name: stats}"""
+    results = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # deprecated selectors in the scrapers' fallback lists
+        for name, setup in BENCHMARKS.items():
+            if selected and selected not in name:
+                continue
+            results[name] = measure(setup(), min_time)
+    return results
+
+
+def measure_import(module):
+    """(cumulative import time in seconds, top-level packages loaded) in a fresh interpreter"""
+    code = f"import {module}, sys; print(' '.join(sorted({{name.split('.')[0] for name in sys.modules}})))"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    cumulative = 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and match.group(2) == module:
+            cumulative = int(match.group(1))
+    return cumulative / 1e6, set(result.stdout.split())
+
+
+def check_imports(selected=None):
+    """Return (module, median seconds, budget seconds, forbidden modules loaded) rows"""
+    rows = []
+    for module, (budget_ms, forbidden) in IMPORT_BUDGETS.items():
+        if selected and selected not in f"import:{module}":
+            continue
+        timings = []
+        for _ in range(IMPORT_ROUNDS):
+            seconds, loaded = measure_import(module)
+            timings.append(seconds)
+        rows.append((module, statistics.median(timings), budget_ms / 1000, sorted(loaded & set(forbidden))))
+    return rows
+
+
+def report_imports(rows):
+    width = max((len(module) for module, *_ in rows), default=10) + len('import:')
+    print(f"\n{'import':<{width}}  {'median':>10}  {'budget':>10}")
+    for module, seconds, budget, leaked in rows:
+        problems = []
+        if seconds > budget:
+            problems.append('❌ OVER BUDGET')
+        if leaked:
+            problems.append(f"❌ LOADS {', '.join(leaked)}")
+        print(f"{'import:' + module:<{width}}  {seconds * 1000:>8.1f}ms  {budget * 1000:>8.0f}ms  {'  '.join(problems)}")
+
+
+def load_baseline(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('benchmarks', {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_baseline(path, results):
+    """Write results atomically as the new baseline (benchmarks not run keep their old entry)"""
+    baseline = {
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'benchmarks': {**load_baseline(path), **results},
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Return (name, stats, change vs baseline median or None, regressed) rows"""
+    rows = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        change = stats['median'] / base['median'] - 1 if base and base.get('median') else None
+        rows.append((name, stats, change, change is not None and change > threshold))
+    return rows
+
+
+def report(rows):
+    width = max((len(name) for name, *_ in rows), default=10)
+    print(f"{'benchmark':<{width}}  {'median':>10}  {'min':>10}  {'rounds':>6}  vs baseline")
+    for name, stats, change, regressed in rows:
+        versus = '-' if change is None else f"{change:+.1%}" + ('  ❌ REGRESSION' if regressed else '')
+        print(f"{name:<{width}}  {stats['median'] * 1000:>8.3f}ms  {stats['min'] * 1000:>8.3f}ms  "
+              f"{stats['rounds']:>6}  {versus}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the parsing hot paths")
+    parser.add_argument('-k', dest='selected', help="only run benchmarks whose name contains this")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_FILE, help="baseline JSON file")
+    parser.add_argument('--save', action='store_true', help="record the results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown vs baseline median that counts as a regression (0.2 = 20%%)")
+    parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME, help="seconds to time each benchmark")
+    args = parser.parse_args(argv)
+
+    # The extractors log every page; only the parsing should be measured
+    setup_logging(level='ERROR')
+
+    results = run_benchmarks(args.selected, args.min_time)
+    rows = compare(results, load_baseline(args.baseline), args.threshold)
+    if rows:
+        report(rows)
+    import_rows = check_imports(args.selected)
+    if import_rows:
+        report_imports(import_rows)
+    import_failed = any(seconds > budget or leaked for _, seconds, budget, leaked in import_rows)
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"💾 Baseline saved to {args.baseline}")
+        return 1 if import_failed else 0
+    return 1 if import_failed or any(regressed for *_, regressed in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
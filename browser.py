@@ -0,0 +1,300 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+from resource_governor import governor
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+DRIVER_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'scraper_car', 'chromedriver.json')
+DRIVER_CHECK_INTERVAL = 7 * 24 * 3600  # re-check for a newer chromedriver weekly
+DRIVER_RETRY_INTERVAL = 6 * 3600  # wait after a failed check (e.g. offline) before trying again
+POOL_MAX_USES = 50  # pages a pooled browser serves before it is restarted (Chrome grows)
+
+# URL patterns (Network.setBlockedURLs wildcard syntax) for assets we never
+# need: we only read the DOM or fill in a form.
+BLOCKED_IMAGES = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.avif']
+BLOCKED_FONTS = ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot']
+BLOCKED_STYLESHEETS = ['*.css']
+BLOCKED_TRACKERS = [
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*googlesyndication.com*',
+    '*doubleclick.net*',
+    '*adservice.google.*',
+    '*facebook.net*',
+    '*connect.facebook.com*',
+    '*hotjar.com*',
+    '*newrelic.com*',
+    '*nr-data.net*',
+    '*segment.io*',
+    '*cdn.segment.com*',
+    '*scorecardresearch.com*',
+    '*quantserve.com*',
+    '*optimizely.com*',
+    '*clarity.ms*',
+]
+
+
+def headless_default():
+    """Headless unless SCRAPER_HEADLESS is set to 0/false (e.g. to watch a run)"""
+    return os.getenv('SCRAPER_HEADLESS', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+def build_chrome_options(headless=None, block_images=True):
+    """
+    Chrome options for a lean, DOM-only session: headless by default, no
+    extensions, no image decoding and no background networking.
+    """
+    if headless is None:
+        headless = headless_default()
+
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument('--headless=new')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--disable-extensions')
+    chrome_options.add_argument('--disable-background-networking')
+    chrome_options.add_argument('--disable-component-update')
+    chrome_options.add_argument('--disable-default-apps')
+    chrome_options.add_argument('--disable-sync')
+    chrome_options.add_argument('--metrics-recording-only')
+    chrome_options.add_argument('--no-first-run')
+    chrome_options.add_argument('--mute-audio')
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_argument(f'--user-agent={USER_AGENT}')
+    if block_images:
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        chrome_options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+        })
+    return chrome_options
+
+
+def blocked_url_patterns(images=True, fonts=True, stylesheets=True, trackers=True):
+    """Build the list of URL patterns to block for a session"""
+    patterns = []
+    if images:
+        patterns += BLOCKED_IMAGES
+    if fonts:
+        patterns += BLOCKED_FONTS
+    if stylesheets:
+        patterns += BLOCKED_STYLESHEETS
+    if trackers:
+        patterns += BLOCKED_TRACKERS
+    return patterns
+
+
+def enable_request_blocking(driver, patterns):
+    """
+    Block requests matching patterns through CDP network interception.
+    Returns False (and leaves the session untouched) if the driver does not
+    speak CDP.
+    """
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        logger.debug("Blocking %s URL patterns", len(patterns))
+        return True
+    except Exception as e:
+        logger.warning("Could not enable request blocking: %s", e)
+        return False
+
+
+def _read_driver_cache():
+    try:
+        with open(DRIVER_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_driver_cache(entry):
+    os.makedirs(os.path.dirname(DRIVER_CACHE_FILE), exist_ok=True)
+    tmp_path = DRIVER_CACHE_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, DRIVER_CACHE_FILE)
+
+
+def resolve_chromedriver(force_check=False):
+    """
+    Return the path of a chromedriver binary without touching the network
+    when possible.
+
+    SCRAPER_CHROMEDRIVER pins an explicit binary. Otherwise the path
+    resolved by webdriver-manager is cached locally and reused until the
+    weekly check is due (or force_check is set, e.g. after Chrome was
+    upgraded). If the check fails because we are offline, the failure is
+    recorded too and the cached binary (or Selenium Manager) is used
+    without re-checking for a few hours.
+    """
+    pinned = os.getenv('SCRAPER_CHROMEDRIVER')
+    if pinned:
+        return pinned
+
+    cached = _read_driver_cache()
+    cached_path = cached.get('path')
+    if cached_path and not os.path.exists(cached_path):
+        cached_path = None
+    due = time.time() - cached.get('checked_at', 0) > DRIVER_CHECK_INTERVAL
+    if cached_path and not due and not force_check:
+        return cached_path
+    if not force_check and time.time() - cached.get('failed_at', 0) < DRIVER_RETRY_INTERVAL:
+        return cached_path
+
+    try:
+        # Imported here: it is only needed when we actually hit the network
+        from webdriver_manager.chrome import ChromeDriverManager
+        path = ChromeDriverManager().install()
+    except Exception as e:
+        try:
+            _write_driver_cache({**cached, 'failed_at': time.time()})
+        except OSError:
+            pass
+        if cached_path:
+            logger.warning("chromedriver version check failed (%s), using cached %s", e, cached_path)
+            return cached_path
+        logger.warning("Could not resolve chromedriver (%s), falling back to Selenium Manager", e)
+        return None
+
+    _write_driver_cache({'path': path, 'checked_at': time.time()})
+    if path != cached_path:
+        logger.info("Using chromedriver %s", path)
+    return path
+
+
+def create_chrome_driver(chrome_options):
+    """
+    Start Chrome with the cached chromedriver. If the cached driver no
+    longer matches the installed Chrome, re-resolve once and retry.
+    Counts against the run's browser budget until quit_driver() is called.
+    """
+    governor.acquire_browser()
+    try:
+        driver = _start_chrome(chrome_options)
+    except Exception:
+        governor.release_slot()
+        raise
+    governor.track_browser(driver)
+    return driver
+
+
+def _start_chrome(chrome_options):
+    path = resolve_chromedriver()
+    service = Service(path) if path else Service()
+    try:
+        return webdriver.Chrome(service=service, options=chrome_options)
+    except SessionNotCreatedException as e:
+        if not path or os.getenv('SCRAPER_CHROMEDRIVER'):
+            raise
+        logger.warning("Cached chromedriver rejected by Chrome (%s), re-resolving", str(e).splitlines()[0])
+        path = resolve_chromedriver(force_check=True)
+        return webdriver.Chrome(service=Service(path) if path else Service(), options=chrome_options)
+
+
+def quit_driver(driver):
+    """Quit a driver from create_chrome_driver() and give back its browser slot"""
+    governor.release_browser(driver)
+
+
+def create_lean_driver(capture_network=False):
+    """
+    A headless driver for reading pages: DOM only, with images, CSS, fonts
+    and trackers blocked. capture_network turns on performance logging so
+    network responses can be read back through CDP.
+    """
+    chrome_options = build_chrome_options()
+    if capture_network:
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    driver = create_chrome_driver(chrome_options)
+    enable_request_blocking(driver, blocked_url_patterns())
+    return driver
+
+
+class DriverPool:
+    """
+    Keeps started browsers warm between pages for long-running processes,
+    so a page costs a navigation instead of a Chrome start. Drivers are
+    created on demand (still within the governor's browser budget), up to
+    size are kept idle, and one is restarted after POOL_MAX_USES pages or
+    as soon as a borrower fails with it.
+    """
+
+    def __init__(self, size=2, factory=None, max_uses=POOL_MAX_USES):
+        self.size = size
+        self.factory = factory or (lambda: create_lean_driver(capture_network=True))
+        self.max_uses = max_uses
+        self._idle = []
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _reset(self, driver):
+        """Leave the driver blank, with no performance log from the last page"""
+        driver.get('about:blank')
+        try:
+            driver.get_log('performance')
+        except Exception:
+            pass
+
+    @contextmanager
+    def driver(self):
+        with self._lock:
+            driver = self._idle.pop() if self._idle else None
+        if driver is None:
+            driver = self.factory()
+            self._uses[id(driver)] = 0
+        keep = False  # a borrower that failed may have left the browser unusable
+        try:
+            yield driver
+            self._uses[id(driver)] += 1
+            if self._uses[id(driver)] < self.max_uses:
+                try:
+                    self._reset(driver)
+                    keep = True
+                except Exception as e:
+                    # The borrower's page is already done; just retire this browser
+                    logger.warning("Pooled browser could not be reset, restarting it: %s", e)
+        finally:
+            with self._lock:
+                keep = keep and not self._closed and len(self._idle) < self.size
+                if keep:
+                    self._idle.append(driver)
+            if not keep:
+                self._uses.pop(id(driver), None)
+                quit_driver(driver)
+
+    def close(self):
+        """Quit the idle browsers; drivers still borrowed are quit when returned"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._uses.pop(id(driver), None)
+            quit_driver(driver)
+
+
+_driver_pool = None
+
+
+def use_driver_pool(pool):
+    """Make scrapers in this process borrow browsers from pool (None: start their own)"""
+    global _driver_pool
+    _driver_pool = pool
+
+
+def driver_pool():
+    return _driver_pool
@@ -0,0 +1,225 @@
+import difflib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+import requests
+
+from instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+SITE_URL = 'https://november2024version01.dicewebfreelancers.com/'
+POST_AD_PAGE_URL = SITE_URL + 'index.php/post-free-ad'
+# The endpoints jomClassifieds.js calls when a category is picked
+AJAX_URL = SITE_URL + 'index.php?option=com_jomclassifieds&format=raw'
+
+DEFAULT_SCHEMA_FILE = 'category_schema.json'
+DEFAULT_TTL = 24 * 3600  # categories and extra fields rarely change
+
+ROOT = 'root'
+
+# Where car ads go, by category name, and the IDs recorded for it in the HAR file
+CATEGORY_PATH = ('Vehicles', 'Cars - Parts', 'Second hand cars in Bangladesh!')
+DEFAULT_CATEGORY_IDS = ('6', '8', '31')
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def normalize(text):
+    """Lower-case, punctuation-insensitive key for names and labels"""
+    return _NON_ALNUM.sub(' ', (text or '').lower()).strip()
+
+
+class CategorySchema:
+    """
+    Cached category tree and per-category extra-field definitions of the
+    classifieds site.
+
+    The data comes from the same AJAX endpoints the post-ad page uses
+    (task=listCategory / task=listExtraFields). Each category's children and
+    extra fields are fetched once, the first time they are needed, and kept
+    in a JSON file until the TTL expires. Resolving a category path or an
+    extra-field label to its ID is then an in-memory lookup.
+    """
+
+    def __init__(self, session=None, schema_file=DEFAULT_SCHEMA_FILE, ttl=DEFAULT_TTL):
+        self.session = session or requests.Session()
+        self.schema_file = schema_file
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._schema = self._read()
+        self._children_index = {}
+        self._field_index = {}
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _empty(self):
+        return {'fetched_at': time.time(), 'categories': {}, 'extra_fields': {}}
+
+    def _read(self):
+        try:
+            with open(self.schema_file, 'r', encoding='utf-8') as f:
+                schema = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return self._empty()
+        if time.time() - schema.get('fetched_at', 0) > self.ttl:
+            logger.info("📂 Category schema is older than its TTL, refreshing on use")
+            return self._empty()
+        return schema
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.schema_file))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self._schema, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.schema_file)
+
+    def invalidate(self):
+        """Drop everything cached, e.g. after the site rejected an ID"""
+        with self._lock:
+            self._schema = self._empty()
+            self._children_index.clear()
+            self._field_index.clear()
+            self._save()
+
+    # ------------------------------------------------------------------
+    # Fetching
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _parse_category_options(html):
+        """[{'id', 'name'}] for the options of the category select in html"""
+        # Only parsed on a cache miss, so cached runs never load bs4
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, 'html.parser')
+        select = soup.find('select', attrs={'name': 'category[]'}) or soup.find('select')
+        if not select:
+            return []
+        return [{'id': option['value'], 'name': option.get_text(strip=True)}
+                for option in select.find_all('option')
+                if option.get('value') and option['value'].lstrip('-').isdigit() and int(option['value']) > 0]
+
+    @staticmethod
+    def _parse_extra_fields(html):
+        """[{'name', 'label', 'type', 'options'}] for the exf_* inputs in html"""
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, 'html.parser')
+        fields = []
+        for elem in soup.find_all(attrs={'name': re.compile(r'^exf_\d+')}):
+            group = elem.find_parent(class_='control-group') or elem.parent
+            label = group.find('label') if group else None
+            fields.append({
+                'name': elem['name'].rstrip('[]'),
+                'label': label.get_text(' ', strip=True).rstrip('* ') if label else '',
+                'type': elem.get('type', elem.name),
+                'options': {option.get_text(strip=True): option.get('value', '')
+                            for option in elem.find_all('option')},
+            })
+        return fields
+
+    def _fetch_children(self, parent):
+        if parent == ROOT:
+            with span('schema_fetch', kind='categories'):
+                response = self.session.get(POST_AD_PAGE_URL, timeout=30)
+                response.raise_for_status()
+            return self._parse_category_options(response.text)
+
+        params = {'task': 'listCategory', 'id': parent, 'selected': -1, 'uid': 1, 'exfields': 0}
+        with span('schema_fetch', kind='categories'):
+            response = self.session.get(AJAX_URL, params=params, timeout=30)
+            response.raise_for_status()
+        return self._parse_category_options(response.text)
+
+    def _fetch_extra_fields(self, category_id):
+        params = {'task': 'listExtraFields', 'id': category_id, 'uid': 0}
+        with span('schema_fetch', kind='extra_fields'):
+            response = self.session.get(AJAX_URL, params=params, timeout=30)
+            response.raise_for_status()
+        try:
+            html = response.json().get('fields', '')
+        except ValueError:
+            html = response.text
+        return self._parse_extra_fields(html)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def children(self, parent=ROOT):
+        """Subcategories of parent ('root' for the top level)"""
+        parent = str(parent)
+        with self._lock:
+            categories = self._schema['categories']
+            if parent not in categories:
+                categories[parent] = self._fetch_children(parent)
+                logger.info("📂 Cached %s subcategories of %s", len(categories[parent]), parent)
+                self._save()
+            return categories[parent]
+
+    def extra_fields(self, category_id):
+        """Extra-field definitions shown for a (leaf) category"""
+        category_id = str(category_id)
+        with self._lock:
+            extra_fields = self._schema['extra_fields']
+            if category_id not in extra_fields:
+                extra_fields[category_id] = self._fetch_extra_fields(category_id)
+                logger.info("📂 Cached %s extra fields of category %s", len(extra_fields[category_id]), category_id)
+                self._save()
+            return extra_fields[category_id]
+
+    @staticmethod
+    def _best_match(index, name):
+        key = normalize(name)
+        if not key:
+            return None
+        if key in index:
+            return index[key]
+        for candidate, value in index.items():
+            if key in candidate or candidate in key:
+                return value
+        close = difflib.get_close_matches(key, list(index), n=1, cutoff=0.8)
+        return index[close[0]] if close else None
+
+    def category_id(self, name, parent=ROOT):
+        """ID of the subcategory of parent called name, or None"""
+        parent = str(parent)
+        with self._lock:
+            index = self._children_index.get(parent)
+            if index is None:
+                index = {normalize(c['name']): c['id'] for c in self.children(parent)}
+                self._children_index[parent] = index
+        return self._best_match(index, name)
+
+    def resolve_category_path(self, names):
+        """
+        Category IDs for a path of names from the top level down, e.g.
+        ('Vehicles', 'Cars - Parts', ...) -> ['6', '8', ...]
+        """
+        ids = []
+        parent = ROOT
+        for name in names:
+            category_id = self.category_id(name, parent)
+            if category_id is None:
+                raise KeyError(f"No category {name!r} under {parent}")
+            ids.append(category_id)
+            parent = category_id
+        return ids
+
+    def field_name(self, category_id, label):
+        """Form name (exf_N) of the extra field labelled label, or None"""
+        category_id = str(category_id)
+        with self._lock:
+            index = self._field_index.get(category_id)
+            if index is None:
+                index = {normalize(f['label']): f['name'] for f in self.extra_fields(category_id) if f['label']}
+                self._field_index[category_id] = index
+        return self._best_match(index, label)
@@ -0,0 +1,315 @@
+"""
+One entry point for extraction, discovery and posting.
+
+    python cli.py extract URL [URL ...] -o cars.jsonl
+    python cli.py extract urls.txt --workers 8 --min-delay 0.5 --max-delay 1
+    cat urls.txt | python cli.py extract - > cars.jsonl
+    python cli.py discover bikroy trademe -o discovered.jsonl
+    python cli.py post cars.jsonl
+    python cli.py pipeline urls.txt -o cars.jsonl
+    python cli.py bench -k trademe
+    python cli.py serve --port 8770        # resident service, see daemon.py
+
+Inputs are listing URLs, files of URLs (one per line, # for comments),
+JSONL records, JSON files holding one record or a list, or '-' for stdin.
+Records are written as JSON lines to --output (default stdout); logs go
+to stderr. Modules are imported by the command that needs them, so
+'extract' never loads the poster, and Selenium only loads when a site
+actually needs a browser.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from log_config import setup_logging
+from profiling import profile_run
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_SITES = ('bikroy', 'trademe')
+
+
+# ----------------------------------------------------------------------
+# Inputs and outputs
+# ----------------------------------------------------------------------
+
+def _parse_line(line):
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    return json.loads(line) if line.startswith('{') else line
+
+
+def _iter_lines(f):
+    for line in f:
+        item = _parse_line(line)
+        if item is not None:
+            yield item
+
+
+def iter_inputs(sources):
+    """
+    Yield URLs (str) and records (dict) from the given sources, lazily, so
+    large URL files and JSONL streams are never loaded whole
+    """
+    for source in sources:
+        if source == '-':
+            yield from _iter_lines(sys.stdin)
+        elif source.startswith(('http://', 'https://')):
+            yield source
+        elif source.endswith('.json'):
+            with open(source, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            yield from data if isinstance(data, list) else [data]
+        else:
+            with open(source, 'r', encoding='utf-8') as f:
+                yield from _iter_lines(f)
+
+
+def iter_urls(sources):
+    """Listing URLs from the sources; records contribute their 'url'"""
+    for item in iter_inputs(sources):
+        url = item.get('url') if isinstance(item, dict) else item
+        if url:
+            yield url
+
+
+def load_ads(sources):
+    """Ad records from the sources; bare URLs cannot be posted and are skipped"""
+    ads = []
+    for item in iter_inputs(sources):
+        if isinstance(item, dict):
+            ads.append(item)
+        else:
+            logger.warning("⚠️  %s is not an ad record (extract it first), skipping", item)
+    return ads
+
+
+class RecordWriter:
+    """JSON lines to a file (appended, flushed per record) or stdout"""
+
+    def __init__(self, path=None):
+        self._out = open(path, 'a', encoding='utf-8') if path and path != '-' else sys.stdout
+        self.count = 0
+
+    def write(self, record):
+        self._out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._out.flush()
+        self.count += 1
+
+    def close(self):
+        if self._out is not sys.stdout:
+            self._out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def bounded_map(pool, func, items, window):
+    """
+    pool.map that keeps at most window calls in flight, so an unbounded
+    input stream is consumed as results are produced. Results keep the
+    input order.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def apply_rate_limits(min_delay=None, max_delay=None):
+    """Override every site's pacing (seconds between requests)"""
+    if min_delay is None and max_delay is None:
+        return
+    from site_adapters import all_adapters
+
+    for adapter in all_adapters():
+        if min_delay is not None:
+            adapter.min_delay = min_delay
+        if max_delay is not None:
+            adapter.max_delay = max_delay
+        adapter.max_delay = max(adapter.min_delay, adapter.max_delay)
+
+
+# ----------------------------------------------------------------------
+# Commands
+# ----------------------------------------------------------------------
+
+def extract_records(urls, workers=DEFAULT_WORKERS):
+    """Extract listings concurrently; yields (url, record or None) in input order"""
+    from extract import CarDetailsExtractor
+
+    extractor = CarDetailsExtractor()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from bounded_map(pool, lambda url: (url, extractor.extract_car_details(url)), urls, workers * 2)
+
+
+def cmd_extract(args):
+    apply_rate_limits(args.min_delay, args.max_delay)
+    failed = 0
+    with RecordWriter(args.output) as out:
+        for url, record in extract_records(iter_urls(args.inputs), args.workers):
+            if record:
+                out.write(record)
+            else:
+                failed += 1
+    logger.info("📊 Extracted %s listing(s), %s failed", out.count, failed)
+    return 1 if failed else 0
+
+
+def cmd_discover(args):
+    from discovery import ListingDiscovery
+
+    apply_rate_limits(args.min_delay, args.max_delay)
+    discovery = ListingDiscovery(max_pages=args.max_pages, max_workers=args.workers)
+    results = discovery.crawl(args.sites or list(DEFAULT_SITES), use_sitemaps=not args.no_sitemaps)
+    with RecordWriter(args.output) as out:
+        for record in results:
+            out.write(record)
+    logger.info("✅ Extracted %s new listing(s)", len(results))
+    return 0
+
+
+def cmd_post(args):
+    from main import post_ads
+
+    ads = load_ads(args.inputs)
+    if not ads:
+        logger.error("❌ No ads to post")
+        return 1
+    posted = post_ads(ads, args.processes)
+    logger.info("🏁 %s/%s ad(s) posted", posted, len(ads))
+    return 0 if posted == len(ads) else 1
+
+
+def cmd_pipeline(args):
+    """Extract (or discover) listings, then post them"""
+    apply_rate_limits(args.min_delay, args.max_delay)
+    if args.discover:
+        from discovery import ListingDiscovery
+
+        discovery = ListingDiscovery(max_workers=args.workers)
+        records = discovery.crawl(list(DEFAULT_SITES))
+    else:
+        records = [record for _, record in extract_records(iter_urls(args.inputs), args.workers) if record]
+
+    if args.output:
+        with RecordWriter(args.output) as out:
+            for record in records:
+                out.write(record)
+    if not records:
+        logger.error("❌ Nothing extracted, nothing to post")
+        return 1
+
+    from main import post_ads
+
+    posted = post_ads(records, args.processes)
+    logger.info("🏁 %s/%s extracted ad(s) posted", posted, len(records))
+    return 0 if posted == len(records) else 1
+
+
+def cmd_serve(args):
+    import daemon
+
+    apply_rate_limits(args.min_delay, args.max_delay)
+    daemon.serve(host=args.host, port=args.port, socket_path=args.socket, workers=args.workers,
+                 browsers=args.browsers, cache_ttl=args.cache_ttl)
+    return 0
+
+
+def cmd_bench(args):
+    import benchmarks
+
+    return benchmarks.main(args.bench_args)
+
+
+# ----------------------------------------------------------------------
+# Argument parsing
+# ----------------------------------------------------------------------
+
+def _add_rate_options(parser):
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="concurrent extractions")
+    parser.add_argument('--min-delay', type=float, help="minimum seconds between requests to one site")
+    parser.add_argument('--max-delay', type=float, help="maximum seconds between requests to one site")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Extract, discover and post car listings")
+    parser.add_argument('--log-level', help="DEBUG, INFO, ... (default: SCRAPER_LOG_LEVEL or INFO)")
+    parser.add_argument('--log-json', action='store_true', default=None, help="one JSON object per log line")
+    parser.add_argument('--profile', metavar='MODES', help="profile the run: cprofile, sample and/or memory")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    extract = commands.add_parser('extract', help="extract listings from URLs")
+    extract.add_argument('inputs', nargs='+', help="URLs, URL/JSONL files, or - for stdin")
+    extract.add_argument('-o', '--output', help="JSONL file to append records to (default stdout)")
+    _add_rate_options(extract)
+    extract.set_defaults(func=cmd_extract)
+
+    discover = commands.add_parser('discover', help="find and extract new listings")
+    discover.add_argument('sites', nargs='*', help=f"site adapters to crawl (default: {' '.join(DEFAULT_SITES)})")
+    discover.add_argument('-o', '--output', help="JSONL file to append records to (default stdout)")
+    discover.add_argument('--max-pages', type=int, default=20, help="search result pages per site")
+    discover.add_argument('--no-sitemaps', action='store_true', help="crawl search pages even if sitemaps exist")
+    _add_rate_options(discover)
+    discover.set_defaults(func=cmd_discover)
+
+    post = commands.add_parser('post', help="post ads from JSON/JSONL records")
+    post.add_argument('inputs', nargs='+', help="JSON/JSONL files of ads, or - for stdin")
+    post.add_argument('--processes', type=int, help="worker processes when sharding over accounts")
+    post.set_defaults(func=cmd_post)
+
+    pipeline = commands.add_parser('pipeline', help="extract listings and post them")
+    pipeline.add_argument('inputs', nargs='*', help="URLs, URL/JSONL files, or - for stdin")
+    pipeline.add_argument('--discover', action='store_true', help="post newly discovered listings instead")
+    pipeline.add_argument('-o', '--output', help="also append the extracted records to this JSONL file")
+    pipeline.add_argument('--processes', type=int, help="worker processes when sharding over accounts")
+    _add_rate_options(pipeline)
+    pipeline.set_defaults(func=cmd_pipeline)
+
+    serve = commands.add_parser('serve', help="run the resident extraction service")
+    serve.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    serve.add_argument('--port', type=int, default=8770, help="TCP port (0 picks a free one)")
+    serve.add_argument('--socket', help="listen on this Unix socket instead of TCP")
+    serve.add_argument('--browsers', type=int, default=2, help="warm browsers kept for sites that need one")
+    serve.add_argument('--cache-ttl', type=float, default=900, help="seconds an extracted listing is served from memory")
+    _add_rate_options(serve)
+    serve.set_defaults(func=cmd_serve, workers=8)
+
+    bench = commands.add_parser('bench', help="run the offline parser benchmarks (options as benchmarks.py)")
+    bench.set_defaults(func=cmd_bench, bench_args=[])
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if extra:
+        if args.command != 'bench':
+            parser.error(f"unrecognized arguments: {' '.join(extra)}")
+        args.bench_args = extra
+    if args.command == 'pipeline' and not args.inputs and not args.discover:
+        parser.error("pipeline needs inputs or --discover")
+
+    # stdout carries the records, so logs go to stderr
+    setup_logging(level=args.log_level, json_output=args.log_json, stream=sys.stderr)
+    if args.profile:
+        os.environ['SCRAPER_PROFILE'] = args.profile
+
+    with profile_run(args.command):
+        return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+"""
+Resident extraction service: keeps the HTTP connection pools, warm
+browsers, adapters and learned selectors of one process alive between
+jobs, and takes work over a local HTTP API (TCP on 127.0.0.1, or a Unix
+socket).
+
+    python cli.py serve --port 8770 --workers 8 --browsers 2
+
+    POST /extract      {"url": ...} or {"urls": [...]}   -> results, waits
+    POST /jobs         {"urls": [...]} (or one URL per line) -> 202 {"id": ...}
+    GET  /jobs/<id>    status and the results so far
+    GET  /jobs/<id>/stream   results as JSON lines, as they finish
+    GET  /health       uptime, queue and cache sizes
+
+Listings extracted within SCRAPER_DAEMON_CACHE_TTL seconds (default 900)
+are answered from memory. Site pacing still applies to real fetches.
+"""
+import json
+import logging
+import os
+import signal
+import socketserver
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from requests.adapters import HTTPAdapter
+
+from extract import CarDetailsExtractor
+from log_config import setup_logging
+from profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8770
+DEFAULT_WORKERS = 8
+DEFAULT_BROWSERS = 2
+DEFAULT_CACHE_TTL = 900        # seconds an extracted listing is served from memory
+MAX_CACHE_ENTRIES = 10000
+JOB_TTL = 3600                 # seconds a finished job's results are kept
+MAX_REQUEST_BYTES = 10 * 1024 * 1024
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+
+
+class ResultCache:
+    """Extracted listings by URL, least recently used evicted, entries expire after ttl"""
+
+    def __init__(self, ttl=DEFAULT_CACHE_TTL, max_entries=MAX_CACHE_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            stored_at, record = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[url]
+                return None
+            self._entries.move_to_end(url)
+            return record
+
+    def put(self, url, record):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[url] = (time.monotonic(), record)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class Job:
+    """A submitted batch of URLs and its results, in completion order"""
+
+    def __init__(self, urls):
+        self.id = uuid.uuid4().hex[:12]
+        self.urls = urls
+        self.results = []
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._changed = threading.Condition()
+
+    @property
+    def status(self):
+        if self.finished_at is not None:
+            return DONE
+        return RUNNING if self.results else QUEUED
+
+    def add(self, result):
+        with self._changed:
+            self.results.append(result)
+            if len(self.results) == len(self.urls):
+                self.finished_at = time.time()
+            self._changed.notify_all()
+
+    def wait_for(self, count, timeout=None):
+        """Block until more than count results are in (or the job is done); returns the results"""
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.results) > count or self.finished_at is not None, timeout)
+            return list(self.results)
+
+    def summary(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'total': len(self.urls),
+            'completed': len(self.results),
+            'failed': sum(1 for result in self.results if result['error']),
+            'submitted_at': self.submitted_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class ExtractionService:
+    """
+    The warm state: one extractor (and so one pooled requests session) shared
+    by a worker pool, an in-memory result cache, the browser pool the
+    TradeMe scraper borrows from, and the jobs submitted so far.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, browsers=DEFAULT_BROWSERS, cache_ttl=DEFAULT_CACHE_TTL):
+        self.extractor = CarDetailsExtractor()
+        # One keep-alive connection per worker and host, reused across jobs
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=workers)
+        self.extractor.session.mount('https://', adapter)
+        self.extractor.session.mount('http://', adapter)
+        self.cache = ResultCache(cache_ttl)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='extract')
+        self.browsers = browsers
+        self.driver_pool = None
+        self.jobs = {}
+        self._jobs_lock = threading.Lock()
+        self.started_at = time.time()
+
+    def start_browsers(self):
+        """Install the warm browser pool; browsers start on first use"""
+        if self.browsers <= 0:
+            return
+        # Imported here so a service for static sites never loads Selenium
+        from browser import DriverPool, use_driver_pool
+
+        self.driver_pool = DriverPool(self.browsers)
+        use_driver_pool(self.driver_pool)
+
+    def extract(self, url):
+        """One listing as {'url', 'record', 'error', 'cached', 'elapsed_ms'}"""
+        started = time.perf_counter()
+        record = self.cache.get(url)
+        cached = record is not None
+        if not cached:
+            record = self.extractor.extract_car_details(url)
+            if record:
+                self.cache.put(url, record)
+        return {
+            'url': url,
+            'record': record,
+            'error': None if record else 'extraction failed',
+            'cached': cached,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def extract_many(self, urls):
+        """Extract urls on the worker pool and wait; results in input order"""
+        return list(self.pool.map(self.extract, urls))
+
+    def submit(self, urls):
+        """Queue a job; its results come in as the workers finish them"""
+        job = Job(urls)
+        with self._jobs_lock:
+            self._prune()
+            self.jobs[job.id] = job
+        for url in urls:
+            future = self.pool.submit(self.extract, url)
+            future.add_done_callback(lambda done, url=url: job.add(self._result_of(done, url)))
+        logger.info("📥 Job %s: %s URL(s)", job.id, len(urls))
+        return job
+
+    @staticmethod
+    def _result_of(future, url):
+        try:
+            return future.result()
+        except Exception as e:
+            return {'url': url, 'record': None, 'error': str(e), 'cached': False, 'elapsed_ms': None}
+
+    def _prune(self):
+        cutoff = time.time() - JOB_TTL
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    def job(self, job_id):
+        with self._jobs_lock:
+            return self.jobs.get(job_id)
+
+    def health(self):
+        with self._jobs_lock:
+            running = sum(1 for job in self.jobs.values() if job.finished_at is None)
+        return {
+            'status': 'ok',
+            'uptime': round(time.time() - self.started_at, 1),
+            'jobs_running': running,
+            'jobs_kept': len(self.jobs),
+            'cached_listings': len(self.cache),
+            'browsers': self.browsers,
+        }
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        if self.driver_pool is not None:
+            self.driver_pool.close()
+
+
+def _urls_from_body(body, content_type):
+    """URLs from a JSON body ({"url"} / {"urls"} / a list) or one URL per line"""
+    if 'json' in (content_type or ''):
+        data = json.loads(body or b'null')
+        if isinstance(data, dict):
+            data = data.get('urls') or ([data['url']] if data.get('url') else [])
+        if not isinstance(data, list) or not all(isinstance(url, str) for url in data):
+            raise ValueError('expected {"url": ...}, {"urls": [...]} or a list of URLs')
+        return data
+    return [line.strip() for line in body.decode('utf-8').splitlines() if line.strip()]
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """JSON API of an ExtractionService (set as the server's service attribute)"""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive: repeat callers skip the connect
+    server_version = 'ExtractionDaemon/1'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def address_string(self):
+        # Unix-socket clients have no (host, port)
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status >= 400:
+            # The request body may not have been read, and on a kept-alive
+            # connection it would be parsed as the next request
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_urls(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_REQUEST_BYTES:
+            raise ValueError('request body too large')
+        urls = _urls_from_body(self.rfile.read(length), self.headers.get('Content-Type'))
+        if not urls:
+            raise ValueError('no URLs given')
+        return urls
+
+    def do_GET(self):
+        parts = [part for part in self.path.split('?')[0].split('/') if part]
+        if parts == ['health']:
+            return self._send_json(200, self.service.health())
+        if len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = self.service.job(parts[1])
+            if job is None:
+                return self._send_json(404, {'error': f"no job {parts[1]}"})
+            if len(parts) == 2:
+                return self._send_json(200, {**job.summary(), 'results': list(job.results)})
+            if parts[2] == 'stream':
+                return self._stream(job)
+        self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        path = self.path.split('?')[0].rstrip('/')
+        if path not in ('/extract', '/jobs'):
+            return self._send_json(404, {'error': 'not found'})
+        try:
+            urls = self._read_urls()
+        except ValueError as e:
+            return self._send_json(400, {'error': str(e)})
+        if path == '/extract':
+            return self._send_json(200, {'results': self.service.extract_many(urls)})
+        job = self.service.submit(urls)
+        self._send_json(202, {**job.summary(), 'status_url': f"/jobs/{job.id}",
+                              'stream_url': f"/jobs/{job.id}/stream"})
+
+    def _stream(self, job):
+        """JSON lines, one per result as it finishes, then the connection closes"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        sent = 0
+        while True:
+            results = job.wait_for(sent, timeout=30)
+            try:
+                for result in results[sent:]:
+                    self.wfile.write((json.dumps(result, ensure_ascii=False) + '\n').encode('utf-8'))
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return  # the caller went away; the job carries on
+            sent = len(results)
+            if job.finished_at is not None and sent == len(job.urls):
+                return
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)  # left behind by a previous run
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)
+
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    """An HTTP server for service, on a Unix socket if socket_path is given"""
+    if socket_path:
+        server = ThreadingUnixHTTPServer(socket_path, ServiceHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.service = service
+    return server
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, workers=DEFAULT_WORKERS,
+          browsers=DEFAULT_BROWSERS, cache_ttl=DEFAULT_CACHE_TTL):
+    """Run the service until SIGTERM or Ctrl+C"""
+    service = ExtractionService(workers, browsers, cache_ttl)
+    service.start_browsers()
+    server = create_server(service, host, port, socket_path)
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    logger.info("🛰️  Extraction daemon listening on %s (%s workers, %s browsers)",
+                socket_path or f"http://{host}:{server.server_address[1]}", workers, browsers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info("🛑 Shutting down the extraction daemon")
+        server.server_close()
+        service.close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+@profiled('daemon')
+def main():
+    """
+    Serve with the settings from SCRAPER_DAEMON_HOST, SCRAPER_DAEMON_PORT,
+    SCRAPER_DAEMON_SOCKET, SCRAPER_DAEMON_WORKERS, SCRAPER_DAEMON_BROWSERS
+    and SCRAPER_DAEMON_CACHE_TTL
+    """
+    setup_logging()
+    serve(
+        host=os.getenv('SCRAPER_DAEMON_HOST', DEFAULT_HOST),
+        port=int(os.getenv('SCRAPER_DAEMON_PORT', str(DEFAULT_PORT))),
+        socket_path=os.getenv('SCRAPER_DAEMON_SOCKET') or None,
+        workers=int(os.getenv('SCRAPER_DAEMON_WORKERS', str(DEFAULT_WORKERS))),
+        browsers=int(os.getenv('SCRAPER_DAEMON_BROWSERS', str(DEFAULT_BROWSERS))),
+        cache_ttl=float(os.getenv('SCRAPER_DAEMON_CACHE_TTL', str(DEFAULT_CACHE_TTL))),
+    )
+
+
+if __name__ == "__main__":
+    main()
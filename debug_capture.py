@@ -0,0 +1,179 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPTURE_DIR = 'debug_captures'
+DEFAULT_MAX_FILES = 200
+MANIFEST_LINES_PER_FILE = 5  # manifest is compacted beyond max_files times this many lines
+
+
+class DebugCapture:
+    """
+    Opt-in capture of raw pages and responses for debugging.
+
+    Off by default. When enabled, a sampled fraction of captures (or only
+    those flagged as failures) are handed to a background thread that
+    writes each one to a content-addressed file and appends a line to a
+    manifest, so concurrent workers never overwrite each other and the
+    caller never waits on disk. Old files are pruned beyond max_files, and
+    the manifest is compacted to the entries of files still on disk.
+    """
+
+    def __init__(self, enabled=False, sample_rate=1.0, failures_only=False,
+                 capture_dir=DEFAULT_CAPTURE_DIR, max_files=DEFAULT_MAX_FILES):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.failures_only = failures_only
+        self.capture_dir = capture_dir
+        self.max_files = max_files
+        self.manifest_file = os.path.join(capture_dir, 'manifest.jsonl')
+        self._manifest_lines = None
+        self._queue = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """
+        SCRAPER_DEBUG_CAPTURE=1 enables capture, SCRAPER_DEBUG_SAMPLE sets the
+        sampled percentage (default 100), SCRAPER_DEBUG_FAILURES_ONLY=1 keeps
+        failures only, SCRAPER_DEBUG_DIR and SCRAPER_DEBUG_MAX_FILES set the
+        output directory and retention cap.
+        """
+        def flag(name):
+            return os.getenv(name, '').lower() in ('1', 'true', 'yes', 'on')
+
+        return cls(
+            enabled=flag('SCRAPER_DEBUG_CAPTURE'),
+            sample_rate=float(os.getenv('SCRAPER_DEBUG_SAMPLE', '100')) / 100,
+            failures_only=flag('SCRAPER_DEBUG_FAILURES_ONLY'),
+            capture_dir=os.getenv('SCRAPER_DEBUG_DIR', DEFAULT_CAPTURE_DIR),
+            max_files=int(os.getenv('SCRAPER_DEBUG_MAX_FILES', str(DEFAULT_MAX_FILES))),
+        )
+
+    def should_capture(self, failed=False):
+        if not self.enabled:
+            return False
+        if self.failures_only and not failed:
+            return False
+        # Failures are always kept; successes are sampled
+        return failed or random.random() < self.sample_rate
+
+    def capture(self, kind, content, failed=False, ext='.html', **meta):
+        """
+        Queue content (str or bytes) for writing. Returns immediately; does
+        nothing unless capture is enabled and this request is sampled.
+        content may also be a zero-argument callable, which is only called
+        when the capture is actually taken.
+        """
+        if not self.should_capture(failed):
+            return False
+        if callable(content):
+            content = content()
+        self._ensure_writer()
+        self._queue.put((kind, content, failed, ext, meta, time.time()))
+        return True
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._writer is None:
+                os.makedirs(self.capture_dir, exist_ok=True)
+                self._queue = queue.Queue()
+                self._writer = threading.Thread(target=self._write_loop, name='debug-capture', daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as e:
+                logger.warning("Failed to write debug capture: %s", e)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, kind, content, failed, ext, meta, captured_at):
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        digest = hashlib.sha256(data).hexdigest()
+        filename = f"{kind}-{digest[:16]}{ext}"
+        path = os.path.join(self.capture_dir, filename)
+        if os.path.exists(path):
+            # Seen before: mark it recent so pruning keeps what the new entry references
+            os.utime(path)
+        else:
+            with open(path, 'wb') as f:
+                f.write(data)
+
+        entry = dict(meta, kind=kind, file=filename, sha256=digest, bytes=len(data),
+                     failed=failed, captured_at=time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(captured_at)))
+        if self._manifest_lines is None:
+            self._manifest_lines = len(self._read_manifest())
+        with open(self.manifest_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+        self._manifest_lines += 1
+        logger.debug("Debug capture written: %s", path)
+        if self._prune() or self._manifest_lines > self.max_files * MANIFEST_LINES_PER_FILE:
+            self._compact_manifest()
+
+    def _prune(self):
+        """Delete the oldest captures beyond max_files; returns whether any were deleted"""
+        files = [os.path.join(self.capture_dir, name) for name in os.listdir(self.capture_dir)
+                 if name != os.path.basename(self.manifest_file)]
+        if len(files) <= self.max_files:
+            return False
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return True
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return f.readlines()
+        except FileNotFoundError:
+            return []
+
+    def _compact_manifest(self):
+        """Keep the newest max_files manifest lines whose capture file still exists"""
+        kept = []
+        for line in self._read_manifest():
+            try:
+                filename = json.loads(line)['file']
+            except (ValueError, KeyError):
+                continue
+            if os.path.exists(os.path.join(self.capture_dir, filename)):
+                kept.append(line)
+        kept = kept[-self.max_files:]
+        fd, tmp_path = tempfile.mkstemp(dir=self.capture_dir, prefix='.manifest-', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.writelines(kept)
+        os.replace(tmp_path, self.manifest_file)
+        self._manifest_lines = len(kept)
+
+    def flush(self):
+        """Wait for queued captures to be written"""
+        if self._queue is not None:
+            self._queue.join()
+
+
+debug_capture = DebugCapture.from_env()
+atexit.register(debug_capture.flush)
+
+
+def capture(kind, content, failed=False, ext='.html', **meta):
+    """Capture an artifact with the process-wide DebugCapture settings"""
+    return debug_capture.capture(kind, content, failed=failed, ext=ext, **meta)
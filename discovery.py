@@ -0,0 +1,401 @@
+import gzip
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin
+
+from lxml import etree
+
+from extract import CarDetailsExtractor
+from instrumentation import span
+from log_config import setup_logging
+from profiling import profiled
+from resource_governor import governor
+from site_adapters import BROWSER, adapter_by_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_FILE = 'discovery_state.json'
+MAX_KNOWN_PER_SITE = 5000  # newest listings remembered per site for early stop
+RENDER_TIMEOUT = 15  # seconds to wait for a client-rendered results page to show listings
+
+# Elements that carry one URL in sitemaps, sitemap indexes, RSS and Atom
+SITEMAP_TAGS = ('{*}url', '{*}sitemap', '{*}item', '{*}entry')
+
+
+class DiscoveryState:
+    """
+    Listings seen by previous crawls, per site, persisted as JSON. Newest
+    first and capped, so the file stays small however long the crawler runs.
+    """
+
+    def __init__(self, state_file=DEFAULT_STATE_FILE):
+        self.state_file = state_file
+        self._lock = threading.Lock()
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                self._state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._state = {}
+        self._known = {site: set(entry.get('known', [])) for site, entry in self._state.items()}
+
+    def site(self, name):
+        return self._state.setdefault(name, {'known': []})
+
+    def is_known(self, name, url):
+        return url in self._known.get(name, ())
+
+    def mark_known(self, name, urls):
+        with self._lock:
+            known = self._known.setdefault(name, set())
+            new = [url for url in urls if url not in known]
+            known.update(new)
+            entry = self.site(name)
+            entry['known'] = (new[::-1] + entry['known'])[:MAX_KNOWN_PER_SITE]
+
+    def save(self):
+        """Write the state atomically"""
+        with self._lock:
+            directory = os.path.dirname(os.path.abspath(self.state_file))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._state, f, indent=2)
+            os.replace(tmp_path, self.state_file)
+
+
+def parse_lastmod(value):
+    """Parse a sitemap/feed timestamp to an aware UTC datetime, or None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)  # RSS pubDate
+        except (TypeError, ValueError):
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _child_text(elem, *names):
+    for child in elem:
+        if isinstance(child.tag, str) and _local_name(child.tag) in names:
+            return (child.text or child.get('href') or '').strip()
+    return None
+
+
+class SitemapSource:
+    """
+    Listing URLs from sitemaps and feeds, without rendering or even
+    downloading a single listing page.
+
+    Documents are parsed incrementally straight off the (optionally gzipped)
+    response stream with lxml.iterparse, clearing each element once read,
+    so memory stays constant however large the sitemap is. Entries and
+    whole child sitemaps whose lastmod is not newer than the previous run
+    are skipped.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def sitemaps_for(self, adapter):
+        """The adapter's sitemaps, or the ones its robots.txt advertises"""
+        if adapter.sitemap_urls:
+            return list(adapter.sitemap_urls)
+        robots_url = urljoin(adapter.listing_base, '/robots.txt')
+        try:
+            response = self.session.get(robots_url, timeout=15)
+            response.raise_for_status()
+        except Exception as e:
+            logger.info("No robots.txt for %s: %s", adapter.name, e)
+            return []
+        return [line.split(':', 1)[1].strip() for line in response.text.splitlines()
+                if line.lower().startswith('sitemap:')]
+
+    def _open(self, url):
+        """Open url as a decompressed byte stream"""
+        response = self.session.get(url, stream=True, timeout=30)
+        response.raise_for_status()
+        response.raw.decode_content = True
+        stream = response.raw
+        content_type = response.headers.get('content-type', '')
+        already_decoded = 'gzip' in response.headers.get('content-encoding', '')
+        if (url.endswith('.gz') or 'gzip' in content_type) and not already_decoded:
+            stream = gzip.GzipFile(fileobj=stream)
+        return response, stream
+
+    def _iter_entries(self, url):
+        """Yield (kind, loc, lastmod) for each <url>/<sitemap>/<item>/<entry>"""
+        response, stream = self._open(url)
+        try:
+            with span('sitemap_parse'):
+                for _, elem in etree.iterparse(stream, events=('end',), tag=SITEMAP_TAGS,
+                                               resolve_entities=False, no_network=True, huge_tree=True):
+                    kind = _local_name(elem.tag)
+                    loc = _child_text(elem, 'loc', 'link')
+                    lastmod = _child_text(elem, 'lastmod', 'pubDate', 'updated', 'published')
+                    # Free what we have read so memory does not grow with the document
+                    elem.clear()
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
+                    if loc:
+                        yield kind, loc, parse_lastmod(lastmod)
+        finally:
+            response.close()
+
+    def iter_sitemap(self, url, since=None, depth=0):
+        """
+        Yield (loc, lastmod) for pages in a sitemap, following sitemap
+        indexes into child sitemaps changed since the given time
+        """
+        for kind, loc, lastmod in self._iter_entries(url):
+            if since and lastmod and lastmod <= since:
+                continue
+            if kind == 'sitemap':
+                if depth < 3:
+                    try:
+                        yield from self.iter_sitemap(loc, since, depth + 1)
+                    except Exception as e:
+                        logger.warning("Skipping sitemap %s: %s", loc, e)
+            else:
+                yield loc, lastmod
+
+    def iter_feed(self, url, since=None):
+        """Yield (link, updated) for items in an RSS/Atom or JSON Feed"""
+        if url.endswith('.json'):
+            response = self.session.get(url, timeout=30)
+            response.raise_for_status()
+            for item in response.json().get('items', []):
+                lastmod = parse_lastmod(item.get('date_modified') or item.get('date_published'))
+                if item.get('url') and not (since and lastmod and lastmod <= since):
+                    yield item['url'], lastmod
+            return
+        for _, loc, lastmod in self._iter_entries(url):
+            if not (since and lastmod and lastmod <= since):
+                yield loc, lastmod
+
+    def listing_urls(self, adapter, since=None):
+        """
+        Return {listing URL: lastmod or None}, in sitemap order, from all of
+        the adapter's sitemaps and feeds, or None if it has neither
+        """
+        sources = [(self.iter_sitemap, url) for url in self.sitemaps_for(adapter)]
+        sources += [(self.iter_feed, url) for url in adapter.feed_urls]
+        if not sources:
+            return None
+
+        lastmods = {}
+        for iterate, source_url in sources:
+            try:
+                for loc, lastmod in iterate(source_url, since):
+                    match = adapter.listing_pattern.search(loc)
+                    if not match:
+                        continue
+                    url = urljoin(adapter.listing_base, match.group(0))
+                    previous = lastmods.get(url)
+                    lastmods[url] = max(previous, lastmod) if previous and lastmod else previous or lastmod
+            except Exception as e:
+                logger.error("❌ Error reading %s: %s", source_url, e)
+        return lastmods
+
+
+class ListingDiscovery:
+    """
+    Finds new listing URLs by paging through a site's search results and
+    hands them to the extraction engine.
+
+    Result pages are only scanned for listing links with the adapter's
+    listing_pattern (no DOM parsing); sites that render their results
+    client-side (browser adapters) are read from a headless browser.
+    Paging stops at the first page on which every listing was seen in a
+    previous crawl, since results are sorted newest first (a page that is
+    only partly known may just carry a pinned, promoted ad).
+    """
+
+    def __init__(self, extractor=None, state=None, max_pages=20, max_workers=4):
+        self.extractor = extractor or CarDetailsExtractor()
+        self.state = state or DiscoveryState()
+        self.max_pages = max_pages
+        self.max_workers = max_workers
+        self.sitemaps = SitemapSource(self.extractor.session)
+        self._sitemap_lastmods = {}  # site -> {url: lastmod} of the batch being extracted
+
+    def listing_urls(self, adapter, html):
+        """Listing links on a result page, in page order, de-duplicated"""
+        urls = []
+        seen = set()
+        for match in adapter.listing_pattern.finditer(html):
+            url = urljoin(adapter.listing_base, match.group(0))
+            if url not in seen:
+                seen.add(url)
+                urls.append(url)
+        return urls
+
+    @contextmanager
+    def _page_reader(self, adapter):
+        """
+        Yield url -> HTML of a results page: a plain GET, or for browser
+        adapters the page as rendered by one headless browser kept for the
+        whole crawl of the site
+        """
+        if adapter.fetch_strategy != BROWSER:
+            def read(url):
+                response = self.extractor.session.get(url, timeout=30)
+                response.raise_for_status()
+                return response.text
+            yield read
+            return
+
+        # Imported here so crawls of static sites never load Selenium
+        from browser import create_lean_driver, quit_driver
+
+        driver = create_lean_driver()
+        try:
+            def read(url):
+                driver.get(url)
+                deadline = time.time() + RENDER_TIMEOUT
+                while not adapter.listing_pattern.search(driver.page_source) and time.time() < deadline:
+                    time.sleep(0.5)
+                return driver.page_source
+            yield read
+        finally:
+            quit_driver(driver)
+
+    def discover(self, site):
+        """Return the listing URLs on site that no previous crawl has seen"""
+        adapter = adapter_by_name(site)
+        if not adapter.search_url:
+            raise ValueError(f"Site adapter {site!r} has no search_url")
+
+        new_urls = []
+        with self._page_reader(adapter) as read_page:
+            for page in range(1, self.max_pages + 1):
+                adapter.throttle()
+                try:
+                    with governor.request(), span('discover', site=site):
+                        page_urls = self.listing_urls(adapter, read_page(adapter.search_url.format(page=page)))
+                except Exception as e:
+                    logger.error("❌ Error fetching %s results page %s: %s", site, page, e)
+                    break
+
+                if not page_urls:
+                    logger.info("📄 %s page %s: no listings, stopping", site, page)
+                    break
+
+                fresh = [url for url in page_urls if not self.state.is_known(site, url) and url not in new_urls]
+                new_urls.extend(fresh)
+                logger.info("📄 %s page %s: %s listings, %s new", site, page, len(page_urls), len(fresh))
+                if all(self.state.is_known(site, url) for url in page_urls):
+                    logger.info("⏹️  Reached listings seen in a previous crawl")
+                    break
+
+        self.state.site(site)['last_crawled'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        return new_urls
+
+    def discover_from_sitemaps(self, site):
+        """
+        Return unseen listing URLs from the site's sitemaps and feeds that
+        changed since the last run, or None if the site publishes neither
+        """
+        adapter = adapter_by_name(site)
+        entry = self.state.site(site)
+        since = parse_lastmod(entry.get('sitemap_lastmod'))
+
+        with span('discover', site=site, mode='sitemap'):
+            lastmods = self.sitemaps.listing_urls(adapter, since)
+        if lastmods is None:
+            return None
+
+        # sitemap_lastmod only moves once the batch is extracted (advance_sitemap_lastmod)
+        self._sitemap_lastmods[site] = lastmods
+        new_urls = [url for url in lastmods if not self.state.is_known(site, url)]
+        logger.info("🗺️  %s sitemaps/feeds: %s listings changed, %s new", site, len(lastmods), len(new_urls))
+        return new_urls
+
+    def advance_sitemap_lastmod(self, site):
+        """
+        After extraction, move the site's sitemap cut-off up to the newest
+        entry older than the oldest listing that failed to extract, so the
+        failed ones are listed (and retried) again next run
+        """
+        lastmods = self._sitemap_lastmods.pop(site, None)
+        if not lastmods:
+            return
+        entry = self.state.site(site)
+        since = parse_lastmod(entry.get('sitemap_lastmod'))
+        failed = [lastmod for url, lastmod in lastmods.items() if lastmod and not self.state.is_known(site, url)]
+        cutoff = min(failed) if failed else None
+        done = [lastmod for lastmod in lastmods.values() if lastmod and (cutoff is None or lastmod < cutoff)]
+        if done and (since is None or max(done) > since):
+            entry['sitemap_lastmod'] = max(done).isoformat()
+        if failed:
+            logger.info("🗺️  %s: %s listing(s) failed, keeping them in the next sitemap run", site, len(failed))
+
+    def extract(self, site, urls):
+        """
+        Extract the given listings on a worker pool. The site adapter still
+        paces the requests; the pool overlaps parsing and browser work.
+        """
+        def run(url):
+            car_data = self.extractor.extract_car_details(url)
+            if car_data:
+                self.state.mark_known(site, [url])
+            return car_data
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return [car_data for car_data in pool.map(run, urls) if car_data]
+
+    def crawl(self, sites, use_sitemaps=True):
+        """
+        Discover and extract new listings on each site; returns the extracted
+        records. Sitemaps/feeds are tried first and search pages are only
+        crawled for sites that publish neither.
+        """
+        jobs = {}
+        for site in sites:
+            urls = self.discover_from_sitemaps(site) if use_sitemaps else None
+            jobs[site] = urls if urls is not None else self.discover(site)
+        logger.info("🔎 Discovered %s new listings", sum(len(urls) for urls in jobs.values()))
+
+        results = []
+        with ThreadPoolExecutor(max_workers=len(jobs) or 1) as pool:
+            for site_results in pool.map(lambda item: self.extract(*item), jobs.items()):
+                results.extend(site_results)
+
+        for site in jobs:
+            self.advance_sitemap_lastmod(site)
+        self.state.save()
+        return results
+
+
+@profiled('discovery')
+def main():
+    """
+    Crawl Bikroy and TradeMe car listings and save newly found ads
+    """
+    setup_logging()
+    discovery = ListingDiscovery()
+
+    results = discovery.crawl(['bikroy', 'trademe'])
+    logger.info("✅ Extracted %s new listings", len(results))
+    if results:
+        discovery.extractor.save_to_json(results, 'discovered_cars.json')
+
+
+if __name__ == "__main__":
+    main()
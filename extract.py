@@ -1,14 +1,19 @@
 import requests
 import json
-import re
 from bs4 import BeautifulSoup
-from urllib.parse import urlparse
-import time
-import random
+import logging
+from instrumentation import span
+from log_config import setup_logging
+from profiling import profiled
+from resource_governor import governor
+from site_adapters import BIKROY, BROWSER, GENERIC, JSON_EMBEDDED, adapter_for_url, extract_embedded_json
+
+logger = logging.getLogger(__name__)
 
 class CarDetailsExtractor:
     """
-    Extracts car details from Bikroy.com using JavaScript data extraction
+    Extracts car details from any site with a registered adapter
+    (see site_adapters.py), falling back to generic HTML scraping
     """
     
     def __init__(self):
@@ -27,251 +32,118 @@ class CarDetailsExtractor:
         """
         Extract car details from Bikroy.com using JavaScript data
         """
-        try:
-            print(f"🔍 Extracting from: {url}")
-            
-            # Add delay to be respectful
-            time.sleep(random.uniform(1, 3))
-            
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Find the script tag containing window.initialData
-            script_tag = soup.find('script', string=lambda t: t and 'window.initialData' in t)
-            
-            if not script_tag:
-                print("❌ Could not find window.initialData script")
-                return None
-            
-            # Extract JSON data from script
-            script_text = script_tag.string
-            start_index = script_text.find('window.initialData = ') + len('window.initialData = ')
-            
-            # Find the end of the JSON object by counting braces
-            brace_count = 0
-            end_index = start_index
-            
-            for i, char in enumerate(script_text[start_index:], start_index):
-                if char == '{':
-                    brace_count += 1
-                elif char == '}':
-                    brace_count -= 1
-                    if brace_count == 0:
-                        end_index = i + 1
-                        break
-            
-            json_data = script_text[start_index:end_index].strip()
-            print(f"🔍 Found JSON data length: {len(json_data)}")
-            
-            try:
-                data = json.loads(json_data)
-            except json.JSONDecodeError as e:
-                print(f"❌ JSON parsing error: {e}")
-                print(f"🔍 JSON start: {json_data[:100]}...")
-                print(f"🔍 JSON end: ...{json_data[-100:]}")
-                return None
-            
-            # Extract ad details
-            adDetails = data.get('adDetail', {}).get('data', {}).get('ad', {})
-            
-            # Initialize car details structure
-            car_details = {
-                'url': url,
-                'year_of_production': None,
-                'version': None,
-                'price': None,
-                'images': [],
-                'title': None,
-                'trim': None,
-                'transmission': None,
-                'registration_year': None,
-                'fuel_type': None,
-                'kilometers_driven': None,
-                'model': None,
-                'condition': None,
-                'body_type': None,
-                'engine_capacity': None,
-                'posted_on': None,
-                'seller_name': None,
-                'contact': [],
-                'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            # Extract basic information
-            raw_images = adDetails.get('images', {}).get('meta', [])
-            car_details['images'] = []
-            
-            # Process images and append size parameters
-            for img in raw_images:
-                if isinstance(img, dict) and 'src' in img:
-                    # Append size parameters to image URL
-                    base_url = img['src']
-                    if not base_url.endswith('/620/466/fitted.jpg'):
-                        if base_url.endswith('/'):
-                            base_url = base_url[:-1]  # Remove trailing slash
-                        base_url += '/620/466/fitted.jpg'
-                    
-                    car_details['images'].append({
-                        'src': base_url,
-                        'alt': img.get('alt', ''),
-                        'title': img.get('title', '')
-                    })
-            
-            car_details['title'] = adDetails.get('title')
-            car_details['contact'] = adDetails.get('contactCard', {}).get('phoneNumbers', [])
-            car_details['price'] = adDetails.get('money', {}).get('amount')
-            car_details['seller_name'] = adDetails.get('shop', {}).get('name')
-            car_details['posted_on'] = adDetails.get('adDate')
-            
-            # Extract properties
-            properties = adDetails.get('properties', [])
-            for item in properties:
-                if item['label'] == 'Year of Manufacture':
-                    car_details['year_of_production'] = item['value']
-                elif item['label'] == 'Trim / Edition':
-                    car_details['version'] = item['value']
-                elif item['label'] == 'Fuel type':
-                    car_details['fuel_type'] = item['value']
-                elif item['label'] == 'Kilometers run':
-                    car_details['kilometers_driven'] = item['value']
-                elif item['label'] == 'Model':
-                    car_details['model'] = item['value']
-                elif item['label'] == 'Condition':
-                    car_details['condition'] = item['value']
-                elif item['label'] == 'Transmission':
-                    car_details['transmission'] = item['value']
-                elif item['label'] == 'Body type':
-                    car_details['body_type'] = item['value']
-                elif item['label'] == 'Engine capacity':
-                    car_details['engine_capacity'] = item['value']
-            
-            # Format price for display
-            if car_details['price']:
-                try:
-                    price_num = int(car_details['price'])
-                    car_details['price'] = f"Tk {price_num:,}"
-                except (ValueError, TypeError):
-                    # Remove any existing Tk prefix
-                    price_str = str(car_details['price']).replace('Tk', '').strip()
-                    car_details['price'] = f"Tk {price_str}"
-            
-            print(f"✅ Extracted: {car_details['title']}")
-            print(f"💰 Price: {car_details['price']}")
-            print(f"🚗 Model: {car_details['model']}")
-            print(f"📅 Year: {car_details['year_of_production']}")
-            print(f"🖼️  Images found: {len(car_details['images'])}")
-            print(f"📞 Contact numbers: {len(car_details['contact'])}")
-            
-            return car_details
-            
-        except Exception as e:
-            print(f"❌ Error extracting from {url}: {e}")
-            return None
+        return self.extract_with_adapter(BIKROY, url)
     
     def extract_from_general_site(self, url):
         """
         Extract car details from general websites (fallback method)
         """
+        return self.extract_with_adapter(GENERIC, url)
+    
+    def extract_with_adapter(self, adapter, url):
+        """
+        Fetch and map one URL the way its site adapter declares
+        """
         try:
-            print(f"🔍 Extracting from general site: {url}")
-            
-            time.sleep(random.uniform(1, 3))
+            logger.info("🔍 Extracting from %s: %s", adapter.name, url)
             
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
+            # Be respectful: per-site pacing, other sites are not held up
+            adapter.throttle()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            car_details = {
-                'url': url,
-                'title': None,
-                'price': None,
-                'images': [],
-                'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            # Try to find title
-            title_elem = soup.find('h1') or soup.find('h2') or soup.find('title')
-            if title_elem:
-                car_details['title'] = title_elem.get_text(strip=True)
-            
-            # Try to find price
-            price_elem = soup.find(string=re.compile(r'[\$€£₹]\s*[\d,]+|[\d,]+\s*[\$€£₹]|Tk\s*[\d,]+'))
-            if price_elem:
-                car_details['price'] = price_elem.strip()
-            
-            # Try to find images
-            img_elements = soup.find_all('img')
-            for img in img_elements:
-                src = img.get('src') or img.get('data-src')
-                if src and any(keyword in src.lower() for keyword in ['car', 'vehicle', 'auto', 'jpg', 'jpeg', 'png']):
-                    if 'logo' not in src.lower() and 'icon' not in src.lower():
-                        car_details['images'].append({
-                            'src': src,
-                            'alt': img.get('alt', ''),
-                            'title': img.get('title', '')
-                        })
+            if adapter.fetch_strategy == BROWSER:
+                # The site's own scraper holds a governor slot for each of its fetches
+                car_details = adapter.map(self.session, url)
+            else:
+                with governor.request(), span('fetch', site=adapter.name):
+                    response = self.session.get(url, timeout=30)
+                    response.raise_for_status()
+                
+                with span('parse', site=adapter.name):
+                    if adapter.fetch_strategy == JSON_EMBEDDED:
+                        data = extract_embedded_json(response.text, adapter.embedded_marker)
+                        if data is None:
+                            logger.error("❌ Could not find %s data", adapter.embedded_marker.strip(' ='))
+                            return None
+                        source = adapter.select_data(data)
+                    else:
+                        source = BeautifulSoup(response.text, 'html.parser')
+                
+                with span('map', site=adapter.name):
+                    car_details = adapter.map(source, url)
+            
+            if not car_details:
+                return None
             
-            print(f"✅ Extracted: {car_details['title']}")
-            print(f"💰 Price: {car_details['price']}")
-            print(f"🖼️  Images found: {len(car_details['images'])}")
+            logger.info("✅ Extracted: %s", car_details.get('title'))
+            logger.info("💰 Price: %s", car_details.get('price'))
+            if car_details.get('model'):
+                logger.info("🚗 Model: %s", car_details['model'])
+            if car_details.get('year_of_production'):
+                logger.info("📅 Year: %s", car_details['year_of_production'])
+            logger.info("🖼️  Images found: %s", len(car_details.get('images', [])))
+            if 'contact' in car_details:
+                logger.info("📞 Contact numbers: %s", len(car_details['contact']))
             
             return car_details
             
         except Exception as e:
-            print(f"❌ Error extracting from {url}: {e}")
+            logger.error("❌ Error extracting from %s: %s", url, e)
             return None
     
     def extract_car_details(self, url):
         """
         Main extraction method that determines the site type and extracts accordingly
         """
-        domain = urlparse(url).netloc.lower()
-        
-        if 'bikroy' in domain:
-            return self.extract_from_bikroy(url)
-        else:
-            return self.extract_from_general_site(url)
+        return self.extract_with_adapter(adapter_for_url(url), url)
     
     def save_to_json(self, car_data, filename='extracted_car_details.json'):
         """
         Save extracted car details to JSON file
         """
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
+            with span('write_output'), open(filename, 'w', encoding='utf-8') as f:
                 json.dump(car_data, f, indent=2, ensure_ascii=False)
-            print(f"💾 Saved to: {filename}")
+            logger.info("💾 Saved to: %s", filename)
             return True
         except Exception as e:
-            print(f"❌ Error saving to {filename}: {e}")
+            logger.error("❌ Error saving to %s: %s", filename, e)
             return False
     
-    def extract_multiple_urls(self, urls):
+    def extract_multiple_urls(self, urls, output_file=None):
         """
-        Extract car details from multiple URLs
+        Extract car details from multiple URLs. With output_file, each record
+        is appended to it as one JSON line as soon as it is extracted and
+        only the count is returned, so long runs do not hold every result
+        in memory.
         """
         results = []
+        written = 0
+        out = open(output_file, 'a', encoding='utf-8') if output_file else None
         
-        for i, url in enumerate(urls, 1):
-            print(f"\n📋 Processing URL {i}/{len(urls)}")
-            car_data = self.extract_car_details(url)
-            if car_data:
-                results.append(car_data)
-            
-            # Be respectful with delays
-            if i < len(urls):
-                delay = random.uniform(2, 5)
-                print(f"⏳ Waiting {delay:.1f} seconds...")
-                time.sleep(delay)
+        try:
+            for i, url in enumerate(urls, 1):
+                logger.info("📋 Processing URL %s/%s", i, len(urls))
+                car_data = self.extract_car_details(url)
+                if not car_data:
+                    continue
+                if out:
+                    out.write(json.dumps(car_data, ensure_ascii=False) + '\n')
+                    out.flush()
+                    written += 1
+                else:
+                    results.append(car_data)
+        finally:
+            if out:
+                out.close()
         
-        return results
+        return written if output_file else results
 
+@profiled('extract')
 def main():
     """
     Main function for testing and demonstration
     """
+    setup_logging()
     extractor = CarDetailsExtractor()
     
     # Example URLs to extract from
@@ -280,11 +152,11 @@ def main():
         # Add more URLs here
     ]
     
-    print("🚗 Car Details Extractor")
-    print("=" * 50)
+    logger.info("🚗 Car Details Extractor")
+    logger.info("=" * 50)
     
     if len(example_urls) > 1:
-        print("📋 Extracting from multiple URLs...")
+        logger.info("📋 Extracting from multiple URLs...")
         results = extractor.extract_multiple_urls(example_urls)
         
         if results:
@@ -292,11 +164,12 @@ def main():
             extractor.save_to_json(results, 'extracted_cars.json')
             
             # Print summary
-            print(f"\n📊 Extraction Summary:")
-            print(f"✅ Successful: {len(results)}")
-            print(f"❌ Failed: {len(example_urls) - len(results)}")
+            logger.info("📊 Extraction Summary:")
+            logger.info("✅ Successful: %s", len(results))
+            failed = len(example_urls) - len(results)
+            logger.log(logging.ERROR if failed else logging.INFO, "❌ Failed: %s", failed)
     else:
-        print("🔍 Single URL extraction...")
+        logger.info("🔍 Single URL extraction...")
         url = example_urls[0] if example_urls else input("Enter URL to extract from: ")
         
         if url:
@@ -304,7 +177,7 @@ def main():
             if car_data:
                 extractor.save_to_json(car_data, 'extracted_car_details.json')
             else:
-                print("❌ Extraction failed")
+                logger.error("❌ Extraction failed")
 
 if __name__ == "__main__":
     main()
@@ -7,18 +7,65 @@ from urllib.parse import urljoin, urlparse
 import logging
 from typing import Dict, List, Optional, Any
 import os
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from contextlib import ExitStack, contextmanager
+from image_filter import select_gallery_images
+from instrumentation import span
+from log_config import setup_logging
+from profiling import profiled
+from resource_governor import governor
+from debug_capture import capture
+from template_cache import template_cache
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+LISTING_ID_PATTERN = re.compile(r'/listing/(\d+)')
+
+# The listing endpoint the TradeMe web app itself calls
+TRADEME_LISTING_API_URL = 'https://api.trademe.co.nz/v1/listings/{listing_id}.json?return_member_profile=true'
+TRADEME_LISTING_JSON_PATTERN = re.compile(r'api\.trademe\.co\.nz/v1/listings/\d+\.json')
+TRADEME_API_HEADERS = {
+    'Accept': 'application/json',
+    'Origin': 'https://www.trademe.co.nz',
+    'Referer': 'https://www.trademe.co.nz/',
+}
+
+# Listing attribute Name/DisplayName (lower-cased, letters only) -> car_data field
+LISTING_ATTRIBUTE_FIELDS = {
+    'year': 'year',
+    'kilometres': 'kilometers',
+    'odometer': 'kilometers',
+    'transmission': 'transmission',
+    'fuel': 'fuel_type',
+    'fueltype': 'fuel_type',
+    'bodystyle': 'body_type',
+    'body': 'body_type',
+    'enginesize': 'engine_capacity',
+    'engine': 'engine_capacity',
+    'cylinders': 'cylinders',
+    'doors': 'doors',
+    'seats': 'seats',
+    'exteriorcolour': 'exterior_colour',
+    'numberplate': 'number_plate',
+    'importhistory': 'import_history',
+    'onroadcosts': 'on_road_costs',
+    'isnew': 'condition',
+    'condition': 'condition',
+}
+
+
+def _parse_api_date(value):
+    """Convert the API's /Date(1693000000000)/ format to 'YYYY-MM-DD HH:MM:SS'"""
+    match = re.search(r'/Date\((\d+)', value or '')
+    if not match:
+        return value or ''
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(int(match.group(1)) / 1000))
+
 class TradeMeScraper:
-    def __init__(self):
+    def __init__(self, session: Optional[requests.Session] = None):
+        if session is not None:
+            # Shared with the extraction engine, which sets its own headers
+            self.session = session
+            return
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -29,57 +76,100 @@ class TradeMeScraper:
             'Upgrade-Insecure-Requests': '1',
         })
         
-    def get_selenium_driver(self):
-        """Get a Selenium WebDriver instance"""
+    def get_selenium_driver(self, capture_network=False):
+        """
+        Get a lean headless Selenium WebDriver instance (DOM only, no assets).
+        capture_network turns on performance logging so network responses
+        can be read back through CDP.
+        """
+        # Imported here so the requests-only paths never load Selenium
+        from browser import create_lean_driver
+        
         try:
-            chrome_options = Options()
-            chrome_options.add_argument('--headless')  # Run in headless mode
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-            
-            driver = webdriver.Chrome(options=chrome_options)
-            return driver
+            # We only read the DOM: skip images, CSS, fonts and trackers
+            return create_lean_driver(capture_network)
         except Exception as e:
-            logger.error(f"Failed to create Selenium driver: {e}")
+            logger.error("Failed to create Selenium driver: %s", e)
             return None
     
+    @contextmanager
+    def _browser(self, capture_network=False):
+        """
+        A driver for one page: borrowed from the process's warm pool when
+        there is one (the daemon), otherwise started here and quit after.
+        Yields None if no browser could be started.
+        """
+        from browser import driver_pool, quit_driver
+        
+        pool = driver_pool()
+        if pool is not None:
+            with ExitStack() as stack:
+                # Only the checkout is timed, not the page work done with it
+                with span('browser_start', pooled=True):
+                    driver = stack.enter_context(pool.driver())
+                yield driver
+            return
+        
+        with span('browser_start'):
+            driver = self.get_selenium_driver(capture_network)
+        try:
+            yield driver
+        finally:
+            if driver:
+                quit_driver(driver)
+                logger.info("Selenium driver closed")
+    
     def extract_car_listing_selenium(self, url: str) -> Dict[str, Any]:
         """
         Extract car listing data using Selenium to get rendered HTML
         """
-        driver = None
         try:
-            logger.info(f"Extracting data using Selenium from: {url}")
-            driver = self.get_selenium_driver()
-            
-            if not driver:
-                logger.error("Failed to create Selenium driver")
-                return {
-                    'url': url,
-                    'error': 'Failed to create Selenium driver',
-                    'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
-                }
-            
-            # Navigate to the page
-            driver.get(url)
+            logger.info("Extracting data using Selenium from: %s", url)
+            with self._browser() as driver:
+                if not driver:
+                    logger.error("Failed to create Selenium driver")
+                    return {
+                        'url': url,
+                        'error': 'Failed to create Selenium driver',
+                        'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
+                    }
+                
+                with governor.request(), span('fetch', site='trademe', mode='browser'):
+                    # Navigate to the page
+                    driver.get(url)
+                
+                    # Wait for the page to load
+                    time.sleep(5)
+                
+                car_data = self.scrape_rendered_page(driver, url)
             
-            # Wait for the page to load
-            time.sleep(5)
+            logger.info("Successfully extracted data using Selenium for: %s", car_data.get('title', 'Unknown'))
+            return car_data
             
+        except Exception as e:
+            logger.error("Error extracting data with Selenium from %s: %s", url, str(e))
+            return {
+                'url': url,
+                'error': str(e),
+                'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
+            }
+    
+    def scrape_rendered_page(self, driver, url: str) -> Dict[str, Any]:
+        """
+        Scrape car listing data from the page the driver has rendered
+        """
+        from selenium.webdriver.common.by import By
+        
+        with span('parse', site='trademe', mode='browser'):
             # Get the rendered HTML
             html_content = driver.page_source
-            
-            # Save the rendered HTML
-            with open('trademe_selenium_rendered.html', 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            logger.info("Selenium rendered HTML saved to trademe_selenium_rendered.html")
-            
+        
+            # Keep a copy of the rendered HTML if debug capture is enabled
+            capture('trademe_selenium_rendered', html_content, url=url)
+        
             # Parse with BeautifulSoup
             soup = BeautifulSoup(html_content, 'html.parser')
-            
+        
             # Initialize data structure
             car_data = {
                 'url': url,
@@ -99,7 +189,7 @@ class TradeMeScraper:
                 'features': [],
                 'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
             }
-            
+        
             # Try to find the title
             title_selectors = [
                 'h1[class*="title"]',
@@ -107,17 +197,17 @@ class TradeMeScraper:
                 'h1',
                 'title'
             ]
-            
+        
             for selector in title_selectors:
                 try:
                     title_elem = driver.find_element(By.CSS_SELECTOR, selector)
                     if title_elem:
                         car_data['title'] = title_elem.text.strip()
-                        logger.info(f"Found title with selector '{selector}': {car_data['title']}")
+                        logger.debug("Found title with selector '%s': %s", selector, car_data['title'])
                         break
                 except:
                     continue
-            
+        
             # Try to find the price
             price_selectors = [
                 '[class*="price"]',
@@ -125,7 +215,7 @@ class TradeMeScraper:
                 'span:contains("$")',
                 'div:contains("$")'
             ]
-            
+        
             for selector in price_selectors:
                 try:
                     price_elem = driver.find_element(By.CSS_SELECTOR, selector)
@@ -133,57 +223,57 @@ class TradeMeScraper:
                         price_text = price_elem.text.strip()
                         if '$' in price_text or 'NZD' in price_text:
                             car_data['price'] = price_text
-                            logger.info(f"Found price with selector '{selector}': {price_text}")
+                            logger.debug("Found price with selector '%s': %s", selector, price_text)
                             break
                 except:
                     continue
-            
+        
             # Look for key details
             # Try to find any text that contains car specifications
             page_text = driver.page_source.lower()
-            
+        
             # Extract year
             year_match = re.search(r'(\d{4})\s*(?:year|model|registration)', page_text)
             if year_match:
                 car_data['year'] = year_match.group(1)
-                logger.info(f"Found year: {car_data['year']}")
-            
+                logger.debug("Found year: %s", car_data['year'])
+        
             # Extract kilometers
             km_match = re.search(r'(\d{1,3}(?:,\d{3})*)\s*(?:km|kilometres|kilometers)', page_text)
             if km_match:
                 car_data['kilometers'] = km_match.group(1)
-                logger.info(f"Found kilometers: {car_data['kilometers']}")
-            
+                logger.debug("Found kilometers: %s", car_data['kilometers'])
+        
             # Extract transmission
             if 'automatic' in page_text:
                 car_data['transmission'] = 'Automatic'
-                logger.info("Found transmission: Automatic")
+                logger.debug("Found transmission: Automatic")
             elif 'manual' in page_text:
                 car_data['transmission'] = 'Manual'
-                logger.info("Found transmission: Manual")
-            
+                logger.debug("Found transmission: Manual")
+        
             # Extract fuel type
             fuel_types = ['petrol', 'diesel', 'electric', 'hybrid', 'gas']
             for fuel in fuel_types:
                 if fuel in page_text:
                     car_data['fuel_type'] = fuel.title()
-                    logger.info(f"Found fuel type: {car_data['fuel_type']}")
+                    logger.debug("Found fuel type: %s", car_data['fuel_type'])
                     break
-            
+        
             # Extract body type
             body_types = ['hatchback', 'sedan', 'suv', 'wagon', 'coupe', 'convertible']
             for body in body_types:
                 if body in page_text:
                     car_data['body_type'] = body.title()
-                    logger.info(f"Found body type: {car_data['body_type']}")
+                    logger.debug("Found body type: %s", car_data['body_type'])
                     break
-            
+        
             # Extract engine capacity
             engine_match = re.search(r'(\d{1,3}(?:\.\d)?)\s*(?:cc|l|litre)', page_text)
             if engine_match:
                 car_data['engine_capacity'] = f"{engine_match.group(1)}cc"
-                logger.info(f"Found engine capacity: {car_data['engine_capacity']}")
-            
+                logger.debug("Found engine capacity: %s", car_data['engine_capacity'])
+        
             # Extract condition
             if 'new' in page_text:
                 car_data['condition'] = 'New'
@@ -191,15 +281,15 @@ class TradeMeScraper:
                 car_data['condition'] = 'Used'
             else:
                 car_data['condition'] = 'Unknown'
-            logger.info(f"Found condition: {car_data['condition']}")
-            
+            logger.debug("Found condition: %s", car_data['condition'])
+        
             # Try to find seller information
             seller_selectors = [
                 '[class*="seller"]',
                 '[class*="dealer"]',
                 '[class*="contact"]'
             ]
-            
+        
             for selector in seller_selectors:
                 try:
                     seller_elem = driver.find_element(By.CSS_SELECTOR, selector)
@@ -207,18 +297,18 @@ class TradeMeScraper:
                         seller_text = seller_elem.text.strip()
                         if seller_text and len(seller_text) < 100:  # Reasonable length for seller name
                             car_data['seller_name'] = seller_text
-                            logger.info(f"Found seller: {car_data['seller_name']}")
+                            logger.debug("Found seller: %s", car_data['seller_name'])
                             break
                 except:
                     continue
-            
+        
             # Try to find description
             desc_selectors = [
                 '[class*="description"]',
                 '[class*="details"]',
                 'p'
             ]
-            
+        
             for selector in desc_selectors:
                 try:
                     desc_elem = driver.find_element(By.CSS_SELECTOR, selector)
@@ -226,173 +316,327 @@ class TradeMeScraper:
                         desc_text = desc_elem.text.strip()
                         if desc_text and len(desc_text) > 20:  # Reasonable length for description
                             car_data['description'] = desc_text[:500]  # Limit length
-                            logger.info(f"Found description: {desc_text[:100]}...")
+                            logger.debug("Found description: %.100s...", desc_text)
                             break
                 except:
                     continue
-            
+        
             # Extract images
             try:
                 img_elements = driver.find_elements(By.TAG_NAME, 'img')
+                raw_images = []
                 for img in img_elements:
                     src = img.get_attribute('src')
                     alt = img.get_attribute('alt')
                     if src and 'trademe' in src.lower():
-                        car_data['images'].append({
+                        raw_images.append({
                             'src': src,
-                            'alt': alt or ''
+                            'alt': alt or '',
+                            'width': img.get_attribute('naturalWidth'),
+                            'height': img.get_attribute('naturalHeight')
                         })
-                logger.info(f"Found {len(car_data['images'])} images")
+                # Drop logos/thumbnails and keep one full-size copy per photo
+                car_data['images'] = select_gallery_images(raw_images)
+                logger.info("Found %s gallery images (%s candidates)", len(car_data['images']), len(raw_images))
             except Exception as e:
-                logger.warning(f"Failed to extract images: {e}")
-            
-            logger.info(f"Successfully extracted data using Selenium for: {car_data.get('title', 'Unknown')}")
-            return car_data
-            
-        except Exception as e:
-            logger.error(f"Error extracting data with Selenium from {url}: {str(e)}")
+                logger.warning("Failed to extract images: %s", e)
+        
+        return car_data
+    
+    def extract_car_listing_network(self, url: str, allow_browser: bool = True) -> Dict[str, Any]:
+        """
+        Extract car listing data from TradeMe's own listing JSON instead of the
+        rendered DOM. Calls the listing API directly first; if that is refused,
+        loads the page in a lean browser and captures the JSON response the
+        SPA fetches for itself (via CDP performance logs).
+        """
+        listing_id = self._listing_id_from_url(url)
+        if not listing_id:
             return {
                 'url': url,
-                'error': str(e),
+                'error': 'Could not find a listing ID in the URL',
                 'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
             }
-        finally:
-            if driver:
-                driver.quit()
-                logger.info("Selenium driver closed")
+        
+        listing = self._fetch_listing_json(listing_id)
+        source = 'api'
+        if listing is None and allow_browser:
+            listing = self._capture_listing_json(url, listing_id)
+            source = 'network'
+        
+        if listing is None:
+            return {
+                'url': url,
+                'error': 'Listing JSON not available',
+                'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
+            }
+        
+        with span('map', site='trademe', mode=source):
+            car_data = self._map_listing_json(listing, url)
+        car_data['source'] = source
+        logger.info("Extracted listing %s from %s JSON: %s", listing_id, source, car_data['title'])
+        return car_data
+    
+    @staticmethod
+    def _listing_id_from_url(url: str) -> Optional[str]:
+        match = LISTING_ID_PATTERN.search(urlparse(url).path)
+        return match.group(1) if match else None
+    
+    def _fetch_listing_json(self, listing_id: str) -> Optional[Dict[str, Any]]:
+        """Call the listing endpoint the TradeMe SPA uses; None if refused"""
+        try:
+            with governor.request(), span('fetch', site='trademe', mode='api'):
+                response = self.session.get(
+                    TRADEME_LISTING_API_URL.format(listing_id=listing_id),
+                    headers=TRADEME_API_HEADERS,
+                    timeout=15
+                )
+            if response.status_code != 200:
+                logger.info("Listing API returned %s for %s", response.status_code, listing_id)
+                return None
+            listing = response.json()
+            return listing if listing.get('ListingId') else None
+        except (requests.RequestException, ValueError) as e:
+            logger.info("Listing API call failed for %s: %s", listing_id, e)
+            return None
+    
+    def _capture_listing_json(self, url: str, listing_id: str, timeout: float = 15) -> Optional[Dict[str, Any]]:
+        """
+        Load the listing page and pick the listing JSON out of the browser's
+        network traffic, returning as soon as it arrives instead of waiting a
+        fixed time for the DOM to render.
+        """
+        try:
+            with self._browser(capture_network=True) as driver:
+                if not driver:
+                    return None
+                
+                with governor.request(), span('fetch', site='trademe', mode='network'):
+                    driver.get(url)
+                    # The body can only be read once the response has finished
+                    # loading, which may be several log polls after its headers
+                    candidates = set()
+                    deadline = time.time() + timeout
+                    while time.time() < deadline:
+                        for entry in driver.get_log('performance'):
+                            message = json.loads(entry['message'])['message']
+                            method = message.get('method')
+                            params = message.get('params', {})
+                            if method == 'Network.responseReceived':
+                                response_url = params['response']['url']
+                                if TRADEME_LISTING_JSON_PATTERN.search(response_url) and listing_id in response_url:
+                                    candidates.add(params['requestId'])
+                            elif method == 'Network.loadingFinished' and params.get('requestId') in candidates:
+                                candidates.discard(params['requestId'])
+                                try:
+                                    body = driver.execute_cdp_cmd('Network.getResponseBody',
+                                                                  {'requestId': params['requestId']})
+                                    listing = json.loads(body['body'])
+                                except Exception as e:
+                                    logger.debug("Could not read listing JSON response %s: %s", params['requestId'], e)
+                                    continue
+                                if isinstance(listing, dict) and listing.get('ListingId'):
+                                    return listing
+                        time.sleep(0.25)
+            
+            logger.warning("Listing JSON for %s not seen within %ss", listing_id, timeout)
+            return None
+        except Exception as e:
+            logger.error("Error capturing listing JSON from %s: %s", url, e)
+            return None
+    
+    def _map_listing_json(self, listing: Dict[str, Any], url: str) -> Dict[str, Any]:
+        """Map TradeMe listing JSON to the same structure the DOM extractors return"""
+        car_data = {
+            'url': url,
+            'title': listing.get('Title', ''),
+            'price': listing.get('PriceDisplay', ''),
+            'year': '',
+            'kilometers': '',
+            'transmission': '',
+            'fuel_type': '',
+            'body_type': '',
+            'engine_capacity': '',
+            'condition': '',
+            'seller_name': '',
+            'location': '',
+            'description': listing.get('Body', ''),
+            'images': [],
+            'features': [],
+            'listed_on': _parse_api_date(listing.get('StartDate')),
+            'currency': 'NZD',
+            'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        
+        for attribute in listing.get('Attributes', []):
+            for key in (attribute.get('Name'), attribute.get('DisplayName')):
+                field = LISTING_ATTRIBUTE_FIELDS.get(re.sub(r'[^a-z]', '', (key or '').lower()))
+                if field:
+                    value = attribute.get('Value')
+                    if field == 'condition' and isinstance(value, bool):
+                        value = 'New' if value else 'Used'
+                    car_data[field] = str(value) if value is not None else ''
+                    break
+        
+        if not car_data['condition'] and 'IsNew' in listing:
+            car_data['condition'] = 'New' if listing['IsNew'] else 'Used'
+        
+        # Numeric prices for the form-field mapping
+        for price_key, field in (('StartPrice', 'starting_price'), ('BuyNowPrice', 'buy_price')):
+            if listing.get(price_key):
+                car_data[field] = f"{listing[price_key]:,.0f}"
+        
+        member = listing.get('Member') or {}
+        dealer = listing.get('Dealership') or listing.get('Agency') or {}
+        car_data['seller_name'] = dealer.get('Name') or member.get('Nickname', '')
+        car_data['location'] = ', '.join(part for part in (listing.get('Suburb'), listing.get('Region')) if part)
+        
+        photos = []
+        for photo in listing.get('Photos', []):
+            sizes = photo.get('Value', {})
+            src = sizes.get('FullSize') or sizes.get('Large') or sizes.get('Gallery')
+            if src:
+                photos.append({'src': src, 'alt': car_data['title']})
+        car_data['images'] = select_gallery_images(photos)
+        
+        return car_data
     
     def extract_car_listing(self, url: str) -> Dict[str, Any]:
         """
         Extract car listing data from a TradeMe URL
         """
         try:
-            logger.info(f"Extracting data from: {url}")
-            response = self.session.get(url)
-            response.raise_for_status()
+            logger.info("Extracting data from: %s", url)
+            with governor.request(), span('fetch', site='trademe'):
+                response = self.session.get(url)
+                response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            with span('parse', site='trademe'):
+                soup = BeautifulSoup(response.content, 'html.parser')
             
-            # Initialize data structure
-            car_data = {
-                'url': url,
-                'title': '',
-                'price': '',
-                'year': '',
-                'kilometers': '',
-                'transmission': '',
-                'fuel_type': '',
-                'body_type': '',
-                'engine_capacity': '',
-                'condition': '',
-                'seller_name': '',
-                'location': '',
-                'description': '',
-                'images': [],
-                'features': [],
-                'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
-            }
+                # Initialize data structure
+                car_data = {
+                    'url': url,
+                    'title': '',
+                    'price': '',
+                    'year': '',
+                    'kilometers': '',
+                    'transmission': '',
+                    'fuel_type': '',
+                    'body_type': '',
+                    'engine_capacity': '',
+                    'condition': '',
+                    'seller_name': '',
+                    'location': '',
+                    'description': '',
+                    'images': [],
+                    'features': [],
+                    'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
+                }
             
-            # Extract title
-            title_elem = soup.find('h1', class_='tm-motors-listing__title')
-            if title_elem:
-                car_data['title'] = title_elem.get_text(strip=True)
-            
-            # Extract price
-            price_elem = soup.find('span', class_='tm-motors-listing__price')
-            if price_elem:
-                car_data['price'] = price_elem.get_text(strip=True)
-            
-            # Extract key details from the listing details section
-            details_section = soup.find('div', class_='tm-motors-listing__details')
-            if details_section:
-                # Extract year
-                year_elem = details_section.find('span', string=re.compile(r'Year'))
-                if year_elem:
-                    year_text = year_elem.find_next_sibling()
-                    if year_text:
-                        car_data['year'] = year_text.get_text(strip=True)
+                # Extract title
+                title_elem = soup.find('h1', class_='tm-motors-listing__title')
+                if title_elem:
+                    car_data['title'] = title_elem.get_text(strip=True)
+            
+                # Extract price
+                price_elem = soup.find('span', class_='tm-motors-listing__price')
+                if price_elem:
+                    car_data['price'] = price_elem.get_text(strip=True)
+            
+                # Extract key details from the listing details section
+                details_section = soup.find('div', class_='tm-motors-listing__details')
+                if details_section:
+                    # Extract year
+                    year_elem = details_section.find('span', string=re.compile(r'Year'))
+                    if year_elem:
+                        year_text = year_elem.find_next_sibling()
+                        if year_text:
+                            car_data['year'] = year_text.get_text(strip=True)
                 
-                # Extract kilometers
-                km_elem = details_section.find('span', string=re.compile(r'Kilometres|KMs'))
-                if km_elem:
-                    km_text = km_elem.find_next_sibling()
-                    if km_text:
-                        car_data['kilometers'] = km_text.get_text(strip=True)
+                    # Extract kilometers
+                    km_elem = details_section.find('span', string=re.compile(r'Kilometres|KMs'))
+                    if km_elem:
+                        km_text = km_elem.find_next_sibling()
+                        if km_text:
+                            car_data['kilometers'] = km_text.get_text(strip=True)
                 
-                # Extract transmission
-                trans_elem = details_section.find('span', string=re.compile(r'Transmission'))
-                if trans_elem:
-                    trans_text = trans_elem.find_next_sibling()
-                    if trans_text:
-                        car_data['transmission'] = trans_text.get_text(strip=True)
+                    # Extract transmission
+                    trans_elem = details_section.find('span', string=re.compile(r'Transmission'))
+                    if trans_elem:
+                        trans_text = trans_elem.find_next_sibling()
+                        if trans_text:
+                            car_data['transmission'] = trans_text.get_text(strip=True)
                 
-                # Extract fuel type
-                fuel_elem = details_section.find('span', string=re.compile(r'Fuel'))
-                if fuel_elem:
-                    fuel_text = fuel_elem.find_next_sibling()
-                    if fuel_text:
-                        car_data['fuel_type'] = fuel_text.get_text(strip=True)
+                    # Extract fuel type
+                    fuel_elem = details_section.find('span', string=re.compile(r'Fuel'))
+                    if fuel_elem:
+                        fuel_text = fuel_elem.find_next_sibling()
+                        if fuel_text:
+                            car_data['fuel_type'] = fuel_text.get_text(strip=True)
                 
-                # Extract body type
-                body_elem = details_section.find('span', string=re.compile(r'Body'))
-                if body_elem:
-                    body_text = body_elem.find_next_sibling()
-                    if body_text:
-                        car_data['body_type'] = body_text.get_text(strip=True)
+                    # Extract body type
+                    body_elem = details_section.find('span', string=re.compile(r'Body'))
+                    if body_elem:
+                        body_text = body_elem.find_next_sibling()
+                        if body_text:
+                            car_data['body_type'] = body_text.get_text(strip=True)
                 
-                # Extract engine capacity
-                engine_elem = details_section.find('span', string=re.compile(r'Engine'))
-                if engine_elem:
-                    engine_text = engine_elem.find_next_sibling()
-                    if engine_text:
-                        car_data['engine_capacity'] = engine_text.get_text(strip=True)
-            
-            # Extract condition
-            condition_elem = soup.find('span', class_='tm-motors-listing__condition')
-            if condition_elem:
-                car_data['condition'] = condition_elem.get_text(strip=True)
-            
-            # Extract seller information
-            seller_elem = soup.find('div', class_='tm-motors-listing__seller')
-            if seller_elem:
-                seller_name_elem = seller_elem.find('span', class_='tm-motors-listing__seller-name')
-                if seller_name_elem:
-                    car_data['seller_name'] = seller_name_elem.get_text(strip=True)
+                    # Extract engine capacity
+                    engine_elem = details_section.find('span', string=re.compile(r'Engine'))
+                    if engine_elem:
+                        engine_text = engine_elem.find_next_sibling()
+                        if engine_text:
+                            car_data['engine_capacity'] = engine_text.get_text(strip=True)
+            
+                # Extract condition
+                condition_elem = soup.find('span', class_='tm-motors-listing__condition')
+                if condition_elem:
+                    car_data['condition'] = condition_elem.get_text(strip=True)
+            
+                # Extract seller information
+                seller_elem = soup.find('div', class_='tm-motors-listing__seller')
+                if seller_elem:
+                    seller_name_elem = seller_elem.find('span', class_='tm-motors-listing__seller-name')
+                    if seller_name_elem:
+                        car_data['seller_name'] = seller_name_elem.get_text(strip=True)
                 
-                location_elem = seller_elem.find('span', class_='tm-motors-listing__location')
-                if location_elem:
-                    car_data['location'] = location_elem.get_text(strip=True)
-            
-            # Extract description
-            desc_elem = soup.find('div', class_='tm-motors-listing__description')
-            if desc_elem:
-                car_data['description'] = desc_elem.get_text(strip=True)
-            
-            # Extract images
-            image_elements = soup.find_all('img', class_='tm-motors-listing__image')
-            for img in image_elements:
-                src = img.get('src')
-                alt = img.get('alt', '')
-                if src:
-                    car_data['images'].append({
-                        'src': urljoin(url, src),
-                        'alt': alt
-                    })
-            
-            # Extract features
-            features_section = soup.find('div', class_='tm-motors-listing__features')
-            if features_section:
-                feature_elements = features_section.find_all('li')
-                for feature in feature_elements:
-                    feature_text = feature.get_text(strip=True)
-                    if feature_text:
-                        car_data['features'].append(feature_text)
-            
-            logger.info(f"Successfully extracted data for: {car_data['title']}")
+                    location_elem = seller_elem.find('span', class_='tm-motors-listing__location')
+                    if location_elem:
+                        car_data['location'] = location_elem.get_text(strip=True)
+            
+                # Extract description
+                desc_elem = soup.find('div', class_='tm-motors-listing__description')
+                if desc_elem:
+                    car_data['description'] = desc_elem.get_text(strip=True)
+            
+                # Extract images
+                image_elements = soup.find_all('img', class_='tm-motors-listing__image')
+                raw_images = []
+                for img in image_elements:
+                    src = img.get('src')
+                    alt = img.get('alt', '')
+                    if src:
+                        raw_images.append({
+                            'src': urljoin(url, src),
+                            'alt': alt
+                        })
+                car_data['images'] = select_gallery_images(raw_images)
+            
+                # Extract features
+                features_section = soup.find('div', class_='tm-motors-listing__features')
+                if features_section:
+                    feature_elements = features_section.find_all('li')
+                    for feature in feature_elements:
+                        feature_text = feature.get_text(strip=True)
+                        if feature_text:
+                            car_data['features'].append(feature_text)
+            
+            logger.info("Successfully extracted data for: %s", car_data['title'])
             return car_data
             
         except Exception as e:
-            logger.error(f"Error extracting data from {url}: {str(e)}")
+            logger.error("Error extracting data from %s: %s", url, str(e))
             return {
                 'url': url,
                 'error': str(e),
@@ -404,7 +648,7 @@ class TradeMeScraper:
         Extract car listing data from a TradeMe URL with the specific form fields structure
         """
         try:
-            logger.info(f"Extracting form field data from: {url}")
+            logger.info("Extracting form field data from: %s", url)
             
             # Try different headers to get a cleaner response
             headers = {
@@ -418,322 +662,317 @@ class TradeMeScraper:
                 'Pragma': 'no-cache'
             }
             
-            response = self.session.get(url, headers=headers)
-            response.raise_for_status()
-            
-            # Save raw HTML for debugging
-            with open('trademe_raw_page.html', 'w', encoding='utf-8') as f:
-                f.write(response.text)
-            logger.info("Raw HTML saved to trademe_raw_page.html")
+            with governor.request(), span('fetch', site='trademe', mode='form_fields'):
+                response = self.session.get(url, headers=headers)
+                response.raise_for_status()
             
-            # Also save the response content as bytes for debugging
-            with open('trademe_response_bytes.txt', 'wb') as f:
-                f.write(response.content)
-            logger.info("Response bytes saved to trademe_response_bytes.txt")
+            # Keep the raw response if debug capture is enabled
+            capture('trademe_response_bytes', response.content, ext='.txt', url=url,
+                    content_type=response.headers.get('content-type'))
             
             # Check content type and encoding
-            logger.info(f"Content-Type: {response.headers.get('content-type', 'unknown')}")
-            logger.info(f"Content-Encoding: {response.headers.get('content-encoding', 'none')}")
-            logger.info(f"Response length: {len(response.content)} bytes")
+            logger.debug("Content-Type: %s", response.headers.get('content-type', 'unknown'))
+            logger.debug("Content-Encoding: %s", response.headers.get('content-encoding', 'none'))
+            logger.debug("Response length: %s bytes", len(response.content))
             
-            # Try to decode with different encodings
-            try:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                logger.info("Successfully parsed with html.parser")
-            except Exception as e:
-                logger.warning(f"Failed to parse with html.parser: {e}")
+            with span('parse', site='trademe', mode='form_fields'):
+                # Try to decode with different encodings
                 try:
-                    # Try with lxml parser
-                    soup = BeautifulSoup(response.content, 'lxml')
-                    logger.info("Successfully parsed with lxml parser")
-                except Exception as e2:
-                    logger.warning(f"Failed to parse with lxml parser: {e2}")
-                    # Try to decode manually
+                    soup = BeautifulSoup(response.content, 'html.parser')
+                    logger.debug("Successfully parsed with html.parser")
+                except Exception as e:
+                    logger.warning("Failed to parse with html.parser: %s", e)
                     try:
-                        decoded_content = response.content.decode('utf-8', errors='ignore')
-                        soup = BeautifulSoup(decoded_content, 'html.parser')
-                        logger.info("Successfully parsed with manual UTF-8 decode")
-                    except Exception as e3:
-                        logger.error(f"All parsing methods failed: {e3}")
-                        return {
-                            'url': url,
-                            'error': f"Failed to parse HTML: {e3}",
-                            'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
-                        }
-            
-            # Initialize data structure based on the form fields shown in the image
-            car_data = {
-                'url': url,
-                'kilometer': '',
-                'fuel': '',
-                'engine_cc': '',
-                'body_type': '',
-                'transmission': '',
-                'cylinders': '',
-                'year': '',
-                'number_plate': '',
-                'exterior_colour': '',
-                'doors': '',
-                'import_history': '',
-                'ask_price': '',
-                'overall_safety': '',
-                'buy_price': '',
-                'starting_price': '',
-                'on_road_costs': '',
-                'seats': '',
-                'energy_economy': '',
-                'carbon_emissions': '',
-                'source_link': url,
-                'driver_safety': '',
-                'listed_on': '',
-                'price': '',
-                'currency': 'NZD',
-                'tag': 'Car',
-                'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            # Try multiple approaches to find the title
-            title_elem = (
-                soup.find('h1', class_='tm-motors-listing__title') or
-                soup.find('h1') or
-                soup.find('title') or
-                soup.find('h1', class_='listing-title') or
-                soup.find('h1', class_='title')
-            )
-            if title_elem:
-                car_data['title'] = title_elem.get_text(strip=True)
-                logger.info(f"Found title: {car_data['title']}")
-            
-            # Try multiple approaches to find the price
-            price_elem = (
-                soup.find('span', class_='tm-motors-listing__price') or
-                soup.find('span', class_='price') or
-                soup.find('div', class_='price') or
-                soup.find('span', string=re.compile(r'\$|NZD|price', re.IGNORECASE)) or
-                soup.find('div', string=re.compile(r'\$|NZD|price', re.IGNORECASE))
-            )
-            if price_elem:
-                price_text = price_elem.get_text(strip=True)
-                car_data['price'] = price_text
-                logger.info(f"Found price: {price_text}")
-                # Try to extract numeric price
-                price_match = re.search(r'[\d,]+', price_text)
-                if price_match:
-                    car_data['starting_price'] = price_match.group()
-                    car_data['buy_price'] = price_match.group()
-                    car_data['ask_price'] = price_match.group()
-            
-            # Look for key details in various possible locations
-            # Try to find any section that might contain car details
-            details_sections = [
-                soup.find('div', class_='tm-motors-listing__details'),
-                soup.find('div', class_='listing-details'),
-                soup.find('div', class_='details'),
-                soup.find('div', class_='car-details'),
-                soup.find('div', class_='vehicle-details'),
-                soup.find('table'),
-                soup.find('ul', class_='details'),
-                soup.find('div', class_='specifications')
-            ]
-            
-            details_section = None
-            for section in details_sections:
-                if section:
-                    details_section = section
-                    logger.info(f"Found details section: {section.name} with class {section.get('class', 'no-class')}")
-                    break
+                        # Try with lxml parser
+                        soup = BeautifulSoup(response.content, 'lxml')
+                        logger.debug("Successfully parsed with lxml parser")
+                    except Exception as e2:
+                        logger.warning("Failed to parse with lxml parser: %s", e2)
+                        # Try to decode manually
+                        try:
+                            decoded_content = response.content.decode('utf-8', errors='ignore')
+                            soup = BeautifulSoup(decoded_content, 'html.parser')
+                            logger.debug("Successfully parsed with manual UTF-8 decode")
+                        except Exception as e3:
+                            logger.error("All parsing methods failed: %s", e3)
+                            return {
+                                'url': url,
+                                'error': f"Failed to parse HTML: {e3}",
+                                'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
+                            }
+            
+                # Initialize data structure based on the form fields shown in the image
+                car_data = {
+                    'url': url,
+                    'kilometer': '',
+                    'fuel': '',
+                    'engine_cc': '',
+                    'body_type': '',
+                    'transmission': '',
+                    'cylinders': '',
+                    'year': '',
+                    'number_plate': '',
+                    'exterior_colour': '',
+                    'doors': '',
+                    'import_history': '',
+                    'ask_price': '',
+                    'overall_safety': '',
+                    'buy_price': '',
+                    'starting_price': '',
+                    'on_road_costs': '',
+                    'seats': '',
+                    'energy_economy': '',
+                    'carbon_emissions': '',
+                    'source_link': url,
+                    'driver_safety': '',
+                    'listed_on': '',
+                    'price': '',
+                    'currency': 'NZD',
+                    'tag': 'Car',
+                    'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
+                }
             
-            if details_section:
-                # Extract year - try multiple patterns
-                year_patterns = [r'Year', r'Model Year', r'Registration Year']
-                for pattern in year_patterns:
-                    year_elem = details_section.find('span', string=re.compile(pattern, re.IGNORECASE))
-                    if year_elem:
-                        year_text = year_elem.find_next_sibling()
-                        if year_text:
-                            car_data['year'] = year_text.get_text(strip=True)
-                            logger.info(f"Found year: {car_data['year']}")
-                            break
+                # Pages sharing a template also share the selectors that work
+                # on them, so go straight to the ones that won last time
+                fingerprint = template_cache.fingerprint(soup)
+            
+                # Try multiple approaches to find the title
+                title_elem = template_cache.first_match(fingerprint, 'trademe.title', [
+                    lambda: soup.find('h1', class_='tm-motors-listing__title'),
+                    lambda: soup.find('h1'),
+                    lambda: soup.find('title'),
+                    lambda: soup.find('h1', class_='listing-title'),
+                    lambda: soup.find('h1', class_='title'),
+                ])
+                if title_elem:
+                    car_data['title'] = title_elem.get_text(strip=True)
+                    logger.debug("Found title: %s", car_data['title'])
+            
+                # Try multiple approaches to find the price
+                price_elem = template_cache.first_match(fingerprint, 'trademe.price', [
+                    lambda: soup.find('span', class_='tm-motors-listing__price'),
+                    lambda: soup.find('span', class_='price'),
+                    lambda: soup.find('div', class_='price'),
+                    lambda: soup.find('span', string=re.compile(r'\$|NZD|price', re.IGNORECASE)),
+                    lambda: soup.find('div', string=re.compile(r'\$|NZD|price', re.IGNORECASE)),
+                ])
+                if price_elem:
+                    price_text = price_elem.get_text(strip=True)
+                    car_data['price'] = price_text
+                    logger.debug("Found price: %s", price_text)
+                    # Try to extract numeric price
+                    price_match = re.search(r'[\d,]+', price_text)
+                    if price_match:
+                        car_data['starting_price'] = price_match.group()
+                        car_data['buy_price'] = price_match.group()
+                        car_data['ask_price'] = price_match.group()
+            
+                # Look for key details in various possible locations
+                # Try to find any section that might contain car details
+                details_section = template_cache.first_match(fingerprint, 'trademe.details', [
+                    lambda: soup.find('div', class_='tm-motors-listing__details'),
+                    lambda: soup.find('div', class_='listing-details'),
+                    lambda: soup.find('div', class_='details'),
+                    lambda: soup.find('div', class_='car-details'),
+                    lambda: soup.find('div', class_='vehicle-details'),
+                    lambda: soup.find('table'),
+                    lambda: soup.find('ul', class_='details'),
+                    lambda: soup.find('div', class_='specifications'),
+                ])
+                if details_section:
+                    logger.info("Found details section: %s with class %s", details_section.name, details_section.get('class', 'no-class'))
+            
+                if details_section:
+                    # Extract year - try multiple patterns
+                    year_patterns = [r'Year', r'Model Year', r'Registration Year']
+                    for pattern in year_patterns:
+                        year_elem = details_section.find('span', string=re.compile(pattern, re.IGNORECASE))
+                        if year_elem:
+                            year_text = year_elem.find_next_sibling()
+                            if year_text:
+                                car_data['year'] = year_text.get_text(strip=True)
+                                logger.debug("Found year: %s", car_data['year'])
+                                break
                 
-                # Extract kilometers - try multiple patterns
-                km_patterns = [r'Kilometres', r'KMs', r'Mileage', r'Odometer']
-                for pattern in km_patterns:
-                    km_elem = details_section.find('span', string=re.compile(pattern, re.IGNORECASE))
-                    if km_elem:
-                        km_text = km_elem.find_next_sibling()
-                        if km_text:
-                            km_value = km_text.get_text(strip=True)
-                            car_data['kilometer'] = km_value
-                            logger.info(f"Found kilometers: {km_value}")
-                            # Try to extract numeric value
-                            km_match = re.search(r'[\d,]+', km_value)
-                            if km_match:
-                                car_data['kilometer'] = km_match.group()
-                            break
+                    # Extract kilometers - try multiple patterns
+                    km_patterns = [r'Kilometres', r'KMs', r'Mileage', r'Odometer']
+                    for pattern in km_patterns:
+                        km_elem = details_section.find('span', string=re.compile(pattern, re.IGNORECASE))
+                        if km_elem:
+                            km_text = km_elem.find_next_sibling()
+                            if km_text:
+                                km_value = km_text.get_text(strip=True)
+                                car_data['kilometer'] = km_value
+                                logger.debug("Found kilometers: %s", km_value)
+                                # Try to extract numeric value
+                                km_match = re.search(r'[\d,]+', km_value)
+                                if km_match:
+                                    car_data['kilometer'] = km_match.group()
+                                break
                 
-                # Extract transmission
-                trans_elem = details_section.find('span', string=re.compile(r'Transmission', re.IGNORECASE))
-                if trans_elem:
-                    trans_text = trans_elem.find_next_sibling()
-                    if trans_text:
-                        car_data['transmission'] = trans_text.get_text(strip=True)
-                        logger.info(f"Found transmission: {car_data['transmission']}")
+                    # Extract transmission
+                    trans_elem = details_section.find('span', string=re.compile(r'Transmission', re.IGNORECASE))
+                    if trans_elem:
+                        trans_text = trans_elem.find_next_sibling()
+                        if trans_text:
+                            car_data['transmission'] = trans_text.get_text(strip=True)
+                            logger.debug("Found transmission: %s", car_data['transmission'])
                 
-                # Extract fuel type
-                fuel_elem = details_section.find('span', string=re.compile(r'Fuel', re.IGNORECASE))
-                if fuel_elem:
-                    fuel_text = fuel_elem.find_next_sibling()
-                    if fuel_text:
-                        car_data['fuel'] = fuel_text.get_text(strip=True)
-                        logger.info(f"Found fuel: {car_data['fuel']}")
+                    # Extract fuel type
+                    fuel_elem = details_section.find('span', string=re.compile(r'Fuel', re.IGNORECASE))
+                    if fuel_elem:
+                        fuel_text = fuel_elem.find_next_sibling()
+                        if fuel_text:
+                            car_data['fuel'] = fuel_text.get_text(strip=True)
+                            logger.debug("Found fuel: %s", car_data['fuel'])
                 
-                # Extract body type
-                body_elem = details_section.find('span', string=re.compile(r'Body', re.IGNORECASE))
-                if body_elem:
-                    body_text = body_elem.find_next_sibling()
-                    if body_text:
-                        car_data['body_type'] = body_text.get_text(strip=True)
-                        logger.info(f"Found body type: {car_data['body_type']}")
+                    # Extract body type
+                    body_elem = details_section.find('span', string=re.compile(r'Body', re.IGNORECASE))
+                    if body_elem:
+                        body_text = body_elem.find_next_sibling()
+                        if body_text:
+                            car_data['body_type'] = body_text.get_text(strip=True)
+                            logger.debug("Found body type: %s", car_data['body_type'])
                 
-                # Extract engine capacity
-                engine_elem = details_section.find('span', string=re.compile(r'Engine', re.IGNORECASE))
-                if engine_elem:
-                    engine_text = engine_elem.find_next_sibling()
-                    if engine_text:
-                        engine_value = engine_text.get_text(strip=True)
-                        car_data['engine_cc'] = engine_value
-                        logger.info(f"Found engine: {engine_value}")
-                        # Try to extract CC value
-                        cc_match = re.search(r'(\d+(?:,\d+)*)\s*cc', engine_value, re.IGNORECASE)
-                        if cc_match:
-                            car_data['engine_cc'] = cc_match.group(1)
+                    # Extract engine capacity
+                    engine_elem = details_section.find('span', string=re.compile(r'Engine', re.IGNORECASE))
+                    if engine_elem:
+                        engine_text = engine_elem.find_next_sibling()
+                        if engine_text:
+                            engine_value = engine_text.get_text(strip=True)
+                            car_data['engine_cc'] = engine_value
+                            logger.debug("Found engine: %s", engine_value)
+                            # Try to extract CC value
+                            cc_match = re.search(r'(\d+(?:,\d+)*)\s*cc', engine_value, re.IGNORECASE)
+                            if cc_match:
+                                car_data['engine_cc'] = cc_match.group(1)
                 
-                # Extract cylinders
-                cylinders_elem = details_section.find('span', string=re.compile(r'Cylinders', re.IGNORECASE))
-                if cylinders_elem:
-                    cylinders_text = cylinders_elem.find_next_sibling()
-                    if cylinders_text:
-                        car_data['cylinders'] = cylinders_text.get_text(strip=True)
-                        logger.info(f"Found cylinders: {car_data['cylinders']}")
+                    # Extract cylinders
+                    cylinders_elem = details_section.find('span', string=re.compile(r'Cylinders', re.IGNORECASE))
+                    if cylinders_elem:
+                        cylinders_text = cylinders_elem.find_next_sibling()
+                        if cylinders_text:
+                            car_data['cylinders'] = cylinders_text.get_text(strip=True)
+                            logger.debug("Found cylinders: %s", car_data['cylinders'])
                 
-                # Extract doors
-                doors_elem = details_section.find('span', string=re.compile(r'Doors', re.IGNORECASE))
-                if doors_elem:
-                    doors_text = doors_elem.find_next_sibling()
-                    if doors_text:
-                        car_data['doors'] = doors_text.get_text(strip=True)
-                        logger.info(f"Found doors: {car_data['doors']}")
+                    # Extract doors
+                    doors_elem = details_section.find('span', string=re.compile(r'Doors', re.IGNORECASE))
+                    if doors_elem:
+                        doors_text = doors_elem.find_next_sibling()
+                        if doors_text:
+                            car_data['doors'] = doors_text.get_text(strip=True)
+                            logger.debug("Found doors: %s", car_data['doors'])
                 
-                # Extract seats
-                seats_elem = details_section.find('span', string=re.compile(r'Seats', re.IGNORECASE))
-                if seats_elem:
-                    seats_text = seats_elem.find_next_sibling()
-                    if seats_text:
-                        car_data['seats'] = seats_text.get_text(strip=True)
-                        logger.info(f"Found seats: {car_data['seats']}")
+                    # Extract seats
+                    seats_elem = details_section.find('span', string=re.compile(r'Seats', re.IGNORECASE))
+                    if seats_elem:
+                        seats_text = seats_elem.find_next_sibling()
+                        if seats_text:
+                            car_data['seats'] = seats_text.get_text(strip=True)
+                            logger.debug("Found seats: %s", car_data['seats'])
                 
-                # Extract exterior colour
-                color_elem = details_section.find('span', string=re.compile(r'Colour|Color', re.IGNORECASE))
-                if color_elem:
-                    color_text = color_elem.find_next_sibling()
-                    if color_text:
-                        car_data['exterior_colour'] = color_text.get_text(strip=True)
-                        logger.info(f"Found color: {car_data['exterior_colour']}")
-            
-            # Try to find condition information
-            condition_elem = (
-                soup.find('span', class_='tm-motors-listing__condition') or
-                soup.find('span', class_='condition') or
-                soup.find('div', class_='condition')
-            )
-            if condition_elem:
-                condition_text = condition_elem.get_text(strip=True)
-                car_data['condition'] = condition_text
-                logger.info(f"Found condition: {condition_text}")
-                # Set default safety ratings based on condition
-                if 'new' in condition_text.lower():
-                    car_data['overall_safety'] = '5 Stars'
-                    car_data['energy_economy'] = '5 Stars'
-                    car_data['carbon_emissions'] = '5 Stars'
-                    car_data['driver_safety'] = '5 Stars'
-                elif 'used' in condition_text.lower():
-                    car_data['overall_safety'] = '4 Stars'
-                    car_data['energy_economy'] = '3 Stars'
-                    car_data['carbon_emissions'] = '3 Stars'
-                    car_data['driver_safety'] = '4 Stars'
-                else:
-                    car_data['overall_safety'] = '4 Stars'
-                    car_data['energy_economy'] = '0.5 Star'
-                    car_data['carbon_emissions'] = '0 Star'
-                    car_data['driver_safety'] = '0.5 Star'
-            
-            # Try to find seller information
-            seller_elem = (
-                soup.find('div', class_='tm-motors-listing__seller') or
-                soup.find('div', class_='seller') or
-                soup.find('div', class_='dealer') or
-                soup.find('div', class_='contact')
-            )
-            if seller_elem:
-                seller_name_elem = seller_elem.find('span', class_='tm-motors-listing__seller-name') or seller_elem.find('span', class_='name')
-                if seller_name_elem:
-                    car_data['seller_name'] = seller_name_elem.get_text(strip=True)
-                    logger.info(f"Found seller: {car_data['seller_name']}")
+                    # Extract exterior colour
+                    color_elem = details_section.find('span', string=re.compile(r'Colour|Color', re.IGNORECASE))
+                    if color_elem:
+                        color_text = color_elem.find_next_sibling()
+                        if color_text:
+                            car_data['exterior_colour'] = color_text.get_text(strip=True)
+                            logger.debug("Found color: %s", car_data['exterior_colour'])
+            
+                # Try to find condition information
+                condition_elem = template_cache.first_match(fingerprint, 'trademe.condition', [
+                    lambda: soup.find('span', class_='tm-motors-listing__condition'),
+                    lambda: soup.find('span', class_='condition'),
+                    lambda: soup.find('div', class_='condition'),
+                ])
+                if condition_elem:
+                    condition_text = condition_elem.get_text(strip=True)
+                    car_data['condition'] = condition_text
+                    logger.debug("Found condition: %s", condition_text)
+                    # Set default safety ratings based on condition
+                    if 'new' in condition_text.lower():
+                        car_data['overall_safety'] = '5 Stars'
+                        car_data['energy_economy'] = '5 Stars'
+                        car_data['carbon_emissions'] = '5 Stars'
+                        car_data['driver_safety'] = '5 Stars'
+                    elif 'used' in condition_text.lower():
+                        car_data['overall_safety'] = '4 Stars'
+                        car_data['energy_economy'] = '3 Stars'
+                        car_data['carbon_emissions'] = '3 Stars'
+                        car_data['driver_safety'] = '4 Stars'
+                    else:
+                        car_data['overall_safety'] = '4 Stars'
+                        car_data['energy_economy'] = '0.5 Star'
+                        car_data['carbon_emissions'] = '0 Star'
+                        car_data['driver_safety'] = '0.5 Star'
+            
+                # Try to find seller information
+                seller_elem = template_cache.first_match(fingerprint, 'trademe.seller', [
+                    lambda: soup.find('div', class_='tm-motors-listing__seller'),
+                    lambda: soup.find('div', class_='seller'),
+                    lambda: soup.find('div', class_='dealer'),
+                    lambda: soup.find('div', class_='contact'),
+                ])
+                if seller_elem:
+                    seller_name_elem = seller_elem.find('span', class_='tm-motors-listing__seller-name') or seller_elem.find('span', class_='name')
+                    if seller_name_elem:
+                        car_data['seller_name'] = seller_name_elem.get_text(strip=True)
+                        logger.debug("Found seller: %s", car_data['seller_name'])
                 
-                location_elem = seller_elem.find('span', class_='tm-motors-listing__location') or seller_elem.find('span', class_='location')
-                if location_elem:
-                    car_data['location'] = location_elem.get_text(strip=True)
-                    logger.info(f"Found location: {car_data['location']}")
-            
-            # Try to find description
-            desc_elem = (
-                soup.find('div', class_='tm-motors-listing__description') or
-                soup.find('div', class_='description') or
-                soup.find('div', class_='listing-description')
-            )
-            if desc_elem:
-                car_data['description'] = desc_elem.get_text(strip=True)
-                logger.info(f"Found description: {car_data['description'][:100]}...")
-            
-            # Try to find listing date
-            date_elem = (
-                soup.find('span', class_='tm-motors-listing__date') or
-                soup.find('span', class_='date') or
-                soup.find('div', class_='date') or
-                soup.find('span', string=re.compile(r'Listed|Posted|Date', re.IGNORECASE))
-            )
-            if date_elem:
-                car_data['listed_on'] = date_elem.get_text(strip=True)
-                logger.info(f"Found date: {car_data['listed_on']}")
-            
-            # Set default values for missing fields
-            if not car_data['tag']:
-                car_data['tag'] = 'Car'
-            
-            if not car_data['currency']:
-                car_data['currency'] = 'NZD'  # TradeMe is New Zealand
-            
-            # Set ask price same as starting price if not specified
-            if not car_data['ask_price'] and car_data['starting_price']:
-                car_data['ask_price'] = car_data['starting_price']
-            
-            # If we still don't have a title, try to extract from the page title
-            if not car_data['title']:
-                page_title = soup.find('title')
-                if page_title:
-                    car_data['title'] = page_title.get_text(strip=True)
-                    logger.info(f"Extracted title from page title: {car_data['title']}")
-            
-            # Save a sample of the parsed HTML for debugging
-            with open('trademe_parsed_sample.html', 'w', encoding='utf-8') as f:
-                f.write(str(soup)[:5000])  # First 5000 characters
-            logger.info("Parsed HTML sample saved to trademe_parsed_sample.html")
-            
-            logger.info(f"Successfully extracted form field data for: {car_data.get('title', 'Unknown')}")
+                    location_elem = seller_elem.find('span', class_='tm-motors-listing__location') or seller_elem.find('span', class_='location')
+                    if location_elem:
+                        car_data['location'] = location_elem.get_text(strip=True)
+                        logger.debug("Found location: %s", car_data['location'])
+            
+                # Try to find description
+                desc_elem = template_cache.first_match(fingerprint, 'trademe.description', [
+                    lambda: soup.find('div', class_='tm-motors-listing__description'),
+                    lambda: soup.find('div', class_='description'),
+                    lambda: soup.find('div', class_='listing-description'),
+                ])
+                if desc_elem:
+                    car_data['description'] = desc_elem.get_text(strip=True)
+                    logger.debug("Found description: %.100s...", car_data['description'])
+            
+                # Try to find listing date
+                date_elem = template_cache.first_match(fingerprint, 'trademe.date', [
+                    lambda: soup.find('span', class_='tm-motors-listing__date'),
+                    lambda: soup.find('span', class_='date'),
+                    lambda: soup.find('div', class_='date'),
+                    lambda: soup.find('span', string=re.compile(r'Listed|Posted|Date', re.IGNORECASE)),
+                ])
+                if date_elem:
+                    car_data['listed_on'] = date_elem.get_text(strip=True)
+                    logger.debug("Found date: %s", car_data['listed_on'])
+            
+                # Set default values for missing fields
+                if not car_data['tag']:
+                    car_data['tag'] = 'Car'
+            
+                if not car_data['currency']:
+                    car_data['currency'] = 'NZD'  # TradeMe is New Zealand
+            
+                # Set ask price same as starting price if not specified
+                if not car_data['ask_price'] and car_data['starting_price']:
+                    car_data['ask_price'] = car_data['starting_price']
+            
+                # If we still don't have a title, try to extract from the page title
+                if not car_data['title']:
+                    page_title = soup.find('title')
+                    if page_title:
+                        car_data['title'] = page_title.get_text(strip=True)
+                        logger.debug("Extracted title from page title: %s", car_data['title'])
+            
+            # Keep a sample of the parsed HTML if debug capture is enabled;
+            # a page we could not even get a title from counts as a failure
+            capture('trademe_parsed_sample', lambda: str(soup)[:5000],
+                    failed=not car_data.get('title'), url=url)
+            
+            logger.info("Successfully extracted form field data for: %s", car_data.get('title', 'Unknown'))
             return car_data
             
         except Exception as e:
-            logger.error(f"Error extracting form field data from {url}: {str(e)}")
+            logger.error("Error extracting form field data from %s: %s", url, str(e))
             return {
                 'url': url,
                 'error': str(e),
@@ -754,11 +993,11 @@ class TradeMeScraper:
             if 'url' in ad_data and ad_data['url']:
                 main_url = ad_data['url']
                 if 'trademe.co.nz' in main_url:
-                    logger.info(f"Processing main TradeMe URL: {main_url}")
+                    logger.info("Processing main TradeMe URL: %s", main_url)
                     car_data = self.extract_car_listing(main_url)
                     extracted_data.append(car_data)
                 else:
-                    logger.info(f"Skipping non-TradeMe URL: {main_url}")
+                    logger.info("Skipping non-TradeMe URL: %s", main_url)
             
             # Process any additional URLs that might be in the data
             # Look for URLs in description, images, or other fields
@@ -766,7 +1005,7 @@ class TradeMeScraper:
             
             for url in all_urls:
                 if 'trademe.co.nz' in url:
-                    logger.info(f"Processing additional TradeMe URL: {url}")
+                    logger.info("Processing additional TradeMe URL: %s", url)
                     car_data = self.extract_car_listing(url)
                     extracted_data.append(car_data)
                     time.sleep(1)  # Be respectful with requests
@@ -774,7 +1013,7 @@ class TradeMeScraper:
             return extracted_data
             
         except Exception as e:
-            logger.error(f"Error processing ad_details.json: {str(e)}")
+            logger.error("Error processing ad_details.json: %s", str(e))
             return []
     
     def _extract_urls_from_data(self, data: Dict[str, Any]) -> List[str]:
@@ -803,23 +1042,28 @@ class TradeMeScraper:
         Save extracted data to a JSON file
         """
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
+            with span('write_output'), open(filename, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
-            logger.info(f"Data saved to {filename}")
+            logger.info("Data saved to %s", filename)
         except Exception as e:
-            logger.error(f"Error saving data: {str(e)}")
+            logger.error("Error saving data: %s", str(e))
 
+@profiled('extract_trademe')
 def main():
     """
     Main function to run the scraper
     """
+    setup_logging()
     scraper = TradeMeScraper()
     
-    # First, try using Selenium to get the actual rendered HTML
+    # First, read the listing JSON the TradeMe app loads; fall back to the rendered DOM
     ford_puma_url = "https://www.trademe.co.nz/a/motors/cars/ford/puma/listing/5497121689"
-    logger.info("Extracting data using Selenium from Ford Puma listing...")
+    logger.info("Extracting data from listing JSON for Ford Puma listing...")
     
-    ford_puma_selenium_data = scraper.extract_car_listing_selenium(ford_puma_url)
+    ford_puma_selenium_data = scraper.extract_car_listing_network(ford_puma_url)
+    if 'error' in ford_puma_selenium_data:
+        logger.info("Listing JSON unavailable, extracting data using Selenium...")
+        ford_puma_selenium_data = scraper.extract_car_listing_selenium(ford_puma_url)
     
     # Then try the regular method
     logger.info("Extracting data using regular method from Ford Puma listing...")
@@ -874,54 +1118,54 @@ def main():
     if trademe_form_data:
         with open('trademe_form_fields.json', 'w', encoding='utf-8') as f:
             json.dump(trademe_form_data, f, indent=2, ensure_ascii=False)
-        logger.info(f"TradeMe form data saved to trademe_form_fields.json")
+        logger.info("TradeMe form data saved to trademe_form_fields.json")
     
     # Print summary
-    print(f"\nExtraction completed!")
-    print(f"Total listings processed: {len(all_extracted_data)}")
-    print(f"Data saved to: extracted_trademe_data.json")
-    print(f"TradeMe form data saved to: trademe_form_fields.json")
+    logger.info("Extraction completed!")
+    logger.info("Total listings processed: %s", len(all_extracted_data))
+    logger.info("Data saved to: extracted_trademe_data.json")
+    logger.info("TradeMe form data saved to: trademe_form_fields.json")
     
     # Print details for the Ford Puma listing (Selenium method) with mapped form fields
     if ford_puma_selenium_data and 'error' not in ford_puma_selenium_data:
-        print(f"\nFord Puma Listing Details (Selenium - Mapped to Form Fields):")
-        print(f"Title: {ford_puma_selenium_data.get('title', 'N/A')}")
-        print(f"Price: {ford_puma_selenium_data.get('price', 'N/A')}")
-        print(f"Year: {ford_puma_selenium_data.get('year', 'N/A')}")
-        print(f"Kilometers: {ford_puma_selenium_data.get('kilometers', 'N/A')}")
-        print(f"Transmission: {ford_puma_selenium_data.get('transmission', 'N/A')}")
-        print(f"Fuel Type: {ford_puma_selenium_data.get('fuel_type', 'N/A')}")
-        print(f"Body Type: {ford_puma_selenium_data.get('body_type', 'N/A')}")
-        print(f"Engine: {ford_puma_selenium_data.get('engine_capacity', 'N/A')}")
-        print(f"Condition: {ford_puma_selenium_data.get('condition', 'N/A')}")
-        print(f"Seller: {ford_puma_selenium_data.get('seller_name', 'N/A')}")
-        print(f"Location: {ford_puma_selenium_data.get('location', 'N/A')}")
-        print(f"Images: {len(ford_puma_selenium_data.get('images', []))}")
-        print(f"Features: {len(ford_puma_selenium_data.get('features', []))}")
+        logger.info("Ford Puma Listing Details (Selenium - Mapped to Form Fields):")
+        logger.info("Title: %s", ford_puma_selenium_data.get('title', 'N/A'))
+        logger.info("Price: %s", ford_puma_selenium_data.get('price', 'N/A'))
+        logger.info("Year: %s", ford_puma_selenium_data.get('year', 'N/A'))
+        logger.info("Kilometers: %s", ford_puma_selenium_data.get('kilometers', 'N/A'))
+        logger.info("Transmission: %s", ford_puma_selenium_data.get('transmission', 'N/A'))
+        logger.info("Fuel Type: %s", ford_puma_selenium_data.get('fuel_type', 'N/A'))
+        logger.info("Body Type: %s", ford_puma_selenium_data.get('body_type', 'N/A'))
+        logger.info("Engine: %s", ford_puma_selenium_data.get('engine_capacity', 'N/A'))
+        logger.info("Condition: %s", ford_puma_selenium_data.get('condition', 'N/A'))
+        logger.info("Seller: %s", ford_puma_selenium_data.get('seller_name', 'N/A'))
+        logger.info("Location: %s", ford_puma_selenium_data.get('location', 'N/A'))
+        logger.info("Images: %s", len(ford_puma_selenium_data.get('images', [])))
+        logger.info("Features: %s", len(ford_puma_selenium_data.get('features', [])))
         
         # Also show the mapped form fields
         mapped_data = trademe_form_data[1] if len(trademe_form_data) > 1 else {}
         if mapped_data:
-            print(f"\nMapped Form Fields:")
-            print(f"Kilometer: {mapped_data.get('kilometer', 'N/A')}")
-            print(f"Fuel: {mapped_data.get('fuel', 'N/A')}")
-            print(f"Engine CC: {mapped_data.get('engine_cc', 'N/A')}")
-            print(f"Body Type: {mapped_data.get('body_type', 'N/A')}")
-            print(f"Transmission: {mapped_data.get('transmission', 'N/A')}")
-            print(f"Year: {mapped_data.get('year', 'N/A')}")
-            print(f"Number Plate: {mapped_data.get('number_plate', 'N/A')}")
-            print(f"Exterior Colour: {mapped_data.get('exterior_colour', 'N/A')}")
-            print(f"Import History: {mapped_data.get('import_history', 'N/A')}")
-            print(f"Ask Price: {mapped_data.get('ask_price', 'N/A')}")
-            print(f"Starting Price: {mapped_data.get('starting_price', 'N/A')}")
-            print(f"Buy Price: {mapped_data.get('buy_price', 'N/A')}")
-            print(f"On Road Costs: {mapped_data.get('on_road_costs', 'N/A')}")
-            print(f"Seats: {mapped_data.get('seats', 'N/A')}")
-            print(f"Energy Economy: {mapped_data.get('energy_economy', 'N/A')}")
-            print(f"Overall Safety: {mapped_data.get('overall_safety', 'N/A')}")
-            print(f"Carbon Emissions: {mapped_data.get('carbon_emissions', 'N/A')}")
-            print(f"Driver Safety: {mapped_data.get('driver_safety', 'N/A')}")
-            print(f"Listed On: {mapped_data.get('listed_on', 'N/A')}")
+            logger.info("Mapped Form Fields:")
+            logger.info("Kilometer: %s", mapped_data.get('kilometer', 'N/A'))
+            logger.info("Fuel: %s", mapped_data.get('fuel', 'N/A'))
+            logger.info("Engine CC: %s", mapped_data.get('engine_cc', 'N/A'))
+            logger.info("Body Type: %s", mapped_data.get('body_type', 'N/A'))
+            logger.info("Transmission: %s", mapped_data.get('transmission', 'N/A'))
+            logger.info("Year: %s", mapped_data.get('year', 'N/A'))
+            logger.info("Number Plate: %s", mapped_data.get('number_plate', 'N/A'))
+            logger.info("Exterior Colour: %s", mapped_data.get('exterior_colour', 'N/A'))
+            logger.info("Import History: %s", mapped_data.get('import_history', 'N/A'))
+            logger.info("Ask Price: %s", mapped_data.get('ask_price', 'N/A'))
+            logger.info("Starting Price: %s", mapped_data.get('starting_price', 'N/A'))
+            logger.info("Buy Price: %s", mapped_data.get('buy_price', 'N/A'))
+            logger.info("On Road Costs: %s", mapped_data.get('on_road_costs', 'N/A'))
+            logger.info("Seats: %s", mapped_data.get('seats', 'N/A'))
+            logger.info("Energy Economy: %s", mapped_data.get('energy_economy', 'N/A'))
+            logger.info("Overall Safety: %s", mapped_data.get('overall_safety', 'N/A'))
+            logger.info("Carbon Emissions: %s", mapped_data.get('carbon_emissions', 'N/A'))
+            logger.info("Driver Safety: %s", mapped_data.get('driver_safety', 'N/A'))
+            logger.info("Listed On: %s", mapped_data.get('listed_on', 'N/A'))
 
 if __name__ == "__main__":
     main()
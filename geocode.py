@@ -0,0 +1,148 @@
+import json
+import logging
+import os
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GAZETTEER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gazetteer.json')
+# Default location of the posting account (from the HAR recording)
+DEFAULT_ADDRESS = 'village-kandraji,post-korlakatta,sirsi,uttara kannada ,karnataka\n581318'
+DEFAULT_LOCATION_IDS = ['33']  # Bangladesh
+
+FUZZY_THRESHOLD = 0.54  # trigram similarity needed for a fuzzy match
+
+# More specific places win when a text names several (e.g. "Uttara, Dhaka")
+KIND_RANK = {'area': 0, 'city': 1, 'region': 2, 'country': 3}
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def _normalize(text):
+    return _NON_ALNUM.sub(' ', (text or '').lower()).strip()
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LocationResolver:
+    """
+    Resolves free-text seller locations ("Ponsonby, Auckland",
+    "Uttara, Dhaka") to the posting site's location ID and coordinates.
+
+    Works entirely offline from a gazetteer file: places with aliases,
+    coordinates and country, plus the site's location ID per country (a
+    place may carry its own location_id once sub-locations are mapped).
+    Names are matched exactly first and then through a trigram index, and
+    results are memoised, so repeated locations cost a dict lookup.
+    """
+
+    def __init__(self, gazetteer_file=DEFAULT_GAZETTEER_FILE):
+        with open(gazetteer_file, 'r', encoding='utf-8') as f:
+            gazetteer = json.load(f)
+        self.countries = gazetteer.get('countries', {})
+        self.places = gazetteer.get('places', [])
+        self._exact = {}
+        self._trigram_index = defaultdict(set)
+        self._keys = []
+        for index, place in enumerate(self.places):
+            for name in [place['name']] + place.get('aliases', []):
+                key = _normalize(name)
+                self._exact.setdefault(key, index)
+                self._keys.append((key, index))
+        for key_index, (key, _) in enumerate(self._keys):
+            for gram in _trigrams(key):
+                self._trigram_index[gram].add(key_index)
+        self.resolve = lru_cache(maxsize=4096)(self._resolve)
+
+    def _fuzzy(self, key):
+        """Best (similarity, place index) for key from the trigram index"""
+        grams = _trigrams(key)
+        counts = defaultdict(int)
+        for gram in grams:
+            for key_index in self._trigram_index.get(gram, ()):
+                counts[key_index] += 1
+        best = (0.0, None)
+        for key_index, shared in counts.items():
+            candidate, place_index = self._keys[key_index]
+            similarity = shared / len(grams | _trigrams(candidate))
+            if similarity > best[0]:
+                best = (similarity, place_index)
+        return best
+
+    def _resolve(self, text):
+        parts = [_normalize(part) for part in re.split(r'[,\n/]+', text or '')]
+        parts = [part for part in parts if part]
+        if not parts:
+            return None
+
+        matches = []
+        for part in parts:
+            if part in self._exact:
+                matches.append((1.0, self._exact[part]))
+                continue
+            similarity, index = self._fuzzy(part)
+            if index is not None and similarity >= FUZZY_THRESHOLD:
+                matches.append((similarity, index))
+        if not matches:
+            return None
+
+        # A country named in the text rules out same-named places elsewhere
+        countries = {self.places[i]['country'] for _, i in matches if self.places[i].get('kind') == 'country'}
+        if countries:
+            matches = [m for m in matches if self.places[m[1]]['country'] in countries] or matches
+
+        similarity, index = min(matches, key=lambda m: (KIND_RANK.get(self.places[m[1]].get('kind'), 1), -m[0]))
+        place = self.places[index]
+        country_id = self.countries.get(place['country'], {}).get('location_id')
+        location_ids = [country_id] if country_id else []
+        if place.get('location_id'):
+            location_ids.append(place['location_id'])
+        return {
+            'name': place['name'],
+            'country': place['country'],
+            'location_ids': location_ids,
+            'latitude': place['lat'],
+            'longitude': place['lng'],
+            'score': round(similarity, 2),
+        }
+
+
+@lru_cache(maxsize=1)
+def get_resolver():
+    """The process-wide resolver, loaded on first use"""
+    return LocationResolver()
+
+
+def resolve_location(text):
+    """Resolve a free-text location, or None if nothing in the gazetteer matches"""
+    if not text:
+        return None
+    try:
+        result = get_resolver().resolve(text)
+    except (OSError, ValueError) as e:
+        logger.warning("⚠️  Gazetteer unavailable: %s", e)
+        return None
+    if result is None:
+        logger.info("📍 No gazetteer match for location: %s", text)
+    return result
+
+
+def location_fields(text):
+    """
+    Address, site location IDs and coordinates for an ad's free-text
+    location, keyed like ad details; empty if it cannot be resolved
+    """
+    place = resolve_location(text)
+    if not place or not place['location_ids']:
+        return {}
+    return {
+        'address': text.strip(),
+        'location_ids': place['location_ids'],
+        'latitude': str(place['latitude']),
+        'longitude': str(place['longitude']),
+    }
@@ -0,0 +1,248 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+from instrumentation import span
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = 'image_cache'
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+SAVE_EVERY = 50  # puts between index saves; flush() and exit save the rest
+
+
+class ImageCache:
+    """
+    Content-addressed local image store.
+
+    Image bytes are stored once under their SHA-256 digest and a JSON index
+    maps each source URL to its digest, so an image is downloaded from the
+    CDN only once and retries/reposts read it straight from disk. The store
+    is bounded by size and evicts the least recently used blobs first.
+    Index changes are saved every SAVE_EVERY puts, on flush() and at exit.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, session=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.session = session or requests.Session()
+        self.blob_dir = os.path.join(cache_dir, 'blobs')
+        self.index_file = os.path.join(cache_dir, 'index.json')
+        self.lock_file = os.path.join(cache_dir, '.lock')
+        self._lock = threading.RLock()
+        self._url_locks = {}
+        self._unsaved_puts = 0
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._index = self._read_index()
+        atexit.register(self.flush)
+
+    # ------------------------------------------------------------------
+    # Index handling
+    # ------------------------------------------------------------------
+
+    def _read_index(self):
+        """Read the index from disk, returning an empty one if missing or corrupt"""
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            index.setdefault('urls', {})
+            index.setdefault('blobs', {})
+            return index
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'urls': {}, 'blobs': {}}
+
+    def _process_lock(self):
+        """Open the cross-process lock file (flock on POSIX, no-op elsewhere)"""
+        handle = open(self.lock_file, 'a+')
+        if fcntl:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _save_index(self):
+        """
+        Merge our index with the on-disk copy and write it atomically, so
+        several processes sharing the cache do not lose each other's entries
+        """
+        with self._lock:
+            handle = self._process_lock()
+            try:
+                on_disk = self._read_index()
+                for url, digest in on_disk['urls'].items():
+                    self._index['urls'].setdefault(url, digest)
+                for digest, meta in on_disk['blobs'].items():
+                    mine = self._index['blobs'].get(digest)
+                    if mine is None:
+                        if os.path.exists(self._blob_path(digest, meta.get('ext', ''))):
+                            self._index['blobs'][digest] = meta
+                    elif meta.get('last_used', 0) > mine.get('last_used', 0):
+                        mine['last_used'] = meta['last_used']
+
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self._index, f)
+                os.replace(tmp_path, self.index_file)
+                self._unsaved_puts = 0
+            finally:
+                handle.close()
+
+    def flush(self):
+        """Persist pending index changes (e.g. last-used timestamps)"""
+        self._save_index()
+
+    # ------------------------------------------------------------------
+    # Blob storage
+    # ------------------------------------------------------------------
+
+    def _blob_path(self, digest, ext=''):
+        return os.path.join(self.blob_dir, digest[:2], digest + ext)
+
+    @staticmethod
+    def _guess_extension(url, content_type=None):
+        """Pick a file extension from the URL path or the response content type"""
+        ext = os.path.splitext(urlparse(url).path)[1].lower() if url else ''
+        if ext in ('.jpg', '.jpeg', '.png', '.gif', '.webp'):
+            return ext
+        if content_type:
+            content_type = content_type.split(';')[0].strip().lower()
+            return {
+                'image/jpeg': '.jpg',
+                'image/png': '.png',
+                'image/gif': '.gif',
+                'image/webp': '.webp',
+            }.get(content_type, '.jpg')
+        return '.jpg'
+
+    def put_bytes(self, data, url=None, content_type=None):
+        """
+        Store raw image bytes and return their SHA-256 digest. Writes go to a
+        temp file and are renamed into place, so concurrent writers of the
+        same content never expose a partial file. A blob still indexed here
+        but evicted by another process (or deleted) is written again.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            meta = self._index['blobs'].get(digest)
+            if meta is None:
+                meta = {'size': len(data), 'ext': self._guess_extension(url, content_type)}
+                self._index['blobs'][digest] = meta
+            path = self._blob_path(digest, meta['ext'])
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            meta['last_used'] = time.time()
+            if url:
+                self._index['urls'][url] = digest
+            self._evict(keep=digest)
+            self._unsaved_puts += 1
+            if self._unsaved_puts >= SAVE_EVERY:
+                self._save_index()
+        return digest
+
+    def _evict(self, keep=None):
+        """
+        Drop least recently used blobs until the store fits in max_bytes.
+        keep (the blob just stored) is never dropped, even if it alone is
+        larger than max_bytes, so the caller can still read it.
+        """
+        blobs = self._index['blobs']
+        total = sum(meta.get('size', 0) for meta in blobs.values())
+        if total <= self.max_bytes:
+            return
+
+        evicted = set()
+        for digest, meta in sorted(blobs.items(), key=lambda item: item[1].get('last_used', 0)):
+            if total <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            try:
+                os.remove(self._blob_path(digest, meta.get('ext', '')))
+            except FileNotFoundError:
+                pass
+            total -= meta.get('size', 0)
+            evicted.add(digest)
+
+        for digest in evicted:
+            del blobs[digest]
+        self._index['urls'] = {url: d for url, d in self._index['urls'].items() if d not in evicted}
+        logger.info("Image cache evicted %s blobs", len(evicted))
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def digest_for_url(self, url):
+        """Return the cached digest for a URL, or None if it is not cached"""
+        with self._lock:
+            digest = self._index['urls'].get(url)
+            if digest and digest in self._index['blobs']:
+                return digest
+            return None
+
+    def path_for_digest(self, digest):
+        """Return the local path of a cached blob, or None if it is missing"""
+        with self._lock:
+            meta = self._index['blobs'].get(digest)
+            if not meta:
+                return None
+            path = self._blob_path(digest, meta.get('ext', ''))
+            if not os.path.exists(path):
+                # Removed behind our back - forget it so it gets re-fetched
+                del self._index['blobs'][digest]
+                return None
+            meta['last_used'] = time.time()
+            return path
+
+    def lookup(self, url):
+        """Return the local path for a URL if it is already cached"""
+        digest = self.digest_for_url(url)
+        return self.path_for_digest(digest) if digest else None
+
+    def _url_lock(self, url):
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def fetch(self, url, timeout=30):
+        """
+        Return a local path for the image at url, downloading it only if it
+        is not cached yet. Concurrent callers asking for the same URL wait for
+        a single download instead of racing each other.
+        """
+        path = self.lookup(url)
+        if path:
+            logger.debug("Image cache hit: %s", url)
+            return path
+
+        with self._url_lock(url):
+            path = self.lookup(url)
+            if path:
+                return path
+
+            logger.info("Image cache miss, downloading: %s", url)
+            with span('image_download'):
+                response = self.session.get(url, timeout=timeout)
+                response.raise_for_status()
+            digest = self.put_bytes(response.content, url=url,
+                                    content_type=response.headers.get('content-type'))
+            return self.path_for_digest(digest)
+
+    def fetch_digest(self, url, timeout=30):
+        """Like fetch() but return (digest, path), useful for de-duplication"""
+        path = self.fetch(url, timeout=timeout)
+        return self.digest_for_url(url), path
@@ -0,0 +1,106 @@
+import re
+from urllib.parse import urlparse, urlunparse
+
+# TradeMe serves every gallery photo from the photoserver under several size
+# variants, e.g. /photoserver/full/2243745089.jpg and
+# /photoserver/64x64m/2243745089.jpg. The numeric ID identifies the photo.
+PHOTOSERVER_PATTERN = re.compile(r'/photoserver/(?P<variant>[^/]+)/(?P<photo_id>\d+)\.(?P<ext>jpe?g|png|webp)$', re.IGNORECASE)
+
+# Best first. Unknown variants rank below these but above explicit thumbnails.
+PHOTOSERVER_VARIANT_RANK = ['full', 'plus', '1024sq', 'lv2', 'gv']
+
+NON_PHOTO_EXTENSIONS = ('.svg', '.gif', '.ico')
+NON_PHOTO_KEYWORDS = ('logo', 'icon', 'sprite', 'badge', 'avatar', 'placeholder', '/dealers/')
+
+# Anything smaller than this is a thumbnail, icon or tracking pixel
+MIN_PHOTO_WIDTH = 300
+MIN_PHOTO_HEIGHT = 200
+
+
+def _variant_score(variant):
+    """Higher is better. Thumbnails like 64x64m score by their pixel area."""
+    variant = variant.lower()
+    if variant in PHOTOSERVER_VARIANT_RANK:
+        return 10 ** 7 * (len(PHOTOSERVER_VARIANT_RANK) - PHOTOSERVER_VARIANT_RANK.index(variant))
+    size_match = re.match(r'(\d+)x(\d+)', variant)
+    if size_match:
+        return int(size_match.group(1)) * int(size_match.group(2))
+    return 10 ** 6
+
+
+def _to_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def is_non_photo(src):
+    """True for logos, icons, SVG/GIF assets and other non-gallery images"""
+    path = urlparse(src).path.lower()
+    if path.endswith(NON_PHOTO_EXTENSIONS):
+        return True
+    return any(keyword in path for keyword in NON_PHOTO_KEYWORDS)
+
+
+def is_too_small(image):
+    """True if the image reports rendered dimensions below a real photo's"""
+    width = _to_int(image.get('width'))
+    height = _to_int(image.get('height'))
+    # Lazy-loaded images report 0x0 until they load, so only trust real sizes
+    if not width or not height:
+        return False
+    return width < MIN_PHOTO_WIDTH or height < MIN_PHOTO_HEIGHT
+
+
+def select_gallery_images(images, upgrade_to_full=True):
+    """
+    Keep only unique, full-size gallery photos from a list of image dicts.
+
+    Logos, icons and tiny images are dropped, and photoserver variants of
+    the same photo are collapsed to the best resolution seen. When only a
+    thumbnail of a photo was found and upgrade_to_full is set, its URL is
+    rewritten to the full-size variant. Order of first appearance is kept.
+    """
+    selected = []
+    photoserver_best = {}  # photo_id -> (score, index into selected)
+    seen_srcs = set()
+
+    for image in images:
+        src = image.get('src') if isinstance(image, dict) else None
+        if not src or src in seen_srcs or is_non_photo(src):
+            continue
+        seen_srcs.add(src)
+
+        match = PHOTOSERVER_PATTERN.search(urlparse(src).path)
+        if match:
+            photo_id = match.group('photo_id')
+            score = _variant_score(match.group('variant'))
+            entry = {k: v for k, v in image.items() if k not in ('width', 'height')}
+            if photo_id in photoserver_best:
+                best_score, index = photoserver_best[photo_id]
+                if score > best_score:
+                    # Keep the position of the first variant, swap in the better URL
+                    entry['alt'] = selected[index].get('alt') or entry.get('alt', '')
+                    selected[index] = entry
+                    photoserver_best[photo_id] = (score, index)
+                continue
+            photoserver_best[photo_id] = (score, len(selected))
+            selected.append(entry)
+            continue
+
+        if is_too_small(image):
+            continue
+        selected.append(image)
+
+    if upgrade_to_full:
+        full_score = _variant_score('full')
+        for photo_id, (score, index) in photoserver_best.items():
+            if score < full_score:
+                # The pattern matches the URL path, so rewrite that and keep the query
+                parsed = urlparse(selected[index]['src'])
+                path = PHOTOSERVER_PATTERN.sub(
+                    lambda m: f"/photoserver/full/{m.group('photo_id')}.{m.group('ext')}", parsed.path)
+                selected[index] = dict(selected[index], src=urlunparse(parsed._replace(path=path)))
+
+    return selected
@@ -0,0 +1,135 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from image_cache import ImageCache
+from instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+# Target display settings per destination site. The jomclassifieds gallery
+# never shows images larger than this, so anything bigger is wasted upload.
+SITE_PROFILES = {
+    'jomclassifieds': {
+        'max_size': (1024, 768),
+        'format': 'JPEG',
+        'quality': 82,
+    },
+}
+
+DEFAULT_PROFILE = 'jomclassifieds'
+
+FORMAT_EXTENSIONS = {
+    'JPEG': '.jpg',
+    'WEBP': '.webp',
+}
+
+MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+}
+
+
+class ImagePreprocessor:
+    """
+    Resizes and recompresses images before upload.
+
+    Each source image is decoded once, scaled down to the target site's
+    display size, stripped of metadata and re-encoded as progressive JPEG
+    (or WebP). Results are stored in the ImageCache keyed by the source
+    digest and profile, so the same image is never processed twice.
+    """
+
+    def __init__(self, image_cache=None, profile=DEFAULT_PROFILE, max_workers=4):
+        self.image_cache = image_cache or ImageCache()
+        self.profile_name = profile
+        self.profile = SITE_PROFILES[profile]
+        self.max_workers = max_workers
+
+    def _cache_key(self, source_digest):
+        """Synthetic cache key for the processed variant of a source image"""
+        width, height = self.profile['max_size']
+        return (f"processed://{source_digest}/{self.profile_name}/"
+                f"{width}x{height}/{self.profile['format']}/q{self.profile['quality']}")
+
+    def _encode(self, source_path):
+        """Decode, resize, strip metadata and re-encode one image"""
+        with Image.open(source_path) as img:
+            # Apply EXIF rotation before the metadata is dropped
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            img.thumbnail(self.profile['max_size'], Image.LANCZOS)
+
+            buffer = io.BytesIO()
+            if self.profile['format'] == 'WEBP':
+                img.save(buffer, 'WEBP', quality=self.profile['quality'], method=4)
+            else:
+                img.save(buffer, 'JPEG', quality=self.profile['quality'],
+                         optimize=True, progressive=True)
+            return buffer.getvalue()
+
+    def process(self, source_digest, source_path):
+        """
+        Return the path of the processed variant of a cached source image,
+        encoding it on first use. Falls back to the source file if the
+        re-encoded image would be larger.
+        """
+        key = self._cache_key(source_digest)
+        cached = self.image_cache.lookup(key)
+        if cached:
+            return cached
+
+        with span('image_process'):
+            data = self._encode(source_path)
+        if len(data) >= os.path.getsize(source_path):
+            logger.info("Keeping original for %s (already optimal)", source_digest[:12])
+            # Remember the decision so we do not decode it again next time
+            with open(source_path, 'rb') as f:
+                data = f.read()
+            ext = os.path.splitext(source_path)[1]
+        else:
+            ext = FORMAT_EXTENSIONS[self.profile['format']]
+
+        digest = self.image_cache.put_bytes(data, url=key,
+                                            content_type=MIME_TYPES.get(ext, 'image/jpeg'))
+        logger.info("Preprocessed image %s: %s -> %s bytes", source_digest[:12], os.path.getsize(source_path), len(data))
+        return self.image_cache.path_for_digest(digest)
+
+    def prepare(self, url):
+        """Fetch (through the cache) and preprocess one image URL"""
+        source_digest, source_path = self.image_cache.fetch_digest(url)
+        return {
+            'url': url,
+            'digest': source_digest,
+            'path': self.process(source_digest, source_path),
+            'error': None,
+        }
+
+    def prepare_many(self, urls):
+        """
+        Fetch and preprocess several image URLs on a worker pool. Returns one
+        result dict per URL, in input order; failed entries carry 'error'.
+        """
+        def run(url):
+            try:
+                return self.prepare(url)
+            except Exception as e:
+                logger.error("Failed to prepare image %s: %s", url, e)
+                return {'url': url, 'digest': None, 'path': None, 'error': str(e)}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(run, urls))
+        self.image_cache.flush()
+        return results
+
+
+def mime_type_for(path):
+    """Return the upload MIME type for a local image file"""
+    return MIME_TYPES.get(os.path.splitext(path)[1].lower(), 'image/jpeg')
@@ -0,0 +1,192 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+# Wrap hot-path stages in span('fetch') (or decorate with @timed('parse')) and
+# their durations are collected into per-stage histograms. When disabled,
+# span() hands back a shared no-op context manager.
+
+# Upper bounds in seconds; covers sub-millisecond parses up to slow browser waits
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+METRIC_NAME = 'scraper_stage_duration_seconds'
+
+
+class _NoopSpan:
+    """Returned by span() when instrumentation is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class Span:
+    """Times one stage and reports it to the registry on exit"""
+
+    __slots__ = ('registry', 'name', 'attrs', 'start')
+
+    def __init__(self, registry, name, attrs):
+        self.registry = registry
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        status = 'error' if exc_type else 'ok'
+        self.registry.record(self.name, self.start, duration, status, self.attrs)
+        return False
+
+    def set(self, **attrs):
+        """Attach extra attributes (e.g. status code, bytes) to the trace event"""
+        self.attrs.update(attrs)
+
+
+class MetricsRegistry:
+    """Collects span durations into histograms and optional trace events"""
+
+    def __init__(self, enabled=False, metrics_file='metrics.prom', trace_file=None):
+        self.enabled = enabled
+        self.metrics_file = metrics_file
+        self.trace_file = trace_file
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._events = []
+        self._epoch = time.perf_counter()
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, attrs)
+
+    def record(self, name, start, duration, status, attrs):
+        key = (name, status)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(duration)
+            if self.trace_file:
+                self._events.append({
+                    'name': name,
+                    'ph': 'X',
+                    'ts': round((start - self._epoch) * 1e6),
+                    'dur': round(duration * 1e6),
+                    'pid': os.getpid(),
+                    'tid': threading.get_ident(),
+                    'args': dict(attrs, status=status),
+                })
+
+    def summary(self):
+        """Return {stage: {'count', 'total', 'mean'}} across statuses"""
+        stages = {}
+        with self._lock:
+            for (name, _status), histogram in self._histograms.items():
+                stage = stages.setdefault(name, {'count': 0, 'total': 0.0})
+                stage['count'] += histogram.count
+                stage['total'] += histogram.sum
+        for stage in stages.values():
+            stage['mean'] = stage['total'] / stage['count'] if stage['count'] else 0.0
+        return stages
+
+    def prometheus_text(self):
+        """Render all histograms in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent in each scraper/poster stage.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        with self._lock:
+            for (name, status), histogram in sorted(self._histograms.items()):
+                labels = f'stage="{name}",status="{status}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{METRIC_NAME}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'{METRIC_NAME}_sum{{{labels}}} {histogram.sum:.6f}')
+                lines.append(f'{METRIC_NAME}_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_reports(self):
+        """Write the metrics file and, if configured, the trace JSON"""
+        if not self.enabled:
+            return
+        with open(self.metrics_file, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        if self.trace_file:
+            with self._lock:
+                events = list(self._events)
+            with open(self.trace_file, 'w', encoding='utf-8') as f:
+                json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+def _from_env():
+    """
+    Build the registry from the environment. Collection is off unless
+    SCRAPER_METRICS is set; SCRAPER_METRICS_FILE sets the Prometheus output
+    path and SCRAPER_TRACE_FILE enables a per-run trace-event JSON.
+    """
+    enabled = os.getenv('SCRAPER_METRICS', '').lower() in ('1', 'true', 'yes', 'on')
+    return MetricsRegistry(
+        enabled=enabled,
+        metrics_file=os.getenv('SCRAPER_METRICS_FILE', 'metrics.prom'),
+        trace_file=os.getenv('SCRAPER_TRACE_FILE') or None,
+    )
+
+
+registry = _from_env()
+if registry.enabled:
+    atexit.register(registry.write_reports)
+
+
+def span(name, **attrs):
+    """Time a stage: ``with span('fetch', url=url): ...``"""
+    if not registry.enabled:
+        return _NOOP_SPAN
+    return Span(registry, name, attrs)
+
+
+def timed(name):
+    """Decorator form of span() for whole functions"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return func(*args, **kwargs)
+            with Span(registry, name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
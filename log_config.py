@@ -0,0 +1,89 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed via extra={...}
+_STANDARD_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any extra={...} fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves message formatting to the listener thread.
+    The stock handler renders the message in the caller before enqueueing;
+    our queue never leaves the process, so the record can go as-is.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(level=None, json_output=None, stream=None):
+    """
+    Configure the shared logging pipeline for all scripts.
+
+    Callers only pay for putting a record on an in-memory queue; a background
+    listener formats and writes it. Level and output mode default to the
+    SCRAPER_LOG_LEVEL (INFO) and SCRAPER_LOG_FORMAT (text|json) environment
+    variables. Safe to call more than once.
+    """
+    global _listener
+
+    if level is None:
+        level = os.getenv('SCRAPER_LOG_LEVEL', 'INFO')
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    if json_output is None:
+        json_output = os.getenv('SCRAPER_LOG_FORMAT', 'text').lower() == 'json'
+
+    root = logging.getLogger()
+    root.setLevel(level)
+
+    if _listener is not None:
+        _listener.stop()
+        root.handlers = [h for h in root.handlers if not isinstance(h, _DeferredQueueHandler)]
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    _listener.start()
+    return root
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
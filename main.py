@@ -1,14 +1,34 @@
 import requests
 import json
 import os
-from auth import main as authenticate
-from bs4 import BeautifulSoup
+import re
+from collections import Counter
+from functools import partial
+from urllib.parse import urlencode
+from category_schema import CATEGORY_PATH, CategorySchema
+from image_cache import ImageCache
+from instrumentation import span, timed
 import time
+import logging
+from log_config import setup_logging
+from profiling import profiled
+from debug_capture import capture
+from geocode import DEFAULT_ADDRESS, DEFAULT_LOCATION_IDS, location_fields
+from posting_ledger import DEFAULT_LEDGER_FILE, MY_ADS_PAGE_SIZE, PENDING, POSTED, MyAdsIndex, PostingLedger, confirm, content_hash, extract_form_id
+from resource_governor import governor
+from retry import AUTH_EXPIRED, VALIDATION, AuthSession, CircuitOpen, RequestFailed, breaker_for, call_with_retry, classify_response
 
 # URLs
 BASE_URL = "https://november2024version01.dicewebfreelancers.com"
 UPLOAD_URL = "https://november2024version01.dicewebfreelancers.com/index.php?option=com_jomclassifieds&task=upload&format=raw&id={ad_id}"
 AD_URL = "https://november2024version01.dicewebfreelancers.com/index.php/post-free-ad/user/save"
+FORM_HEADERS = {'Content-Type': 'application/x-www-form-urlencoded'}
+REQUEST_TIMEOUT = 60
+
+# The CSRF token is posted as a field named after the token itself
+CSRF_TOKEN_FIELD = re.compile(r'[a-f0-9]{32}')
+
+logger = logging.getLogger(__name__)
 
 def load_ad_details():
     """Load ad details from JSON file"""
@@ -16,28 +36,35 @@ def load_ad_details():
         with open('ad_details.json', 'r', encoding='utf-8') as f:
             return json.load(f)
     except FileNotFoundError:
-        print("❌ ad_details.json not found")
+        logger.error("❌ ad_details.json not found")
         return None
     except json.JSONDecodeError:
-        print("❌ Invalid JSON in ad_details.json")
+        logger.error("❌ Invalid JSON in ad_details.json")
         return None
 
-def upload_image_fixed(session, image_path, ad_id, csrf_token=None):
-    """Upload image using the correct endpoint and field name"""
-    try:
-        # Check if image file exists
-        if not os.path.exists(image_path):
-            print(f"❌ Image file not found: {image_path}")
-            return None
-        
-        # Construct the upload URL with the ad_id
-        upload_url = UPLOAD_URL.format(ad_id=ad_id)
-        
+def upload_image_fixed(auth, image_path, ad_id):
+    """
+    Upload image using the correct endpoint and field name. Network and
+    server errors are retried and an expired session is renewed; raises
+    CircuitOpen while the upload endpoint is down.
+    """
+    # Check if image file exists
+    if not os.path.exists(image_path):
+        logger.error("❌ Image file not found: %s", image_path)
+        return None
+    
+    # Construct the upload URL with the ad_id
+    upload_url = UPLOAD_URL.format(ad_id=ad_id)
+    from image_processing import mime_type_for
+    
+    mime_type = mime_type_for(image_path)
+    
+    logger.info("📤 Uploading image: %s", image_path)
+    logger.debug("🔗 Upload URL: %s", upload_url)
+    logger.debug("🆔 Ad ID: %s", ad_id)
+    
+    def attempt(session, csrf_token):
         # Prepare upload data
-        files = {
-            'images': ('image.jpg', open(image_path, 'rb'), 'image/jpeg')
-        }
-        
         data = {
             'id': str(ad_id)
         }
@@ -45,225 +72,507 @@ def upload_image_fixed(session, image_path, ad_id, csrf_token=None):
         # Add CSRF token if provided
         if csrf_token:
             data['csrf_token'] = csrf_token
-            print(f"🔒 CSRF token added to upload: {csrf_token[:20]}...")
+            logger.debug("🔒 CSRF token added to upload: %.20s...", csrf_token)
         
-        print(f"📤 Uploading image: {image_path}")
-        print(f"🔗 Upload URL: {upload_url}")
-        print(f"🆔 Ad ID: {ad_id}")
+        with open(image_path, 'rb') as image_file, governor.request(), span('upload'):
+            files = {
+                'images': ('image' + os.path.splitext(image_path)[1], image_file, mime_type)
+            }
+            response = session.post(upload_url, files=files, data=data, timeout=REQUEST_TIMEOUT)
         
-        response = session.post(upload_url, files=files, data=data)
+        logger.info("📊 Upload Response Status: %s", response.status_code)
+        logger.debug("📄 Upload Response Content: %.200s...", response.text)
         
-        print(f"📊 Upload Response Status: {response.status_code}")
-        print(f"📄 Upload Response Content: {response.text[:200]}...")
+        kind = classify_response(response)
+        if kind:
+            raise RequestFailed(kind, f"Upload failed with status {response.status_code}", response)
         
-        if response.status_code == 200:
-            try:
-                # Try to parse JSON response
-                result = response.json()
-                if 'success' in result and result['success']:
-                    print(f"✅ Image uploaded successfully: {result}")
-                    return result.get('data', {}).get('path', image_path)
-                else:
-                    print(f"❌ Upload failed: {result}")
-                    return None
-            except json.JSONDecodeError:
-                # If not JSON, check if it's HTML (login page)
-                if '<html' in response.text.lower():
-                    print("❌ Got HTML response - likely need to login again")
-                    return None
-                else:
-                    print(f"✅ Image uploaded (non-JSON response): {response.text[:100]}")
-                    return image_path
-        else:
-            print(f"❌ Upload failed with status {response.status_code}")
-            return None
-            
+        try:
+            # Try to parse JSON response
+            result = response.json()
+        except json.JSONDecodeError:
+            # If not JSON, check if it's HTML (login page)
+            if '<html' in response.text.lower():
+                raise RequestFailed(AUTH_EXPIRED, "Got HTML response - session has expired", response)
+            logger.info("✅ Image uploaded (non-JSON response): %.100s", response.text)
+            return image_path
+        
+        if 'success' in result and result['success']:
+            logger.info("✅ Image uploaded successfully: %s", result)
+            return result.get('data', {}).get('path', image_path)
+        raise RequestFailed(VALIDATION, f"Upload rejected: {result}", response)
+    
+    try:
+        return call_with_retry('upload', attempt, auth)
+    except CircuitOpen:
+        raise
+    except RequestFailed as e:
+        logger.error("❌ Upload failed (%s): %s", e.kind, e)
+        return None
     except Exception as e:
-        print(f"❌ Error uploading image: {e}")
+        logger.error("❌ Error uploading image: %s", e)
         return None
 
-def construct_form_data(ad_details, ad_id, image_paths=None, csrf_token=None):
-    """Construct form data for posting ad based on actual network recording"""
-    # Map ad_details to the actual form field names from the HAR file
-    form_data = {
-        'title': ad_details.get('title', 'Car for Sale'),
+class FormTemplate:
+    """
+    A site's ad form compiled once: the fields that are the same for every
+    ad are copied in and URL-encoded up front, so building and encoding a
+    payload per ad only touches the per-ad fields. Instances are never
+    modified after construction and can be shared between threads.
+    """
+    
+    def __init__(self, static_fields, ad_fields):
+        # static_fields: form field -> constant value
+        # ad_fields: form field -> (ad_details key, default, formatter or None)
+        self.static_fields = dict(static_fields)
+        self.ad_fields = dict(ad_fields)
+        self._static_encoded = urlencode(self.static_fields, doseq=True)
+    
+    def build(self, ad_details, ad_id, image_paths=None, csrf_token=None):
+        """Return the form dict for one ad"""
+        # List values are copied too, so a caller editing one (e.g.
+        # category[]) cannot change the template for every later ad
+        form_data = {field: list(value) if isinstance(value, list) else value
+                     for field, value in self.static_fields.items()}
+        for field, (key, default, formatter) in self.ad_fields.items():
+            value = ad_details.get(key, default)
+            form_data[field] = formatter(value) if formatter else value
+        form_data['id'] = str(ad_id)
+        
+        # Add images if provided
+        if image_paths:
+            form_data['images[]'] = image_paths
+        
+        # The CSRF token field name is the token itself, not 'csrf_token'
+        if csrf_token:
+            form_data[csrf_token] = '1'
+        return form_data
+    
+    def encode(self, form_data):
+        """
+        URL-encode a form dict, reusing the pre-encoded static part when the
+        static fields are untouched
+        """
+        static = self.static_fields
+        if all(form_data.get(field) == value for field, value in static.items()):
+            dynamic = {k: v for k, v in form_data.items() if k not in static}
+            return self._static_encoded + '&' + urlencode(dynamic, doseq=True)
+        return urlencode(form_data, doseq=True)
+
+
+def _format_contact(contact):
+    """Contact numbers as the JSON string the form expects"""
+    return json.dumps(contact or [])
+
+
+def _format_description(description):
+    return f"<div><div>{description}</div></div>"
+
+
+# Field names and IDs based on the actual network recording (HAR file)
+AD_FORM = FormTemplate(
+    static_fields={
         'category[]': ['6', '8', '31'],  # Based on HAR file - these are the actual category IDs
-        'exf_8': ad_details.get('trim', 'F'),  # Trim/Version
-        'exf_9': ad_details.get('transmission', 'Automatic'),  # Transmission
-        'exf_10': ad_details.get('registration_year', '2009'),  # Registration year
-        'exf_11': ad_details.get('fuel_type', 'Octane'),  # Fuel type
-        'exf_12': ad_details.get('kilometers_driven', '154,000 km'),  # Mileage
-        'exf_13': ad_details.get('model', 'Car'),  # Model
-        'exf_14': ad_details.get('year_of_production', '2005'),  # Year of production
-        'exf_15': ad_details.get('condition', 'Used'),  # Condition
-        'exf_16': ad_details.get('body_type', 'Saloon'),  # Body type
-        'exf_17': ad_details.get('price', 'Tk 1,550,000'),  # Price
-        'exf_18': ad_details.get('engine_capacity', '1,500 cc'),  # Engine capacity
-        'exf_19': ad_details.get('posted_on', '2025-08-28T01:44:35+06:00'),  # Posted date
-        'exf_20': ad_details.get('seller_name', 'Seller'),  # Seller name
-        'exf_21': json.dumps(ad_details.get('contact', [])),  # Contact info as JSON
-        'exf_22': ad_details.get('url', ''),  # Source URL
-        'exf_23': ad_details.get('year_of_production', '2005'),  # Year again
-        'exf_24': ad_details.get('version', 'null'),  # Version
-        'price': ad_details.get('price', 'Tk 1,550,000'),  # Price field
         'currency': 'TK',  # Currency
         'tagid': '1',  # Tag ID
-        'description': f"<div><div>{ad_details.get('description', 'Good condition car for sale')}</div></div>",  # Description
-        'address': 'village-kandraji,post-korlakatta,sirsi,uttara kannada ,karnataka\n581318',  # Address
-        'location[]': '33',  # Location ID
         'topaddays': '',  # Top ad days
         'privacy[]': 'on',  # Privacy
         'mode': 'new',  # Mode
         'extImages': '',  # External images
         'userid': '4340',  # User ID (hardcoded from HAR)
-        'id': str(ad_id),  # Ad ID
-        'latitude': '',  # Latitude
-        'langtitude': '',  # Longitude
-        'defLocation': 'village-kandraji,post-korlakatta,sirsi,uttara kannada ,karnataka\n581318'  # Default location
-    }
-    
-    # Add images if provided
-    if image_paths:
-        form_data['images[]'] = image_paths
+        'defLocation': DEFAULT_ADDRESS,  # Default location
+    },
+    ad_fields={
+        'title': ('title', 'Car for Sale', None),
+        'exf_8': ('trim', 'F', None),  # Trim/Version
+        'exf_9': ('transmission', 'Automatic', None),  # Transmission
+        'exf_10': ('registration_year', '2009', None),  # Registration year
+        'exf_11': ('fuel_type', 'Octane', None),  # Fuel type
+        'exf_12': ('kilometers_driven', '154,000 km', None),  # Mileage
+        'exf_13': ('model', 'Car', None),  # Model
+        'exf_14': ('year_of_production', '2005', None),  # Year of production
+        'exf_15': ('condition', 'Used', None),  # Condition
+        'exf_16': ('body_type', 'Saloon', None),  # Body type
+        'exf_17': ('price', 'Tk 1,550,000', None),  # Price
+        'exf_18': ('engine_capacity', '1,500 cc', None),  # Engine capacity
+        'exf_19': ('posted_on', '2025-08-28T01:44:35+06:00', None),  # Posted date
+        'exf_20': ('seller_name', 'Seller', None),  # Seller name
+        'exf_21': ('contact', [], _format_contact),  # Contact info as JSON
+        'exf_22': ('url', '', None),  # Source URL
+        'exf_23': ('year_of_production', '2005', None),  # Year again
+        'exf_24': ('version', 'null', None),  # Version
+        'price': ('price', 'Tk 1,550,000', None),  # Price field
+        'description': ('description', 'Good condition car for sale', _format_description),  # Description
+        'address': ('address', DEFAULT_ADDRESS, None),  # Address
+        'location[]': ('location_ids', DEFAULT_LOCATION_IDS, None),  # Location IDs
+        'latitude': ('latitude', '', None),  # Latitude
+        'langtitude': ('longitude', '', None),  # Longitude
+    },
+)
+
+# Extra-field labels as shown on the post-ad form; resolved to the site's
+# current field names through the category schema when it is reachable
+EXTRA_FIELD_LABELS = {
+    'exf_8': 'Trim / Edition',
+    'exf_9': 'Transmission',
+    'exf_10': 'Registration year',
+    'exf_11': 'Fuel type',
+    'exf_12': 'Kilometers run',
+    'exf_13': 'Model',
+    'exf_14': 'Year of Manufacture',
+    'exf_15': 'Condition',
+    'exf_16': 'Body type',
+    'exf_17': 'Price Final Status',
+    'exf_18': 'Engine capacity',
+    'exf_19': 'Posted on',
+    'exf_20': 'Sellers Name',
+    'exf_21': 'Contact Numbers',
+    'exf_22': 'Source Link',
+    'exf_23': 'Year of Production',
+    'exf_24': 'Version',
+}
+
+def compile_ad_form(schema, category_path=CATEGORY_PATH, user_id=None):
+    """
+    Build the ad form template with category IDs and extra-field names
+    looked up in the site's (cached) category schema, falling back to the
+    IDs recorded in the HAR file if the schema cannot be loaded. user_id
+    replaces the recorded account's ID.
+    """
+    account_fields = {'userid': str(user_id)} if user_id else {}
+    try:
+        category_ids = schema.resolve_category_path(category_path)
+        names = {}
+        for field in AD_FORM.ad_fields:
+            label = EXTRA_FIELD_LABELS.get(field)
+            names[field] = (schema.field_name(category_ids[-1], label) if label else None) or field
+        # Labels are matched loosely, so two of them can land on the same
+        # field; those keep their recorded names rather than overwrite each other
+        counts = Counter(names.values())
+        for field, name in names.items():
+            if counts[name] > 1 and name != field:
+                logger.warning("⚠️  %r and another label both resolve to %s, using recorded %s",
+                               EXTRA_FIELD_LABELS.get(field), name, field)
+                names[field] = field
+        if len(set(names.values())) < len(names):
+            raise ValueError("extra-field labels resolve to clashing field names")
+        ad_fields = {names[field]: spec for field, spec in AD_FORM.ad_fields.items()}
+        static_fields = dict(AD_FORM.static_fields, **{'category[]': category_ids}, **account_fields)
+        logger.info("📂 Resolved categories %s -> %s", ' > '.join(category_path), category_ids)
+        return FormTemplate(static_fields, ad_fields)
+    except Exception as e:
+        logger.warning("⚠️  Could not resolve category schema (%s), using recorded IDs", e)
+        if account_fields:
+            return FormTemplate(dict(AD_FORM.static_fields, **account_fields), AD_FORM.ad_fields)
+        return AD_FORM
+
+@timed('map')
+def construct_form_data(ad_details, ad_id, image_paths=None, csrf_token=None, template=AD_FORM):
+    """Construct form data for posting ad based on actual network recording"""
+    # Place the ad where the car is, if its location is in the gazetteer
+    location = location_fields(ad_details.get('location'))
+    if location:
+        ad_details = {**ad_details, **location}
+    form_data = template.build(ad_details, ad_id, image_paths, csrf_token)
     
-    # Add CSRF token - this is the key part that was wrong
     if csrf_token:
-        # The CSRF token field name is the token itself, not 'csrf_token'
-        form_data[csrf_token] = '1'
-        print(f"🔒 CSRF token added: {csrf_token[:20]}...")
+        logger.debug("🔒 CSRF token added: %.20s...", csrf_token)
     else:
-        print("⚠️  No CSRF token provided")
+        logger.warning("⚠️  No CSRF token provided")
     
     return form_data
 
-def post_ad(session, form_data):
-    """Post the ad using the form data"""
-    try:
-        print(f"📝 Posting ad with ID: {form_data['id']}")
-        print(f"🔗 Post URL: {AD_URL}")
+def post_ad(auth, form_data, template=AD_FORM, my_ads=None, precheck=None):
+    """
+    Post the ad using the form data. Network and server errors are retried
+    (after precheck, which can report that a lost attempt went through) and
+    an expired session is renewed; raises CircuitOpen while saving is down.
+    """
+    logger.info("📝 Posting ad with ID: %s", form_data['id'])
+    logger.info("🔗 Post URL: %s", AD_URL)
+    
+    def attempt(session, csrf_token):
+        # After a re-login the form must carry the new session's token
+        data = form_data
+        if csrf_token and csrf_token not in form_data:
+            data = {k: v for k, v in form_data.items() if not CSRF_TOKEN_FIELD.fullmatch(k)}
+            data[csrf_token] = '1'
         
-        # Use multipart/form-data as shown in the HAR file
-        response = session.post(AD_URL, data=form_data)
+        # Form-encoded as in the HAR file; the static fields are pre-encoded
+        body = template.encode(data)
+        with governor.request(), span('save'):
+            response = session.post(AD_URL, data=body, headers=FORM_HEADERS, timeout=REQUEST_TIMEOUT)
         
-        print(f"📊 Post Response Status: {response.status_code}")
-        print(f"📄 Post Response Content: {response.text[:500]}...")
+        logger.info("📊 Post Response Status: %s", response.status_code)
+        logger.debug("📄 Post Response Content: %.500s...", response.text)
         
-        # Save response for debugging
-        with open('post_ad_response.html', 'w', encoding='utf-8') as f:
-            f.write(response.text)
+        response_text = response.text.lower()
+        looks_posted = 'success' in response_text or 'posted' in response_text or 'saved' in response_text
         
-        if response.status_code == 200 or response.status_code == 303:
-            if 'success' in response.text.lower() or 'posted' in response.text.lower() or 'saved' in response.text.lower():
-                print("✅ Ad posted successfully!")
-                return True
-            elif response.status_code == 303:
-                # 303 redirect usually means success
-                print("✅ Ad posted successfully! (303 redirect)")
-                return True
-            else:
-                print("❌ Ad posting failed - check response content")
-                return False
-        else:
-            print(f"❌ Ad posting failed with status {response.status_code}")
-            return False
-            
+        # Keep the response if debug capture is enabled
+        capture('post_ad_response', response.text,
+                failed=response.status_code != 303 and not (response.status_code == 200 and looks_posted),
+                ad_id=form_data['id'], status=response.status_code)
+        
+        kind = classify_response(response)
+        if kind:
+            raise RequestFailed(kind, f"Ad posting failed with status {response.status_code}", response)
+        
+        # The save redirects to the user's ads listing, which verifies this ad for free
+        if my_ads is not None and response.status_code == 200:
+            my_ads.absorb(response.text)
+        
+        if looks_posted:
+            logger.info("✅ Ad posted successfully!")
+            return True
+        elif response.status_code == 303:
+            # 303 redirect usually means success
+            logger.info("✅ Ad posted successfully! (303 redirect)")
+            return True
+        raise RequestFailed(VALIDATION, "Ad posting failed - check response content", response)
+    
+    try:
+        return call_with_retry('save', attempt, auth, precheck)
+    except CircuitOpen:
+        raise
+    except RequestFailed as e:
+        logger.error("❌ Ad posting failed (%s): %s", e.kind, e)
+        return False
     except Exception as e:
-        print(f"❌ Error posting ad: {e}")
+        logger.error("❌ Error posting ad: %s", e)
         return False
 
-def main():
-    """Main function to post ad with images"""
-    print("🚗 Starting Ad Posting Process")
-    print("=" * 50)
+def load_post_form(session, csrf_token):
+    """
+    Open the post-ad page: returns (fresh CSRF token, or the current one;
+    the ad ID the site issued on the page, or None)
+    """
+    logger.info("🔄 Refreshing CSRF token...")
+    form_id = None
+    try:
+        with span('csrf_refresh'):
+            # Get the post-ad page to get a fresh CSRF token
+            post_ad_page_url = 'https://november2024version01.dicewebfreelancers.com/index.php/post-free-ad/user/add'
+            refresh_response = session.get(post_ad_page_url)
+            if refresh_response.status_code == 200:
+                form_id = extract_form_id(refresh_response.text)
+                # Extract fresh CSRF token from the JSON script tag
+                csrf_pattern = r'"csrf\.token":"([a-f0-9]{32})"'
+                csrf_match = re.search(csrf_pattern, refresh_response.text)
+                if csrf_match:
+                    csrf_token = csrf_match.group(1)
+                    logger.info("✅ CSRF token refreshed: %.20s...", csrf_token)
+                else:
+                    logger.warning("⚠️  Could not refresh CSRF token, using original")
+            else:
+                logger.warning("⚠️  Could not refresh CSRF token, using original")
+    except Exception as e:
+        logger.warning("⚠️  Error refreshing CSRF token: %s, using original", e)
+    return csrf_token, form_id
+
+def refresh_csrf_token(session, csrf_token):
+    """Get a fresh CSRF token from the post-ad page, or keep the current one"""
+    return load_post_form(session, csrf_token)[0]
+
+def post_listing(auth, ad_details, form_template, ledger, my_ads):
+    """
+    Upload the images of one ad and post it, unless the ledger (or, for an
+    earlier attempt with unknown outcome, the user's ads listing) shows it
+    is already on the site. Returns True if the ad is on the site; raises
+    CircuitOpen if the site is down.
+    """
+    my_ads.session = auth.session  # follow re-logins
+    digest = content_hash(ad_details)
+    if ledger.is_posted(digest):
+        logger.info("⏭️  '%s' was already posted, skipping", ad_details.get('title'))
+        return True
+    entry = ledger.get(digest)
+    if entry and entry['status'] == PENDING and confirm(ledger, my_ads, {digest}):
+        logger.info("⏭️  '%s' was saved by an earlier attempt, skipping", ad_details.get('title'))
+        return True
     
-    # Load ad details
-    ad_details = load_ad_details()
-    if not ad_details:
-        return
+    # Same ID for upload and form. The site issues it on the add page; an ad
+    # whose save was already attempted keeps the ID it was given then
+    auth.csrf_token, issued_id = load_post_form(auth.session, auth.csrf_token)
+    ad_id = (entry or {}).get('upload_id') or issued_id
+    if not ad_id:
+        logger.error("❌ The post-ad page did not issue an ad ID for '%s'", ad_details.get('title'))
+        return False
     
-    print(f"📋 Loaded ad details: {ad_details.get('title', 'Unknown')}")
+    # Upload images
+    logger.info("🖼️  Uploading %s images...", len(ad_details.get('images', [])))
+    uploaded_image_paths = []
     
-    # Authenticate
-    print("\n🔐 Authenticating...")
-    session, csrf_token = authenticate()
+    # Download (through the local cache) and resize all images up front;
+    # Pillow is only loaded once there is an image to process
+    from image_processing import ImagePreprocessor
     
-    if not session:
-        print("❌ Authentication failed")
-        return
+    image_urls = [img['src'] for img in ad_details.get('images', [])
+                  if isinstance(img, dict) and 'src' in img]
+    preprocessor = ImagePreprocessor(ImageCache(session=auth.session))
+    prepared_images = preprocessor.prepare_many(image_urls)
+    uploaded_digests = set()
     
-    print("✅ Authentication successful")
+    for i, prepared in enumerate(prepared_images):
+        if prepared['error']:
+            logger.error("❌ Failed to prepare image %s: %s", i+1, prepared['error'])
+            continue
+        
+        # Skip images whose content was already uploaded under another URL
+        if prepared['digest'] in uploaded_digests:
+            logger.info("⏭️  Image %s is a duplicate, skipping", i+1)
+            continue
+        
+        # Upload the preprocessed image
+        uploaded_path = upload_image_fixed(auth, prepared['path'], ad_id)
+        if uploaded_path:
+            uploaded_image_paths.append(uploaded_path)
+            uploaded_digests.add(prepared['digest'])
+            logger.info("✅ Image %s uploaded: %s", i+1, uploaded_path)
+        else:
+            logger.error("❌ Failed to upload image %s", i+1)
     
-    # Set ad ID for this session
-    ad_id = '678948'  # Use consistent ID for both upload and form
+    logger.info("📊 Total images uploaded: %s", len(uploaded_image_paths))
     
-    # Upload images
-    print(f"\n🖼️  Uploading {len(ad_details.get('images', []))} images...")
-    uploaded_image_paths = []
+    # Refresh CSRF token before posting (tokens can expire)
+    auth.csrf_token = refresh_csrf_token(auth.session, auth.csrf_token)
+    
+    # Construct form data (category/field IDs come from the cached schema)
+    logger.info("📝 Constructing form data...")
+    form_data = construct_form_data(ad_details, ad_id, uploaded_image_paths, auth.csrf_token, form_template)
+    
+    # Post the ad; the ledger entry is written first so a crash mid-save is not posted twice
+    logger.info("🚀 Posting ad...")
+    def already_saved():
+        # A retried save may follow one that went through but lost its response
+        try:
+            my_ads.refresh()
+        except Exception as e:
+            logger.warning("⚠️  Could not check the user's ads: %s", e)
+            return False
+        return confirm(ledger, my_ads, {digest}, fetch=False) > 0
     
-    for i, img in enumerate(ad_details.get('images', [])):
-        if isinstance(img, dict) and 'src' in img:
-            image_url = img['src']
-            # Download image to local file
+    ledger.begin(digest, ad_details, ad_id)
+    success = post_ad(auth, form_data, form_template, my_ads, precheck=already_saved)
+    if success:
+        ledger.update(digest, POSTED)
+    return success
+
+def post_batch(auth, ads, form_template, ledger, my_ads):
+    """
+    Post ads one after another. Ads hit by an open circuit (site down) are
+    set aside and tried once more when the circuit lets a probe through,
+    instead of failing every remaining ad. Returns the number posted.
+    """
+    posted = 0
+    pending = list(ads)
+    for round_number in range(2):
+        deferred = []
+        for ad in pending:
             try:
-                img_response = session.get(image_url)
-                if img_response.status_code == 200:
-                    local_path = f"temp_image_{i}.jpg"
-                    with open(local_path, 'wb') as f:
-                        f.write(img_response.content)
-                    
-                    # Upload the local image
-                    uploaded_path = upload_image_fixed(session, local_path, ad_id, csrf_token)
-                    if uploaded_path:
-                        uploaded_image_paths.append(uploaded_path)
-                        print(f"✅ Image {i+1} uploaded: {uploaded_path}")
-                    else:
-                        print(f"❌ Failed to upload image {i+1}")
-                    
-                    # Clean up local file
-                    os.remove(local_path)
-                else:
-                    print(f"❌ Failed to download image {i+1}: {img_response.status_code}")
-            except Exception as e:
-                print(f"❌ Error processing image {i+1}: {e}")
+                success = post_listing(auth, ad, form_template, ledger, my_ads)
+            except CircuitOpen as e:
+                logger.warning("⏸️  %s - deferring '%s'", e, ad.get('title'))
+                deferred.append(ad)
+                continue
+            if success:
+                posted += 1
+                logger.info("🎉 SUCCESS: '%s' posted", ad.get('title'))
+            else:
+                logger.error("❌ FAILED: '%s' was not posted", ad.get('title'))
+        
+        if not deferred or round_number:
+            if deferred:
+                logger.error("❌ %s ad(s) not posted, the site is still down", len(deferred))
+            break
+        wait = max(breaker_for('upload').retry_after(), breaker_for('save').retry_after())
+        logger.info("⏳ Retrying %s deferred ad(s) in %.0fs", len(deferred), wait)
+        time.sleep(wait)
+        pending = deferred
+    return posted
+
+def post_with_account(account, ads, ledger_file=DEFAULT_LEDGER_FILE):
+    """
+    Log in as account (None for auth's default credentials) and post ads
+    with that session and user ID. Used directly for a single account and
+    as the worker of each account's process when posting is sharded.
+    Returns the number of ads posted.
+    """
+    from auth import fetch_user_id, main as authenticate
     
-    print(f"\n📊 Total images uploaded: {len(uploaded_image_paths)}")
+    # Authenticate (and again, transparently, whenever the session expires)
+    logger.info("🔐 Authenticating%s...", f" as {account.username}" if account else "")
+    if account:
+        auth = AuthSession(partial(authenticate, account.username, account.password))
+    else:
+        auth = AuthSession(authenticate)
     
-    # Refresh CSRF token before posting (tokens can expire)
-    print("\n🔄 Refreshing CSRF token...")
+    if not auth.session:
+        logger.error("❌ Authentication failed")
+        return 0
+    
+    logger.info("✅ Authentication successful")
+    
+    user_id = account.user_id if account else None
+    if account and not user_id:
+        try:
+            user_id = fetch_user_id(auth.session)
+        except requests.RequestException as e:
+            logger.error("❌ Could not look up the user ID of %s: %s", account.username, e)
+            return 0
+        if not user_id:
+            # Posting without it would file the ads under the recorded account
+            logger.error("❌ No user ID found for %s, not posting its ads", account.username)
+            return 0
+        logger.info("🆔 %s is user %s", account.username, user_id)
+    
+    form_template = compile_ad_form(CategorySchema(auth.session), user_id=user_id)
+    ledger = PostingLedger(ledger_file)
+    my_ads = MyAdsIndex(auth.session, pages=len(ads) // MY_ADS_PAGE_SIZE + 1)
+    
+    posted = post_batch(auth, ads, form_template, ledger, my_ads)
+    
+    # Confirm the whole batch against one index of the user's ads
     try:
-        # Get the post-ad page to get a fresh CSRF token
-        post_ad_page_url = 'https://november2024version01.dicewebfreelancers.com/index.php/post-free-ad/user/add'
-        refresh_response = session.get(post_ad_page_url)
-        if refresh_response.status_code == 200:
-            # Extract fresh CSRF token from the JSON script tag
-            import re
-            csrf_pattern = r'"csrf\.token":"([a-f0-9]{32})"'
-            csrf_match = re.search(csrf_pattern, refresh_response.text)
-            if csrf_match:
-                csrf_token = csrf_match.group(1)
-                print(f"✅ CSRF token refreshed: {csrf_token[:20]}...")
-            else:
-                print("⚠️  Could not refresh CSRF token, using original")
-        else:
-            print("⚠️  Could not refresh CSRF token, using original")
+        verified = confirm(ledger, my_ads)
+        logger.info("🔍 Verified %s ad(s) on the site, %s still unconfirmed", verified, len(ledger.unverified()))
     except Exception as e:
-        print(f"⚠️  Error refreshing CSRF token: {e}, using original")
+        logger.warning("⚠️  Could not verify posted ads: %s", e)
+    return posted
+
+def post_ads(ads, processes=None):
+    """
+    Post ads with the configured account(s): sharded over one worker
+    process per account when there are several. Returns the number posted.
+    """
+    from accounts import load_accounts, run_sharded
+    
+    accounts = load_accounts()
+    if len(accounts) > 1:
+        logger.info("👥 Sharding across %s accounts", len(accounts))
+        return run_sharded(ads, accounts, post_with_account, processes)
+    return post_with_account(accounts[0] if accounts else None, ads)
+
+@profiled('post')
+def main():
+    """Main function to post ad with images"""
+    setup_logging()
+    logger.info("🚗 Starting Ad Posting Process")
+    logger.info("=" * 50)
     
-    # Construct form data
-    print("\n📝 Constructing form data...")
-    form_data = construct_form_data(ad_details, ad_id, uploaded_image_paths, csrf_token)
+    # Load ad details (one ad or a list of ads)
+    ad_details = load_ad_details()
+    if not ad_details:
+        return
+    ads = ad_details if isinstance(ad_details, list) else [ad_details]
     
-    # Post the ad
-    print("\n🚀 Posting ad...")
-    success = post_ad(session, form_data)
+    logger.info("📋 Loaded %s ad(s): %s", len(ads), ads[0].get('title', 'Unknown'))
     
-    if success:
-        print("\n🎉 SUCCESS: Ad posted successfully!")
-    else:
-        print("\n❌ FAILED: Ad posting failed")
+    # Several accounts: one worker process and session per account
+    posted = post_ads(ads)
     
-    print("\n" + "=" * 50)
-    print("🏁 Process completed")
+    logger.info("=" * 50)
+    logger.info("🏁 Process completed: %s/%s ads posted", posted, len(ads))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+from instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEDGER_FILE = 'posting_ledger.json'
+MY_ADS_URL = 'https://november2024version01.dicewebfreelancers.com/index.php/post-free-ad/user'
+MY_ADS_PAGE_SIZE = 50  # ads per page of the user's listing, newest first
+
+PENDING = 'pending'    # save was sent, outcome unknown
+POSTED = 'posted'      # save reported success
+VERIFIED = 'verified'  # ad seen on the user's ads listing
+
+# Fields that identify an ad; anything else (images, timestamps) may change between runs
+CONTENT_FIELDS = ('url', 'title', 'price', 'year_of_production', 'kilometers_driven', 'model', 'description')
+
+# <input type="hidden" id="jomcl-post-id" name="id" value="678967" /> on the add page
+FORM_ID_INPUT = re.compile(r'<input[^>]*\bname="id"[^>]*\bvalue="(\d+)"|<input[^>]*\bvalue="(\d+)"[^>]*\bname="id"')
+
+# <h3> <a href="/index.php/all-adverts/advert/666291-honda-vezel-...">Honda Vezel ...</a>
+MY_AD_LINK = re.compile(r'<h3>\s*<a href="([^"]*/advert/(\d+)-[^"]*)">([^<]+)</a>')
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def _title_key(title):
+    return _NON_ALNUM.sub(' ', (title or '').lower()).strip()
+
+
+def content_hash(ad_details):
+    """Stable hash of the fields that make an ad the same ad"""
+    content = {field: ad_details.get(field) for field in CONTENT_FIELDS}
+    payload = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def extract_form_id(html):
+    """
+    The ad ID the site issues on its add page (hidden input "id"). It is
+    the server's to hand out: a made-up one may belong to a live ad.
+    """
+    match = FORM_ID_INPUT.search(html or '')
+    return (match.group(1) or match.group(2)) if match else None
+
+
+class PostingLedger:
+    """
+    Local record of every ad we have tried to post, keyed by content hash.
+
+    An entry is written as pending before the save request is sent and
+    moved to posted/verified afterwards, so a crashed or retried run knows
+    which ads are already on the site (skip), which certainly are not
+    (post), and which need a look at the user's ads listing first.
+    """
+
+    def __init__(self, ledger_file=DEFAULT_LEDGER_FILE):
+        self.ledger_file = ledger_file
+        self._lock = threading.Lock()
+        try:
+            with open(ledger_file, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entries = {}
+
+    def get(self, digest):
+        return self._entries.get(digest)
+
+    def is_posted(self, digest):
+        entry = self._entries.get(digest)
+        return bool(entry) and entry['status'] in (POSTED, VERIFIED)
+
+    def site_ad_ids(self):
+        """Site ad IDs already claimed by ledger entries"""
+        return {entry['site_ad_id'] for entry in self._entries.values() if entry.get('site_ad_id')}
+
+    def unverified(self):
+        """(digest, entry) for ads sent but not yet seen on the site"""
+        return [(digest, entry) for digest, entry in self._entries.items() if entry['status'] in (PENDING, POSTED)]
+
+    def begin(self, digest, ad_details, upload_id=None):
+        """
+        Record that a save for this ad is about to be sent with the
+        site-issued upload_id, which later retries of the ad reuse
+        """
+        with self._lock:
+            entry = self._entries.setdefault(digest, {
+                'title': ad_details.get('title'),
+                'source_url': ad_details.get('url'),
+                'upload_id': None,
+                'site_ad_id': None,
+            })
+            if upload_id:
+                entry['upload_id'] = str(upload_id)
+            entry.update(status=PENDING, attempted_at=time.strftime('%Y-%m-%d %H:%M:%S'))
+        self.save()
+        return entry
+
+    def update(self, digest, status, site_ad_id=None):
+        with self._lock:
+            entry = self._entries[digest]
+            entry['status'] = status
+            if site_ad_id:
+                entry['site_ad_id'] = site_ad_id
+            if status == VERIFIED:
+                entry['verified_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.save()
+
+    def save(self):
+        """Write the ledger atomically"""
+        with self._lock:
+            directory = os.path.dirname(os.path.abspath(self.ledger_file))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.ledger_file)
+
+
+class MyAdsIndex:
+    """
+    The user's ads on the site, title -> [(site ad ID, URL)], newest first.
+
+    Built from the user's ads listing at most once per batch (plus any
+    listing page we get for free, e.g. the redirect after a save), so
+    confirming a whole batch costs one or two requests instead of a page
+    load per ad.
+    """
+
+    def __init__(self, session, pages=1):
+        self.session = session
+        self.pages = pages
+        self._ads = {}
+        self._loaded = False
+
+    def absorb(self, html):
+        """Add the ads on a listing page we already have"""
+        found = 0
+        for url, site_ad_id, title in MY_AD_LINK.findall(html or ''):
+            ads = self._ads.setdefault(_title_key(title), [])
+            if all(existing[0] != site_ad_id for existing in ads):
+                ads.append((site_ad_id, url))
+                found += 1
+        return found
+
+    def refresh(self):
+        """Fetch the newest pages of the user's ads listing"""
+        self._ads.clear()
+        for page in range(self.pages):
+            with span('verify', kind='my_ads'):
+                response = self.session.get(MY_ADS_URL, params={'start': page * MY_ADS_PAGE_SIZE}, timeout=30)
+                response.raise_for_status()
+            if not self.absorb(response.text):
+                break
+        self._loaded = True
+        logger.info("📋 Indexed %s of the user's ads", sum(len(ads) for ads in self._ads.values()))
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def find(self, title, exclude=(), min_id=None):
+        """
+        (site ad ID, URL) of the newest indexed ad with this title not in
+        exclude, or None. With min_id, only ads whose site ID is at least
+        min_id count, i.e. ads created no earlier than that ID was issued.
+        """
+        for site_ad_id, url in self._ads.get(_title_key(title), ()):
+            if site_ad_id in exclude:
+                continue
+            if min_id is not None and int(site_ad_id) < int(min_id):
+                continue
+            return site_ad_id, url
+        return None
+
+
+def find_entry_ad(index, entry, exclude=()):
+    """
+    (site ad ID, URL) of the indexed ad that is entry's ad, or None. A
+    title alone could match an older ad of the user's or another
+    account's, so the ad must also be no older than the ID the site
+    issued for the attempt (IDs only grow); without one nothing matches.
+    """
+    if not entry or not entry.get('upload_id'):
+        return None
+    return index.find(entry['title'], exclude=exclude, min_id=entry['upload_id'])
+
+
+def confirm(ledger, index, digests=None, fetch=True):
+    """
+    Match unverified ledger entries (all, or just digests) against the
+    user's ads index and mark the ones found as verified (see
+    find_entry_ad; unmatched entries stay as they are). The listing is
+    only fetched if pages already absorbed do not account for every
+    entry. Returns the number confirmed.
+    """
+    claimed = ledger.site_ad_ids()
+    confirmed = 0
+    for attempt in range(2):
+        remaining = [(digest, entry) for digest, entry in ledger.unverified()
+                     if digests is None or digest in digests]
+        for digest, entry in remaining:
+            match = find_entry_ad(index, entry, exclude=claimed)
+            if match:
+                site_ad_id, url = match
+                claimed.add(site_ad_id)
+                ledger.update(digest, VERIFIED, site_ad_id)
+                confirmed += 1
+                logger.info("✅ Verified '%s' as site ad %s", entry['title'], site_ad_id)
+        if attempt or not fetch or index.loaded or len(remaining) == confirmed:
+            break
+        index.refresh()
+    return confirmed
@@ -0,0 +1,252 @@
+import cProfile
+import functools
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_DIR = 'profiles'
+DEFAULT_INTERVAL_MS = 10       # sampling period
+DEFAULT_SNAPSHOT_EVERY = 60    # seconds between tracemalloc snapshots
+TRACEMALLOC_FRAMES = 25
+TOP_STATS = 50
+
+CPROFILE = 'cprofile'  # deterministic, every call; best for a single listing
+SAMPLE = 'sample'      # stack sampling, low overhead; for long crawls
+MEMORY = 'memory'      # tracemalloc snapshots, for memory growth
+MODES = (CPROFILE, SAMPLE, MEMORY)
+
+COLLAPSED = 'collapsed'    # flamegraph.pl / speedscope-compatible text
+SPEEDSCOPE = 'speedscope'  # speedscope.app JSON
+
+SAMPLER_THREAD = 'stack-sampler'
+SNAPSHOT_THREAD = 'memory-snapshots'
+PROFILER_THREADS = (SAMPLER_THREAD, SNAPSHOT_THREAD)  # left out of the samples
+
+
+class StackSampler:
+    """
+    Low-overhead sampling profiler: a background thread records the stack
+    of every other thread each interval, and identical stacks are counted
+    rather than stored, so memory stays flat however long the run.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.counts = Counter()  # (thread name, frames root-first) -> samples
+        self._frames = {}        # code object -> frame label
+        self._stop = threading.Event()
+        self._thread = None
+        self.started_at = None
+        self.duration = 0.0
+
+    def _label(self, code):
+        label = self._frames.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._frames[code] = label
+        return label
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if names.get(ident) in PROFILER_THREADS:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                self.counts[(names.get(ident, str(ident)), tuple(reversed(stack)))] += 1
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name=SAMPLER_THREAD, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def write_collapsed(self, path):
+        """One 'thread;frame;frame count' line per distinct stack"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for (thread_name, stack), count in self.counts.most_common():
+                f.write(';'.join((thread_name,) + stack) + f" {count}\n")
+
+    def write_speedscope(self, path, name):
+        """speedscope.app file with one sampled profile per thread"""
+        frames = []
+        frame_index = {}
+        profiles = {}
+        for (thread_name, stack), count in self.counts.items():
+            indices = []
+            for label in stack:
+                if label not in frame_index:
+                    frame_index[label] = len(frames)
+                    func, _, location = label.partition(' (')
+                    file, _, line = location.rstrip(')').rpartition(':')
+                    frames.append({'name': func, 'file': file, 'line': int(line or 0)})
+                indices.append(frame_index[label])
+            profile = profiles.setdefault(thread_name, {
+                'type': 'sampled', 'name': thread_name, 'unit': 'seconds',
+                'startValue': 0, 'endValue': 0, 'samples': [], 'weights': [],
+            })
+            profile['samples'].append(indices)
+            profile['weights'].append(count * self.interval)
+        for profile in profiles.values():
+            profile['endValue'] = sum(profile['weights'])
+        document = {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'profiling.py',
+            'shared': {'frames': frames},
+            'profiles': list(profiles.values()),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f)
+
+
+class MemoryTracker:
+    """tracemalloc snapshots at the start, every snapshot_every seconds and at the end"""
+
+    def __init__(self, run_dir, snapshot_every=DEFAULT_SNAPSHOT_EVERY, frames=TRACEMALLOC_FRAMES):
+        self.run_dir = run_dir
+        self.snapshot_every = snapshot_every
+        self.frames = frames
+        self._stop = threading.Event()
+        self._thread = None
+        self._first = None
+        self._count = 0
+
+    def snapshot(self):
+        snapshot = tracemalloc.take_snapshot()
+        snapshot.dump(os.path.join(self.run_dir, f"memory_{self._count:03d}.snapshot"))
+        self._count += 1
+        return snapshot
+
+    def _run(self):
+        while not self._stop.wait(self.snapshot_every):
+            self.snapshot()
+
+    def start(self):
+        tracemalloc.start(self.frames)
+        self._first = self.snapshot()
+        self._thread = threading.Thread(target=self._run, name=SNAPSHOT_THREAD, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        last = self.snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        with open(os.path.join(self.run_dir, 'memory_growth.txt'), 'w', encoding='utf-8') as f:
+            f.write(f"traced: {current / 1024 / 1024:.1f} MiB, peak: {peak / 1024 / 1024:.1f} MiB, "
+                    f"snapshots: {self._count}\n\nLargest growth since start:\n")
+            for stat in last.compare_to(self._first, 'traceback')[:TOP_STATS]:
+                f.write(f"\n{stat}\n")
+                for line in stat.traceback.format()[-6:]:
+                    f.write(f"    {line}\n")
+
+
+class RunProfiler:
+    """
+    The profilers requested for one run of an entry point, writing into
+    their own directory (profiles/<name>-<time>-<pid>/).
+    """
+
+    def __init__(self, name, modes, profile_dir=DEFAULT_PROFILE_DIR, interval=DEFAULT_INTERVAL_MS / 1000,
+                 output_format=COLLAPSED, snapshot_every=DEFAULT_SNAPSHOT_EVERY):
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise ValueError(f"Unknown profiling mode(s) {sorted(unknown)}, expected {MODES}")
+        self.name = name
+        self.modes = tuple(modes)
+        self.output_format = output_format
+        self.run_dir = os.path.join(profile_dir, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        self._profile = cProfile.Profile() if CPROFILE in self.modes else None
+        self._sampler = StackSampler(interval) if SAMPLE in self.modes else None
+        self._memory = MemoryTracker(self.run_dir, snapshot_every) if MEMORY in self.modes else None
+
+    @classmethod
+    def from_env(cls, name):
+        """
+        SCRAPER_PROFILE lists the profilers to run (cprofile, sample, memory;
+        comma-separated), or None if it is unset. SCRAPER_PROFILE_DIR,
+        SCRAPER_PROFILE_INTERVAL_MS, SCRAPER_PROFILE_FORMAT (collapsed |
+        speedscope) and SCRAPER_PROFILE_SNAPSHOT_EVERY tune them.
+        """
+        modes = [mode.strip().lower() for mode in os.getenv('SCRAPER_PROFILE', '').split(',') if mode.strip()]
+        if not modes:
+            return None
+        return cls(
+            name,
+            modes,
+            profile_dir=os.getenv('SCRAPER_PROFILE_DIR', DEFAULT_PROFILE_DIR),
+            interval=float(os.getenv('SCRAPER_PROFILE_INTERVAL_MS', str(DEFAULT_INTERVAL_MS))) / 1000,
+            output_format=os.getenv('SCRAPER_PROFILE_FORMAT', COLLAPSED).lower(),
+            snapshot_every=float(os.getenv('SCRAPER_PROFILE_SNAPSHOT_EVERY', str(DEFAULT_SNAPSHOT_EVERY))),
+        )
+
+    def start(self):
+        os.makedirs(self.run_dir, exist_ok=True)
+        if self._memory:
+            self._memory.start()
+        if self._sampler:
+            self._sampler.start()
+        if self._profile:
+            self._profile.enable()
+
+    def stop(self):
+        if self._profile:
+            self._profile.disable()
+            self._profile.dump_stats(os.path.join(self.run_dir, 'cprofile.pstats'))
+            summary = io.StringIO()
+            pstats.Stats(self._profile, stream=summary).sort_stats('cumulative').print_stats(TOP_STATS)
+            with open(os.path.join(self.run_dir, 'cprofile.txt'), 'w', encoding='utf-8') as f:
+                f.write(summary.getvalue())
+        if self._sampler:
+            self._sampler.stop()
+            if self.output_format == SPEEDSCOPE:
+                self._sampler.write_speedscope(os.path.join(self.run_dir, 'samples.speedscope.json'), self.name)
+            else:
+                self._sampler.write_collapsed(os.path.join(self.run_dir, 'samples.collapsed.txt'))
+        if self._memory:
+            self._memory.stop()
+        logger.info("📊 Profile (%s) written to %s", ', '.join(self.modes), self.run_dir)
+
+
+@contextmanager
+def profile_run(name, profiler=None):
+    """Profile the block as configured by SCRAPER_PROFILE (or with profiler)"""
+    profiler = profiler or RunProfiler.from_env(name)
+    if profiler is None:
+        yield None
+        return
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+
+
+def profiled(name):
+    """Decorator for entry points: profile the call when SCRAPER_PROFILE is set"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile_run(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
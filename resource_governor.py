@@ -0,0 +1,208 @@
+import gc
+import logging
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_RSS_MB = 1536
+DEFAULT_MAX_OPEN_FILES = 512
+DEFAULT_MAX_BROWSERS = 2
+DEFAULT_MAX_IN_FLIGHT = 8
+
+SOFT_LIMIT = 0.8          # fraction of a limit at which we start throttling
+CHECK_INTERVAL = 1.0      # seconds between process measurements
+THROTTLE_DELAY = 2.0      # pause per admission while under pressure
+BROWSER_WAIT_TIMEOUT = 300
+
+
+class ResourceExhausted(RuntimeError):
+    """Raised when work is shed because the process is over its budget"""
+
+
+def _rss_bytes():
+    """Current resident set size (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+def _open_fds():
+    """Number of open file descriptors, or 0 if it cannot be measured"""
+    for fd_dir in ('/proc/self/fd', '/dev/fd'):
+        try:
+            return len(os.listdir(fd_dir))
+        except OSError:
+            continue
+    return 0
+
+
+class ResourceGovernor:
+    """
+    Keeps a long crawl or posting batch inside a per-run resource budget.
+
+    Tracks resident memory, open file descriptors, live browser sessions
+    and in-flight requests. Past SOFT_LIMIT of the memory or fd budget new
+    work is slowed down; past the budget it is shed with ResourceExhausted
+    instead of taking the whole run down. Browser sessions are capped, and
+    a driver dropped without quit() has its processes stopped when it is
+    garbage collected (or at exit) rather than leaking for the whole run.
+    """
+
+    def __init__(self, max_rss_mb=DEFAULT_MAX_RSS_MB, max_open_files=DEFAULT_MAX_OPEN_FILES,
+                 max_browsers=DEFAULT_MAX_BROWSERS, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.max_open_files = max_open_files
+        self.max_browsers = max_browsers
+        self.max_in_flight = max_in_flight
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._browser_slots = threading.BoundedSemaphore(max_browsers)
+        self._browsers = {}  # id(driver) -> weakref.finalize
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._last_usage = (0, 0)
+        self.in_flight = 0
+        self.shed = 0
+
+    @classmethod
+    def from_env(cls):
+        """
+        SCRAPER_MAX_RSS_MB, SCRAPER_MAX_OPEN_FILES, SCRAPER_MAX_BROWSERS and
+        SCRAPER_MAX_IN_FLIGHT override the default budget.
+        """
+        return cls(
+            max_rss_mb=int(os.getenv('SCRAPER_MAX_RSS_MB', str(DEFAULT_MAX_RSS_MB))),
+            max_open_files=int(os.getenv('SCRAPER_MAX_OPEN_FILES', str(DEFAULT_MAX_OPEN_FILES))),
+            max_browsers=int(os.getenv('SCRAPER_MAX_BROWSERS', str(DEFAULT_MAX_BROWSERS))),
+            max_in_flight=int(os.getenv('SCRAPER_MAX_IN_FLIGHT', str(DEFAULT_MAX_IN_FLIGHT))),
+        )
+
+    # ------------------------------------------------------------------
+    # Measurements
+    # ------------------------------------------------------------------
+
+    def usage(self, fresh=False):
+        """Return (rss_bytes, open_fds), re-measured at most once per CHECK_INTERVAL"""
+        now = time.monotonic()
+        if fresh or now - self._last_check >= CHECK_INTERVAL:
+            self._last_usage = (_rss_bytes(), _open_fds())
+            self._last_check = now
+        return self._last_usage
+
+    def load(self, fresh=False):
+        """Highest fraction of the memory/fd budget currently in use"""
+        rss, fds = self.usage(fresh)
+        return max(rss / self.max_rss, fds / self.max_open_files)
+
+    def snapshot(self):
+        rss, fds = self.usage()
+        return {
+            'rss_mb': round(rss / (1024 * 1024), 1),
+            'open_fds': fds,
+            'browsers': len(self._browsers),
+            'in_flight': self.in_flight,
+            'shed': self.shed,
+        }
+
+    # ------------------------------------------------------------------
+    # Admission control
+    # ------------------------------------------------------------------
+
+    def admit(self):
+        """
+        Decide whether new work may start: returns at once under the soft
+        limit, slows down above it, and raises ResourceExhausted when the
+        budget is still exceeded after a garbage collection.
+        """
+        if self.load() < SOFT_LIMIT:
+            return
+
+        gc.collect()
+        load = self.load(fresh=True)
+        if load >= 1.0:
+            self.shed += 1
+            logger.warning("⚠️  Over resource budget, shedding work: %s", self.snapshot())
+            raise ResourceExhausted(f"Resource budget exceeded ({load:.0%})")
+
+        if load >= SOFT_LIMIT:
+            logger.info("🐢 Near resource budget (%.0f%%), throttling: %s", load * 100, self.snapshot())
+            time.sleep(THROTTLE_DELAY)
+
+    @contextmanager
+    def request(self):
+        """Hold one of max_in_flight request slots for the duration of a request"""
+        self.admit()
+        with self._in_flight:
+            with self._lock:
+                self.in_flight += 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+
+    # ------------------------------------------------------------------
+    # Browser sessions
+    # ------------------------------------------------------------------
+
+    def acquire_browser(self):
+        """Wait for a free browser slot (at most max_browsers live at once)"""
+        self.admit()
+        if not self._browser_slots.acquire(timeout=BROWSER_WAIT_TIMEOUT):
+            self.shed += 1
+            raise ResourceExhausted("No browser slot became free")
+
+    def track_browser(self, driver):
+        """
+        Register a started driver. If it is garbage collected without being
+        released, its chromedriver (and with it Chrome) is stopped and the
+        slot freed, so a forgotten quit() cannot leak a browser process.
+        """
+        service = getattr(driver, 'service', None)
+        finalizer = weakref.finalize(driver, self._reap_browser, id(driver), service)
+        with self._lock:
+            self._browsers[id(driver)] = finalizer
+
+    def _reap_browser(self, key, service):
+        with self._lock:
+            if self._browsers.pop(key, None) is None:
+                return
+        logger.warning("Reaping browser that was never quit")
+        try:
+            if service is not None:
+                service.stop()
+        finally:
+            self._browser_slots.release()
+
+    def release_browser(self, driver):
+        """Quit a tracked driver and free its slot"""
+        with self._lock:
+            finalizer = self._browsers.pop(id(driver), None)
+        try:
+            driver.quit()
+        finally:
+            if finalizer is not None:
+                finalizer.detach()
+                self._browser_slots.release()
+
+    def release_slot(self):
+        """Give back a slot taken by acquire_browser() when the driver failed to start"""
+        self._browser_slots.release()
+
+
+governor = ResourceGovernor.from_env()
@@ -0,0 +1,244 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Failure kinds
+NETWORK = 'network'            # connection failed or timed out
+SERVER = 'server'              # 5xx or 429: the site is struggling
+AUTH_EXPIRED = 'auth_expired'  # session lost, the site answered with its login page
+VALIDATION = 'validation'      # the site rejected the request itself; retrying will not help
+
+RETRYABLE = (NETWORK, SERVER)
+
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_BASE_DELAY = 1.0   # seconds, doubled per attempt before jitter
+DEFAULT_MAX_DELAY = 30.0
+FAILURE_THRESHOLD = 5      # consecutive failures that open a circuit
+RESET_TIMEOUT = 60.0       # seconds an open circuit waits before letting a probe through
+
+
+class RequestFailed(Exception):
+    """A request failed in a way the retry engine knows how to treat"""
+
+    def __init__(self, kind, message, response=None):
+        super().__init__(message)
+        self.kind = kind
+        self.response = response
+
+
+class CircuitOpen(RuntimeError):
+    """Raised instead of calling an endpoint whose circuit is open"""
+
+    def __init__(self, endpoint, retry_after):
+        super().__init__(f"Circuit for {endpoint} is open, retry in {retry_after:.0f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+def looks_like_login_page(response):
+    """True if the site answered with a login form, i.e. the session is gone"""
+    if '/login' in (response.url or '').lower():
+        return True
+    text = response.text
+    return 'id="login-form"' in text and 'name="password"' in text
+
+
+def classify_response(response):
+    """Failure kind for a response, or None if it is not a failure"""
+    if response.status_code in (401, 403) or (response.status_code == 200 and looks_like_login_page(response)):
+        return AUTH_EXPIRED
+    if response.status_code >= 500 or response.status_code == 429:
+        return SERVER
+    if response.status_code >= 400:
+        return VALIDATION
+    return None
+
+
+# Requests that can never succeed as sent
+MALFORMED_REQUEST = (requests.exceptions.URLRequired, requests.exceptions.MissingSchema,
+                     requests.exceptions.InvalidSchema, requests.exceptions.InvalidURL,
+                     requests.exceptions.InvalidHeader)
+
+
+def classify_exception(exc):
+    """
+    Failure kind for an exception, or None for errors that are not about
+    the request (bugs). Any other requests error, mid-body ones such as
+    ChunkedEncodingError included, is a network failure.
+    """
+    if isinstance(exc, RequestFailed):
+        return exc.kind
+    if isinstance(exc, MALFORMED_REQUEST):
+        return VALIDATION
+    if isinstance(exc, requests.RequestException):
+        response = getattr(exc, 'response', None)
+        if response is not None:
+            return classify_response(response) or NETWORK
+        return NETWORK
+    return None
+
+
+def backoff_delay(attempt, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+    """Full-jitter exponential backoff for the given (0-based) retry"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Stops calling an endpoint that keeps failing.
+
+    After FAILURE_THRESHOLD consecutive network/server failures the circuit
+    opens and calls fail fast with CircuitOpen. Once RESET_TIMEOUT has
+    passed one probe call is let through; its success closes the circuit,
+    its failure opens it for another RESET_TIMEOUT.
+    """
+
+    def __init__(self, endpoint, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def retry_after(self):
+        """Seconds until the next probe is allowed (0 if closed)"""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go through now"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            wait = self._opened_at + self.reset_timeout - time.monotonic()
+            if wait > 0 or self._probing:
+                raise CircuitOpen(self.endpoint, max(wait, 0.0))
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("🔌 %s is responding again, closing circuit", self.endpoint)
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if not self._probing:
+                    logger.warning("🔌 %s failed %s times in a row, opening circuit for %.0fs",
+                                   self.endpoint, self._failures, self.reset_timeout)
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(endpoint):
+    """The process-wide circuit breaker of an endpoint"""
+    with _breakers_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker(endpoint)
+        return _breakers[endpoint]
+
+
+class AuthSession:
+    """
+    A logged-in requests session that can be renewed.
+
+    login is a callable returning (session, csrf_token), like auth.main.
+    When several workers see the session expire at once only the first
+    logs in again; the others pick up the new session.
+    """
+
+    def __init__(self, login):
+        self._login = login
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.session, self.csrf_token = login()
+
+    def reauthenticate(self, generation):
+        """Log in again unless that already happened since generation"""
+        with self._lock:
+            if generation != self.generation:
+                return
+            logger.info("🔐 Session expired, logging in again...")
+            session, csrf_token = self._login()
+            if not session:
+                raise RequestFailed(AUTH_EXPIRED, "Re-authentication failed")
+            self.session, self.csrf_token = session, csrf_token
+            self.generation += 1
+
+
+def call_with_retry(endpoint, attempt, auth=None, precheck=None,
+                    max_attempts=DEFAULT_MAX_ATTEMPTS, base_delay=DEFAULT_BASE_DELAY):
+    """
+    Run attempt(session, csrf_token) until it succeeds, retrying network and
+    server failures with jittered backoff and logging in again (once) when
+    the session has expired. Validation failures are raised at once.
+
+    precheck, if given, is called before every retry and its result returned
+    if truthy - for non-idempotent calls that may have gone through even
+    though the response was lost.
+
+    Raises CircuitOpen while the endpoint's circuit is open, and the last
+    RequestFailed when the attempts are used up.
+    """
+    breaker = breaker_for(endpoint)
+    reauthenticated = False
+    for retry in range(max_attempts):
+        if retry and precheck is not None:
+            result = precheck()
+            if result:
+                return result
+
+        breaker.before_call()
+        generation = auth.generation if auth else 0
+        try:
+            result = attempt(auth.session if auth else None, auth.csrf_token if auth else None)
+        except Exception as e:
+            kind = classify_exception(e)
+            if kind is None:
+                # Still a failed call: a half-open probe must not stay in flight forever
+                breaker.record_failure()
+                raise
+            failure = e if isinstance(e, RequestFailed) else RequestFailed(kind, str(e))
+        except BaseException:
+            breaker.record_failure()
+            raise
+        else:
+            breaker.record_success()
+            return result
+
+        if failure.kind not in RETRYABLE:
+            # The endpoint answered, so as far as the circuit is concerned it is up
+            breaker.record_success()
+        if failure.kind == AUTH_EXPIRED and auth and not reauthenticated:
+            auth.reauthenticate(generation)
+            reauthenticated = True
+            continue
+        if failure.kind not in RETRYABLE:
+            raise failure
+
+        breaker.record_failure()
+        if retry + 1 < max_attempts:
+            delay = backoff_delay(retry, base_delay)
+            logger.warning("🔁 %s failed (%s: %s), retrying in %.1fs", endpoint, failure.kind, failure, delay)
+            time.sleep(delay)
+    raise failure
@@ -0,0 +1,325 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+from template_cache import template_cache
+
+logger = logging.getLogger(__name__)
+
+# Fetch strategies an adapter can declare
+STATIC = 'static'                # plain HTTP GET, parse the HTML
+JSON_EMBEDDED = 'json_embedded'  # plain HTTP GET, read a JSON blob embedded in the page
+BROWSER = 'browser'              # site needs its own client (API / headless browser)
+
+BIKROY_LOCATION_SLUG = re.compile(r'-for-sale-([a-z-]+?)-\d+$')
+
+
+class SiteAdapter:
+    """
+    Everything site-specific about one marketplace: which hosts it serves,
+    how pages are fetched, where the data lives and how it maps to our
+    fields. The fetching, pooling and pacing is done by the shared engine
+    (CarDetailsExtractor), so adding a site means adding an adapter here.
+    """
+
+    def __init__(self, name, hosts, fetch_strategy=STATIC, mapper=None, selectors=None,
+                 field_map=None, embedded_marker=None, data_path=(), min_delay=1.0, max_delay=3.0,
+                 search_url=None, listing_pattern=None, listing_base='', sitemap_urls=(), feed_urls=()):
+        self.name = name
+        self.hosts = tuple(host.lower() for host in hosts)
+        self.fetch_strategy = fetch_strategy
+        self.mapper = mapper
+        self.selectors = selectors or {}
+        self.field_map = field_map or {}
+        self.embedded_marker = embedded_marker
+        self.data_path = tuple(data_path)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        # Discovery: paginated search results ({page} placeholder) and the
+        # pattern of listing links found on them, joined onto listing_base
+        self.search_url = search_url
+        self.listing_pattern = re.compile(listing_pattern) if listing_pattern else None
+        self.listing_base = listing_base
+        # Cheaper discovery: sitemaps (robots.txt is checked when none are
+        # given) and RSS/Atom/JSON feeds
+        self.sitemap_urls = tuple(sitemap_urls)
+        self.feed_urls = tuple(feed_urls)
+        self._next_request_at = 0.0
+        self._rate_lock = threading.Lock()
+
+    def __repr__(self):
+        return f"SiteAdapter({self.name!r}, {self.fetch_strategy!r})"
+
+    def throttle(self):
+        """
+        Wait until this site's rate limit allows another request. Slots are
+        reserved under a lock, so concurrent workers hitting the same site
+        are spaced out while requests to other sites are not delayed.
+        """
+        with self._rate_lock:
+            now = time.monotonic()
+            start = max(now, self._next_request_at)
+            self._next_request_at = start + random.uniform(self.min_delay, self.max_delay)
+        if start > now:
+            time.sleep(start - now)
+
+    def select_data(self, data):
+        """Walk data_path into the embedded JSON"""
+        for key in self.data_path:
+            data = (data or {}).get(key, {})
+        return data
+
+    def map(self, source, url):
+        return self.mapper(self, source, url)
+
+
+# ----------------------------------------------------------------------
+# Shared parsing helpers
+# ----------------------------------------------------------------------
+
+_json_decoder = json.JSONDecoder()
+
+
+def extract_embedded_json(html, marker):
+    """
+    Return the JSON value assigned after marker (e.g. 'window.initialData = ')
+    in a page, or None. Works on the raw text, so the page never has to be
+    parsed into a DOM just to reach the data.
+    """
+    start = html.find(marker)
+    if start == -1:
+        return None
+    try:
+        data, _ = _json_decoder.raw_decode(html, start + len(marker))
+        return data
+    except json.JSONDecodeError as e:
+        logger.error("❌ JSON parsing error: %s", e)
+        return None
+
+
+def apply_field_map(record, field_map):
+    """Rename a record's keys to our field names, keeping unmapped keys"""
+    return {field_map.get(key, key): value for key, value in record.items()}
+
+
+# ----------------------------------------------------------------------
+# Mappers
+# ----------------------------------------------------------------------
+
+def map_bikroy(adapter, ad, url):
+    """Map the ad object from Bikroy's window.initialData"""
+    car_details = {
+        'url': url,
+        'year_of_production': None,
+        'version': None,
+        'price': None,
+        'images': [],
+        'title': None,
+        'trim': None,
+        'transmission': None,
+        'registration_year': None,
+        'fuel_type': None,
+        'kilometers_driven': None,
+        'model': None,
+        'condition': None,
+        'body_type': None,
+        'engine_capacity': None,
+        'posted_on': None,
+        'seller_name': None,
+        'contact': [],
+        'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+    # Append size parameters to image URLs
+    image_suffix = adapter.selectors['image_suffix']
+    for img in ad.get('images', {}).get('meta', []):
+        if isinstance(img, dict) and 'src' in img:
+            base_url = img['src']
+            if not base_url.endswith(image_suffix):
+                base_url = base_url.rstrip('/') + image_suffix
+            car_details['images'].append({
+                'src': base_url,
+                'alt': img.get('alt', ''),
+                'title': img.get('title', '')
+            })
+
+    car_details['title'] = ad.get('title')
+    car_details['contact'] = ad.get('contactCard', {}).get('phoneNumbers', [])
+    car_details['price'] = ad.get('money', {}).get('amount')
+    car_details['seller_name'] = ad.get('shop', {}).get('name')
+    car_details['posted_on'] = ad.get('adDate')
+
+    # Area/city of the ad; the URL slug ends in "-for-sale-<city>-<id>" otherwise
+    location = ad.get('location') or ad.get('area')
+    if isinstance(location, dict):
+        location = location.get('name')
+    if not location:
+        slug = BIKROY_LOCATION_SLUG.search(urlparse(url).path)
+        location = slug.group(1).replace('-', ' ').title() if slug else None
+    car_details['location'] = location
+
+    for item in ad.get('properties', []):
+        field = adapter.field_map.get(item.get('label'))
+        if field:
+            car_details[field] = item.get('value')
+
+    # Format price for display
+    if car_details['price']:
+        try:
+            car_details['price'] = f"Tk {int(car_details['price']):,}"
+        except (ValueError, TypeError):
+            price_str = str(car_details['price']).replace('Tk', '').strip()
+            car_details['price'] = f"Tk {price_str}"
+
+    return car_details
+
+
+def map_generic(adapter, soup, url):
+    """Best-effort title/price/images from any HTML page"""
+    car_details = {
+        'url': url,
+        'title': None,
+        'price': None,
+        'images': [],
+        'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+    title_elem = template_cache.first_match(
+        template_cache.fingerprint(soup), f"{adapter.name}.title",
+        [lambda tag=tag: soup.find(tag) for tag in adapter.selectors['title']])
+    if title_elem:
+        car_details['title'] = title_elem.get_text(strip=True)
+
+    price_elem = soup.find(string=adapter.selectors['price'])
+    if price_elem:
+        car_details['price'] = price_elem.strip()
+
+    keywords = adapter.selectors['image_keywords']
+    excluded = adapter.selectors['image_excluded']
+    for img in soup.find_all('img'):
+        src = img.get('src') or img.get('data-src')
+        if not src:
+            continue
+        lowered = src.lower()
+        if any(k in lowered for k in keywords) and not any(k in lowered for k in excluded):
+            car_details['images'].append({
+                'src': src,
+                'alt': img.get('alt', ''),
+                'title': img.get('title', '')
+            })
+
+    return car_details
+
+
+def map_trademe(adapter, session, url):
+    """
+    TradeMe renders client-side, so it keeps its own scraper: listing JSON
+    first, rendered DOM as the fallback. Shares the engine's HTTP session.
+    """
+    # Imported here so non-TradeMe runs never load Selenium
+    from extract_trademe import TradeMeScraper
+
+    scraper = TradeMeScraper(session=session)
+    car_data = scraper.extract_car_listing_network(url)
+    if 'error' in car_data:
+        car_data = scraper.extract_car_listing_selenium(url)
+    if 'error' in car_data:
+        logger.error("❌ Error extracting from %s: %s", url, car_data['error'])
+        return None
+    return apply_field_map(car_data, adapter.field_map)
+
+
+# ----------------------------------------------------------------------
+# Registry
+# ----------------------------------------------------------------------
+
+BIKROY = SiteAdapter(
+    'bikroy',
+    hosts=['bikroy.com', 'www.bikroy.com'],
+    fetch_strategy=JSON_EMBEDDED,
+    mapper=map_bikroy,
+    embedded_marker='window.initialData = ',
+    data_path=('adDetail', 'data', 'ad'),
+    search_url='https://bikroy.com/en/ads/bangladesh/cars?page={page}',
+    listing_pattern=r'/en/ad/[\w-]+',
+    listing_base='https://bikroy.com',
+    selectors={'image_suffix': '/620/466/fitted.jpg'},
+    field_map={
+        'Year of Manufacture': 'year_of_production',
+        'Trim / Edition': 'version',
+        'Fuel type': 'fuel_type',
+        'Kilometers run': 'kilometers_driven',
+        'Model': 'model',
+        'Condition': 'condition',
+        'Transmission': 'transmission',
+        'Body type': 'body_type',
+        'Engine capacity': 'engine_capacity',
+    },
+)
+
+TRADEME = SiteAdapter(
+    'trademe',
+    hosts=['trademe.co.nz', 'www.trademe.co.nz'],
+    fetch_strategy=BROWSER,
+    mapper=map_trademe,
+    field_map={
+        'year': 'year_of_production',
+        'kilometers': 'kilometers_driven',
+        'listed_on': 'posted_on',
+    },
+    min_delay=2.0,
+    max_delay=4.0,
+    search_url='https://www.trademe.co.nz/a/motors/cars/search?sort_order=expirydesc&page={page}',
+    listing_pattern=r'motors/cars/[\w-]+/[\w-]+/listing/\d+',
+    listing_base='https://www.trademe.co.nz/a/',
+)
+
+GENERIC = SiteAdapter(
+    'general',
+    hosts=[],
+    fetch_strategy=STATIC,
+    mapper=map_generic,
+    selectors={
+        'title': ['h1', 'h2', 'title'],
+        'price': re.compile(r'[\$€£₹]\s*[\d,]+|[\d,]+\s*[\$€£₹]|Tk\s*[\d,]+'),
+        'image_keywords': ['car', 'vehicle', 'auto', 'jpg', 'jpeg', 'png'],
+        'image_excluded': ['logo', 'icon'],
+    },
+)
+
+_adapters_by_host = {}
+
+
+def register(adapter):
+    """Make an adapter serve its hosts; later registrations win"""
+    for host in adapter.hosts:
+        _adapters_by_host[host] = adapter
+    return adapter
+
+
+def adapter_by_name(name):
+    """Look up a registered adapter by its name (e.g. 'bikroy')"""
+    for adapter in _adapters_by_host.values():
+        if adapter.name == name:
+            return adapter
+    raise KeyError(f"No site adapter named {name!r}")
+
+
+def all_adapters():
+    """Every registered adapter, plus the generic fallback"""
+    adapters = list({id(adapter): adapter for adapter in _adapters_by_host.values()}.values())
+    return adapters + [GENERIC] if GENERIC not in adapters else adapters
+
+
+def adapter_for_url(url):
+    """Exact-host lookup, falling back to the generic adapter"""
+    host = (urlparse(url).hostname or '').lower()
+    return _adapters_by_host.get(host, GENERIC)
+
+
+register(BIKROY)
+register(TRADEME)
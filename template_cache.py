@@ -0,0 +1,112 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_FILE = 'template_cache.json'
+MAX_TEMPLATES = 256
+
+_DIGITS = re.compile(r'\d+')
+
+
+class TemplateCache:
+    """
+    Remembers which selector in a fallback cascade works for each page
+    template.
+
+    Listing pages are rendered from a handful of templates, so a page is
+    identified by a fingerprint of its structure (the set of tag/class
+    combinations it uses, ignoring text, repetition counts and generated
+    numbers). The first page of a template runs the full cascade; later
+    pages with the same fingerprint try the winning selector straight away
+    and only fall back to the cascade if it stops matching.
+
+    Only winners are remembered. Several cascades match on text (a price
+    sign, "Listed"), which the fingerprint ignores, so a page where nothing
+    matched says nothing about the next page of the same template.
+    """
+
+    def __init__(self, cache_file=DEFAULT_CACHE_FILE, max_templates=MAX_TEMPLATES):
+        self.cache_file = cache_file
+        self.max_templates = max_templates
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                self._templates = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._templates = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(soup):
+        """Hash of the page's structural skeleton"""
+        tokens = set()
+        for elem in soup.find_all(True):
+            classes = elem.get('class') or ()
+            if not classes:
+                tokens.add(elem.name)
+            for cls in classes:
+                tokens.add(f"{elem.name}.{_DIGITS.sub('', cls)}")
+        return hashlib.sha1('\n'.join(sorted(tokens)).encode('utf-8')).hexdigest()[:16]
+
+    def first_match(self, fingerprint, group, candidates):
+        """
+        Return the result of the first candidate (zero-argument callable)
+        that finds something, trying the one cached for this template and
+        group first. Returns None if none match.
+        """
+        with self._lock:
+            cached = self._templates.get(fingerprint, {}).get(group)
+        if cached is not None and not 0 <= cached < len(candidates):
+            cached = None  # stale entry (e.g. a miss recorded by an older version)
+
+        if cached is not None:
+            result = candidates[cached]()
+            if result:
+                self.hits += 1
+                return result
+
+        self.misses += 1
+        for index, candidate in enumerate(candidates):
+            if index == cached:
+                continue
+            result = candidate()
+            if result:
+                self._remember(fingerprint, group, index)
+                return result
+        return None
+
+    def _remember(self, fingerprint, group, index):
+        with self._lock:
+            entry = self._templates.pop(fingerprint, {})
+            entry[group] = index
+            # Re-insert so dict order doubles as least-recently-learned order
+            self._templates[fingerprint] = entry
+            while len(self._templates) > self.max_templates:
+                del self._templates[next(iter(self._templates))]
+            self._dirty = True
+
+    def save(self):
+        """Write learned templates to disk if anything changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            directory = os.path.dirname(os.path.abspath(self.cache_file))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._templates, f)
+            os.replace(tmp_path, self.cache_file)
+            self._dirty = False
+        logger.debug("Template cache saved: %s hits, %s misses", self.hits, self.misses)
+
+
+template_cache = TemplateCache(os.getenv('SCRAPER_TEMPLATE_CACHE', DEFAULT_CACHE_FILE))
+atexit.register(template_cache.save)
@@ -1,20 +1,28 @@
+import logging
 import time
 import json
 import os
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import Select
 from dotenv import load_dotenv
 import requests
+from browser import USER_AGENT, build_chrome_options, blocked_url_patterns, create_chrome_driver, enable_request_blocking, headless_default, quit_driver
+from category_schema import CATEGORY_PATH, DEFAULT_CATEGORY_IDS, CategorySchema
+from geocode import DEFAULT_ADDRESS, DEFAULT_LOCATION_IDS, location_fields
+from image_cache import ImageCache
+from image_processing import ImagePreprocessor
+from instrumentation import timed
+from log_config import setup_logging
+from profiling import profiled
+from posting_ledger import MY_ADS_URL, PENDING, POSTED, VERIFIED, MyAdsIndex, PostingLedger, content_hash, find_entry_ad
 
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class WorkingSeleniumAdPoster:
     """
     Working Selenium-based ad poster that successfully posts advertisements.
@@ -23,25 +31,32 @@ class WorkingSeleniumAdPoster:
     
     def __init__(self):
         self.driver = None
+        self.headless = True
         self.ad_details = None
         self.cookies_file = "session_cookies.json"
+        self.image_preprocessor = ImagePreprocessor(ImageCache())
+        self.ledger = PostingLedger()
         
+    @timed('browser_start')
     def setup_driver(self):
-        """Setup Chrome driver with optimal settings"""
-        chrome_options = Options()
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
+        """Setup a lean Chrome driver (headless unless SCRAPER_HEADLESS=0)"""
+        self.headless = headless_default()
+        chrome_options = build_chrome_options(headless=self.headless)
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
         
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        # Cached chromedriver: no version lookup over the network on every run
+        self.driver = create_chrome_driver(chrome_options)
         
         # Remove webdriver property
         self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         
-        print("Chrome driver ready")
+        # Skip images, fonts and trackers. Stylesheets stay: the form's
+        # show/hide logic and element interactability depend on them.
+        enable_request_blocking(self.driver, blocked_url_patterns(stylesheets=False))
+        
+        logger.info("Chrome driver ready")
         
     def save_cookies(self):
         """Save current session cookies to file"""
@@ -49,9 +64,9 @@ class WorkingSeleniumAdPoster:
             cookies = self.driver.get_cookies()
             with open(self.cookies_file, 'w') as f:
                 json.dump(cookies, f)
-            print("Session cookies saved")
+            logger.info("Session cookies saved")
         except Exception as e:
-            print(f"Error saving cookies: {e}")
+            logger.warning("Error saving cookies: %s", e)
     
     def load_cookies(self):
         """Load and apply saved session cookies"""
@@ -70,11 +85,11 @@ class WorkingSeleniumAdPoster:
                     except Exception as e:
                         continue
                 
-                print("Session cookies loaded")
+                logger.info("Session cookies loaded")
                 return True
             return False
         except Exception as e:
-            print(f"Error loading cookies: {e}")
+            logger.warning("Error loading cookies: %s", e)
             return False
     
     def check_login_status(self):
@@ -90,18 +105,19 @@ class WorkingSeleniumAdPoster:
         except Exception as e:
             return False
     
+    @timed('login')
     def try_session_reuse(self):
         """Try to reuse saved session, fallback to login if needed"""
-        print("Checking for saved session...")
+        logger.info("Checking for saved session...")
         
         # Try to load saved cookies
         if self.load_cookies():
             # Check if the session is still valid
             if self.check_login_status():
-                print("✅ Session reused successfully")
+                logger.info("✅ Session reused successfully")
                 return True
             else:
-                print("Saved session expired, logging in...")
+                logger.info("Saved session expired, logging in...")
                 # Clear expired cookies
                 self.clear_expired_cookies()
         
@@ -113,24 +129,24 @@ class WorkingSeleniumAdPoster:
         try:
             if os.path.exists(self.cookies_file):
                 os.remove(self.cookies_file)
-                print("Expired cookies cleared")
+                logger.info("Expired cookies cleared")
         except Exception as e:
-            print(f"Error clearing cookies: {e}")
+            logger.warning("Error clearing cookies: %s", e)
         
     def load_ad_details(self):
         """Load ad details from JSON file"""
         try:
             with open('ad_details.json', 'r', encoding='utf-8') as f:
                 self.ad_details = json.load(f)
-                print(f"Loaded: {self.ad_details.get('title', 'Unknown')}")
+                logger.info("Loaded: %s", self.ad_details.get('title', 'Unknown'))
                 return True
         except Exception as e:
-            print(f"❌ Error loading ad details: {e}")
+            logger.error("❌ Error loading ad details: %s", e)
             return False
     
     def login_to_site(self):
         """Login to the website"""
-        print("Logging in...")
+        logger.info("Logging in...")
         
         try:
             # Go to login page
@@ -150,9 +166,8 @@ class WorkingSeleniumAdPoster:
             password = os.getenv('PASSWORD')
             
             if not username or not password:
-                print("No credentials found - manual login required")
-                input("Please login manually in the browser and press Enter when ready...")
-                return True
+                logger.info("No credentials found - manual login required")
+                return self.wait_for_manual_login()
             
             # Fill in credentials
             username_field.clear()
@@ -172,22 +187,30 @@ class WorkingSeleniumAdPoster:
             # Check if login was successful
             current_url = self.driver.current_url
             if "login" not in current_url.lower():
-                print("Login successful")
+                logger.info("Login successful")
                 # Save cookies for future use
                 self.save_cookies()
                 return True
             else:
-                print("❌ Login failed")
+                logger.error("❌ Login failed")
                 return False
                 
         except Exception as e:
-            print(f"❌ Error during login: {e}")
-            input("Please login manually in the browser and press Enter when ready...")
-            return True
+            logger.error("❌ Error during login: %s", e)
+            return self.wait_for_manual_login()
     
+    def wait_for_manual_login(self):
+        """Let the user log in by hand - only possible with a visible browser"""
+        if self.headless:
+            logger.error("❌ Manual login needs a visible browser - set USERNAME/PASSWORD or SCRAPER_HEADLESS=0")
+            return False
+        input("Please login manually in the browser and press Enter when ready...")
+        return True
+    
+    @timed('fetch')
     def navigate_to_post_ad_page(self):
         """Navigate to the post ad page"""
-        print("Navigating to post ad page...")
+        logger.info("Navigating to post ad page...")
         
         try:
             self.driver.get("https://november2024version01.dicewebfreelancers.com/index.php/post-free-ad/user/add")
@@ -198,284 +221,75 @@ class WorkingSeleniumAdPoster:
             
             current_url = self.driver.current_url
             if "login" in current_url.lower():
-                print("❌ Still on login page - authentication required")
+                logger.error("❌ Still on login page - authentication required")
                 return False
             else:
-                print("Post ad page loaded")
+                logger.info("Post ad page loaded")
                 return True
                 
         except Exception as e:
-            print(f"❌ Error navigating to post ad page: {e}")
+            logger.error("❌ Error navigating to post ad page: %s", e)
             return False
     
 
 
+    def _category_schema(self):
+        """Category schema cache, fetched with the browser's logged-in cookies"""
+        session = requests.Session()
+        session.headers['User-Agent'] = USER_AGENT
+        for cookie in self.driver.get_cookies():
+            session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'))
+        return CategorySchema(session)
+    
+    @timed('categories')
     def select_categories(self):
         """Select all category levels - this should be done before filling other fields"""
-        print("Selecting categories...")
+        logger.info("Selecting categories...")
         
+        # Category IDs come from the cached schema (no network once cached);
+        # the IDs from the original recording are the fallback
         try:
-            # Select main category (Vehicles)
-            print("🏷️  Selecting main category: Vehicles...")
-            
-            # Find the first category select element (main category)
-            first_category_select = Select(self.driver.find_element(By.ID, "category"))
-            
-            # Debug: Show all available category options
-            print("📋 Available category options:")
-            for i, option in enumerate(first_category_select.options):
-                print(f"   {i}: {option.text} (value: {option.get_attribute('value')})")
-            
-            # Try to find the Vehicles category
-            vehicles_found = False
-            for option in first_category_select.options:
-                if "vehicle" in option.text.lower() or option.get_attribute('value') == "6":
-                    first_category_select.select_by_value(option.get_attribute('value'))
-                    print(f"✅ Selected category: {option.text} (value: {option.get_attribute('value')})")
-                    vehicles_found = True
-                    break
-            
-            if not vehicles_found:
-                # Fallback to value "6" if text search fails
-                try:
-                    first_category_select.select_by_value("6")
-                    print("✅ Selected category by value: 6")
-                except:
-                    # Last resort: select first option
-                    first_category_select.select_by_index(0)
-                    print(f"✅ Selected first category option: {first_category_select.first_selected_option.text}")
-            
-            print("✅ Selected main category: Vehicles")
-            
-            # Take snapshot after main category selection
-    
-            
-            # Wait for subcategory to appear and select Cars - Parts
-            print("🚗 Waiting for subcategory to appear...")
-            
-            # Wait for dynamic content to load after category selection
-            print("⏳ Waiting for dynamic content to load...")
-            time.sleep(5)  # Increased wait time for JavaScript to load
-            
-            # Try to trigger any change events that might load subcategories
-            try:
-                # Sometimes the page needs a trigger to load subcategories
-                self.driver.execute_script("arguments[0].dispatchEvent(new Event('change', { bubbles: true }));", first_category_select)
-                print("🔄 Triggered change event on category select")
-                time.sleep(2)  # Wait for change event to process
-            except Exception as e:
-                print(f"⚠️  Error triggering change event: {e}")
-            
-            time.sleep(3)
-            
-            # Debug: Show all form elements to understand structure
-            print("🔍 Debug: Inspecting form structure after category selection...")
-            all_selects = self.driver.find_elements(By.TAG_NAME, "select")
-            print(f"📋 Found {len(all_selects)} select elements:")
-            for i, select in enumerate(all_selects):
-                try:
-                    name = select.get_attribute('name') or 'no-name'
-                    id_attr = select.get_attribute('id') or 'no-id'
-                    print(f"   Select {i+1}: name='{name}', id='{id_attr}'")
-                except:
-                    print(f"   Select {i+1}: Error getting attributes")
-            
-            try:
-                # Look for the second category dropdown that should appear after selecting Vehicles
-                print("🔍 Looking for second category dropdown (jomcl_category_6_1)...")
-                
-                # Strategy 1: Look for the specific second category dropdown by ID
-                try:
-                    second_category_select = WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.ID, "jomcl_category_6_1"))
-                    )
-                    print("✅ Found second category dropdown by ID")
-                    
-                    # Look for the select element inside this div
-                    subcategory_select = second_category_select.find_element(By.TAG_NAME, "select")
-                    print("✅ Found subcategory select element")
-                    
-                except:
-                    print("⚠️  Second category dropdown not found by ID")
-                    
-                    # Strategy 2: Look for any new select elements that appeared
-                    try:
-                        all_selects = self.driver.find_elements(By.TAG_NAME, "select")
-                        for select in all_selects:
-                            name = select.get_attribute('name') or ''
-                            if name and 'category' in name.lower() and name != 'exf_1':  # Look for category fields
-                                subcategory_select = select
-                                print(f"🔍 Found potential subcategory select: {name}")
-                                break
-                    except:
-                        pass
-                
-                if subcategory_select:
-                    # Take snapshot before subcategory selection
-            
-                    
-                    # Select Cars - Parts
-                    subcategory_select = Select(subcategory_select)
-                    print(f"📋 Available subcategory options: {[opt.text for opt in subcategory_select.options]}")
-                    
-                    # Try to find the option containing "Cars" or "Parts"
-                    cars_parts_found = False
-                    for option in subcategory_select.options:
-                        if "car" in option.text.lower() and "parts" in option.text.lower():
-                            subcategory_select.select_by_visible_text(option.text)
-                            print(f"✅ Selected subcategory: {option.text}")
-                            cars_parts_found = True
-                            break
-                    
-                    if not cars_parts_found:
-                        # If no exact match, select the first option
-                        subcategory_select.select_by_index(0)
-                        print(f"✅ Selected first subcategory option: {subcategory_select.first_selected_option.text}")
-                    
-                    # Take snapshot after subcategory selection
-            
-                    
-                    # Wait for third category dropdown to appear after selecting "Cars - Parts"
-                    print("🔄 Waiting for third category dropdown to appear...")
-                    time.sleep(5)  # Wait longer for JavaScript to load
-                    
-                    # Take snapshot to see what appeared
-            
-                    
-                    # Look for third category level
-                    try:
-                        # Strategy 1: Look for any new category dropdowns that might have appeared
-                        print("🔍 Looking for third category dropdown...")
-                        
-                        # Look for any new select elements that might be the third category
-                        all_selects_after = self.driver.find_elements(By.TAG_NAME, "select")
-                        print(f"📋 Found {len(all_selects_after)} select elements after subcategory selection")
-                        
-                        # Look for any new category-related elements
-                        third_category_select = None
-                        for select in all_selects_after:
-                            try:
-                                name = select.get_attribute('name') or ''
-                                id_attr = select.get_attribute('id') or ''
-                                if 'category' in name.lower() or 'category' in id_attr.lower():
-                                    # Skip the ones we already know about
-                                    if id_attr not in ['category', 'jomcl_category_-1_1', 'jomcl_category_6_1']:
-                                        third_category_select = select
-                                        print(f"🔍 Found potential third category: name='{name}', id='{id_attr}'")
-                                        break
-                            except:
-                                continue
-                        
-                        # Strategy 2: Look for any new divs with category in the ID
-                        if not third_category_select:
-                            try:
-                                category_divs = self.driver.find_elements(By.CSS_SELECTOR, "div[id*='category']")
-                                for div in category_divs:
-                                    div_id = div.get_attribute('id') or ''
-                                    if div_id not in ['jomcl_category_-1_1', 'jomcl_category_6_1']:
-                                        print(f"🔍 Found new category div: {div_id}")
-                                        # Look for select inside this div
-                                        select_inside = div.find_elements(By.TAG_NAME, "select")
-                                        if select_inside:
-                                            third_category_select = select_inside[0]
-                                            print(f"✅ Found third category select inside div {div_id}")
-                                            break
-                            except Exception as e:
-                                print(f"⚠️  Error looking for category divs: {e}")
-                        
-                        if third_category_select:
-                            # Take snapshot before third category selection
-                    
-                            
-                            third_category_select = Select(third_category_select)
-                            print(f"📋 Available third category options: {[opt.text for opt in third_category_select.options]}")
-                            
-                            # Try to find "Second hand cars in Bangladesh!"
-                            bangladesh_found = False
-                            for option in third_category_select.options:
-                                if "second hand" in option.text.lower() and "bangladesh" in option.text.lower():
-                                    third_category_select.select_by_visible_text(option.text)
-                                    print(f"✅ Selected third category: {option.text}")
-                                    bangladesh_found = True
-                                    break
-                            
-                            if not bangladesh_found:
-                                # If no exact match, select the first option
-                                third_category_select.select_by_index(0)
-                                print(f"✅ Selected first third category option: {third_category_select.first_selected_option.text}")
-                            
-                            # Take snapshot after third category selection
-                    
-                            
-                            # Wait for vehicle-specific fields to appear
-                            print("🚗 Waiting for vehicle-specific fields to appear...")
-                            time.sleep(5)
-                            
-                            # Take snapshot to see what fields appeared
-                    
-                            
-                            # Look for vehicle-specific fields
-                            try:
-                                vehicle_fields = self.driver.find_elements(By.CSS_SELECTOR, "input[name*='trim'], input[name*='transmission'], input[name*='year'], input[name*='mileage'], input[name*='engine'], input[name*='fuel'], input[name*='model'], input[name*='brand']")
-                                if vehicle_fields:
-                                    print(f"✅ Found {len(vehicle_fields)} vehicle-specific fields")
-                                    # Fill in vehicle details
-                                    for field in vehicle_fields:
-                                        field_name = field.get_attribute('name', '').lower()
-                                        if 'year' in field_name:
-                                            field.clear()
-                                            field.send_keys('2020')
-                                            print("✅ Filled year: 2020")
-                                        elif 'mileage' in field_name or 'kilometers' in field_name:
-                                            field.clear()
-                                            field.send_keys('50000')
-                                            print("✅ Filled mileage: 50000")
-                                        elif 'fuel' in field_name:
-                                            field.clear()
-                                            field.send_keys('Petrol')
-                                            print("✅ Filled fuel type: Petrol")
-                                        elif 'model' in field_name:
-                                            field.clear()
-                                            field.send_keys('Sedan')
-                                            print("✅ Filled model: Sedan")
-                                        elif 'brand' in field_name:
-                                            field.clear()
-                                            field.send_keys('Toyota')
-                                            print("✅ Filled brand: Toyota")
-                                        elif 'trim' in field_name or 'edition' in field_name:
-                                            field.clear()
-                                            field.send_keys('Standard')
-                                            print("✅ Filled trim/edition: Standard")
-                                        elif 'transmission' in field_name:
-                                            field.clear()
-                                            field.send_keys('Automatic')
-                                            print("✅ Filled transmission: Automatic")
-                                else:
-                                    print("⚠️  No vehicle-specific fields found")
-                            except Exception as e:
-                                print(f"⚠️  Error handling vehicle fields: {e}")
-                        else:
-                            print("⚠️  No third category found - vehicle fields may not appear")
-                    
-                    except Exception as e:
-                        print(f"⚠️  Error handling third category: {e}")
+            category_ids = self._category_schema().resolve_category_path(CATEGORY_PATH)
+        except Exception as e:
+            logger.warning("⚠️  Could not resolve category schema (%s), using recorded IDs", e)
+            category_ids = list(DEFAULT_CATEGORY_IDS)
+        
+        try:
+            wait = WebDriverWait(self.driver, 15)
+            for level, category_id in enumerate(category_ids):
+                if level == 0:
+                    select_elem = self.driver.find_element(By.ID, "category")
                 else:
-                    print("⚠️  No subcategory select element found")
+                    # Each pick loads the next level into jomcl_category_<parent>_1;
+                    # wait for exactly that instead of sleeping
+                    container_id = f"jomcl_category_{category_ids[level - 1]}_1"
+                    select_elem = wait.until(EC.presence_of_element_located(
+                        (By.CSS_SELECTOR, f"#{container_id} select")))
+                    wait.until(lambda driver: select_elem.find_elements(
+                        By.CSS_SELECTOR, f"option[value='{category_id}']"))
                 
-            except Exception as e:
-                print(f"⚠️  Subcategory selection issue: {e}")
-                print("Continuing with main category only...")
+                Select(select_elem).select_by_value(category_id)
+                logger.info("✅ Selected category level %s: %s", level + 1, category_id)
+            
+            # The leaf category loads its extra (vehicle) fields
+            logger.info("🚗 Waiting for vehicle-specific fields to appear...")
+            try:
+                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#jcsextrafields_0 [name^='exf_']")))
+                logger.info("✅ Vehicle-specific fields loaded")
+            except Exception:
+                logger.warning("⚠️  No vehicle-specific fields found")
             
-            print("✅ Category selection process completed")
+            logger.info("✅ Category selection process completed")
             return True
             
         except Exception as e:
-            print(f"❌ Error during category selection: {e}")
+            logger.error("❌ Error during category selection: %s", e)
             return False
 
+    @timed('fill_form')
     def fill_all_form_details(self):
         """Fill in all form details after category selection"""
-        print("✏️  Filling all form details...")
+        logger.info("✏️  Filling all form details...")
         
         try:
             # Take snapshot before filling details
@@ -485,14 +299,14 @@ class WorkingSeleniumAdPoster:
             title_field = self.driver.find_element(By.NAME, "title")
             title_field.clear()
             title_field.send_keys(self.ad_details.get('title', ''))
-            print("✅ Filled title")
+            logger.debug("✅ Filled title")
             
             # Fill price
             price_field = self.driver.find_element(By.NAME, "price")
             price_field.clear()
             price_str = self.ad_details.get('price', '0').replace('Tk ', '').replace(',', '')
             price_field.send_keys(price_str)
-            print("✅ Filled price")
+            logger.debug("✅ Filled price")
             
             # Fill description - handle TinyMCE editor
             try:
@@ -500,7 +314,7 @@ class WorkingSeleniumAdPoster:
                 desc_textarea = self.driver.find_element(By.NAME, "description")
                 desc_textarea.clear()
                 desc_textarea.send_keys(self.ad_details.get('description', ''))
-                print("✅ Filled description")
+                logger.debug("✅ Filled description")
             except Exception as e:
                 # Fallback: use JavaScript to fill TinyMCE editor
                 description_script = """
@@ -512,26 +326,39 @@ class WorkingSeleniumAdPoster:
                     }
                 """
                 self.driver.execute_script(description_script, self.ad_details.get('description', ''))
-                print("✅ Filled description via JavaScript")
+                logger.debug("✅ Filled description via JavaScript")
+            
+            # Place the ad where the car is, if its location is in the gazetteer
+            location = location_fields(self.ad_details.get('location'))
             
             # Fill address
             address_field = self.driver.find_element(By.NAME, "address")
             address_field.clear()
-            address_field.send_keys("village-kandraji,post-korlakatta,sirsi,uttara kannada ,karnataka\n581318")
-            print("✅ Filled address")
+            address_field.send_keys(location.get('address', DEFAULT_ADDRESS))
+            logger.debug("✅ Filled address")
             
             # Select location
+            location_id = location.get('location_ids', DEFAULT_LOCATION_IDS)[0]
             location_select = Select(self.driver.find_element(By.NAME, "location[]"))
-            location_select.select_by_value("33")  # Bangladesh
-            print("✅ Selected location: Bangladesh")
+            location_select.select_by_value(location_id)
+            logger.info("✅ Selected location: %s", location_select.first_selected_option.text)
+            
+            # Coordinates go in hidden inputs the map widget normally fills
+            if location:
+                self.driver.execute_script(
+                    "var f = arguments[0].form;"
+                    "if (f.latitude) f.latitude.value = arguments[1];"
+                    "if (f.langtitude) f.langtitude.value = arguments[2];",
+                    address_field, location['latitude'], location['longitude'])
+                logger.debug("✅ Set coordinates %s, %s", location['latitude'], location['longitude'])
             
             # Select tag
             tag_select = Select(self.driver.find_element(By.NAME, "tagid"))
             tag_select.select_by_value("1")  # Sale
-            print("✅ Selected tag: Sale")
+            logger.info("✅ Selected tag: Sale")
             
             # Now look for vehicle-specific fields that should appear after category selection
-            print("🚗 Looking for vehicle-specific fields...")
+            logger.info("🚗 Looking for vehicle-specific fields...")
             time.sleep(3)
             
             # Take snapshot to see what fields appeared
@@ -569,57 +396,57 @@ class WorkingSeleniumAdPoster:
                             if field_name == 'exf_8':  # Trim / Edition
                                 field.clear()
                                 field.send_keys(self.ad_details.get('trim', 'Standard'))
-                                print(f"✅ Filled Trim/Edition: {self.ad_details.get('trim', 'Standard')}")
+                                logger.debug("✅ Filled Trim/Edition: %s", self.ad_details.get('trim', 'Standard'))
                                 vehicle_fields_filled += 1
                             elif field_name == 'exf_9':  # Transmission
                                 field.clear()
                                 field.send_keys(self.ad_details.get('transmission', 'Automatic'))
-                                print(f"✅ Filled Transmission: {self.ad_details.get('transmission', 'Automatic')}")
+                                logger.debug("✅ Filled Transmission: %s", self.ad_details.get('transmission', 'Automatic'))
                                 vehicle_fields_filled += 1
                             elif field_name == 'exf_10':  # Registration year
                                 field.clear()
                                 field.send_keys(self.ad_details.get('registration_year', '2020'))
-                                print(f"✅ Filled Registration year: {self.ad_details.get('registration_year', '2020')}")
+                                logger.debug("✅ Filled Registration year: %s", self.ad_details.get('registration_year', '2020'))
                                 vehicle_fields_filled += 1
                             elif field_name == 'exf_11':  # Fuel type
                                 field.clear()
                                 field.send_keys(self.ad_details.get('fuel_type', 'Petrol'))
-                                print(f"✅ Filled Fuel type: {self.ad_details.get('fuel_type', 'Petrol')}")
+                                logger.debug("✅ Filled Fuel type: %s", self.ad_details.get('fuel_type', 'Petrol'))
                                 vehicle_fields_filled += 1
                             elif field_name == 'exf_12':  # Kilometers run
                                 field.clear()
                                 field.send_keys(self.ad_details.get('kilometers_driven', '50000'))
-                                print(f"✅ Filled Kilometers run: {self.ad_details.get('kilometers_driven', '50000')}")
+                                logger.debug("✅ Filled Kilometers run: %s", self.ad_details.get('kilometers_driven', '50000'))
                                 vehicle_fields_filled += 1
                             elif field_name == 'exf_13':  # Model
                                 field.clear()
                                 field.send_keys(self.ad_details.get('model', 'Sedan'))
-                                print(f"✅ Filled Model: {self.ad_details.get('model', 'Sedan')}")
+                                logger.debug("✅ Filled Model: %s", self.ad_details.get('model', 'Sedan'))
                                 vehicle_fields_filled += 1
                             elif field_name == 'exf_14':  # Year of Manufacture
                                 field.clear()
                                 field.send_keys(self.ad_details.get('year_of_production', '2005'))
-                                print(f"✅ Filled Year of Manufacture: {self.ad_details.get('year_of_production', '2005')}")
+                                logger.debug("✅ Filled Year of Manufacture: %s", self.ad_details.get('year_of_production', '2005'))
                                 vehicle_fields_filled += 1
                             elif field_name == 'exf_15':  # Condition
                                 field.clear()
                                 field.send_keys(self.ad_details.get('condition', 'Good'))
-                                print(f"✅ Filled Condition: {self.ad_details.get('condition', 'Good')}")
+                                logger.debug("✅ Filled Condition: %s", self.ad_details.get('condition', 'Good'))
                                 vehicle_fields_filled += 1
                             elif field_name == 'exf_16':  # Body type
                                 field.clear()
                                 field.send_keys(self.ad_details.get('body_type', 'Sedan'))
-                                print(f"✅ Filled Body type: {self.ad_details.get('body_type', 'Sedan')}")
+                                logger.debug("✅ Filled Body type: %s", self.ad_details.get('body_type', 'Sedan'))
                                 vehicle_fields_filled += 1
                             elif field_name == 'exf_17':  # Price Final Status
                                 field.clear()
                                 field.send_keys('Negotiable')
-                                print("✅ Filled Price Final Status: Negotiable")
+                                logger.debug("✅ Filled Price Final Status: Negotiable")
                                 vehicle_fields_filled += 1
                             elif field_name == 'exf_18':  # Engine capacity
                                 field.clear()
                                 field.send_keys(self.ad_details.get('engine_capacity', '1.5L'))
-                                print(f"✅ Filled Engine capacity: {self.ad_details.get('engine_capacity', '1.5L')}")
+                                logger.debug("✅ Filled Engine capacity: %s", self.ad_details.get('engine_capacity', '1.5L'))
                                 vehicle_fields_filled += 1
                             elif field_name == 'exf_19':  # Posted on
                                 field.clear()
@@ -627,12 +454,12 @@ class WorkingSeleniumAdPoster:
                                 if isinstance(posted_date, str) and 'T' in posted_date:
                                     posted_date = posted_date.split('T')[0]
                                 field.send_keys(posted_date)
-                                print(f"✅ Filled Posted on: {posted_date}")
+                                logger.debug("✅ Filled Posted on: %s", posted_date)
                                 vehicle_fields_filled += 1
                             elif field_name == 'exf_20':  # Sellers Name
                                 field.clear()
                                 field.send_keys(self.ad_details.get('seller_name', 'Car Seller'))
-                                print(f"✅ Filled Sellers Name: {self.ad_details.get('seller_name', 'Car Seller')}")
+                                logger.debug("✅ Filled Sellers Name: %s", self.ad_details.get('seller_name', 'Car Seller'))
                                 vehicle_fields_filled += 1
                             elif field_name == 'exf_21':  # Contact Numbers (textarea)
                                 field.clear()
@@ -642,17 +469,17 @@ class WorkingSeleniumAdPoster:
                                 else:
                                     contact_str = '+880 1234567890'
                                 field.send_keys(contact_str)
-                                print(f"✅ Filled Contact Numbers: {contact_str}")
+                                logger.debug("✅ Filled Contact Numbers: %s", contact_str)
                                 vehicle_fields_filled += 1
                             elif field_name == 'exf_22':  # Source Link
                                 field.clear()
                                 field.send_keys(self.ad_details.get('url', 'https://example.com'))
-                                print(f"✅ Filled Source Link: {self.ad_details.get('url', 'https://example.com')}")
+                                logger.debug("✅ Filled Source Link: %s", self.ad_details.get('url', 'https://example.com'))
                                 vehicle_fields_filled += 1
                             elif field_name == 'exf_23':  # Year of Production
                                 field.clear()
                                 field.send_keys(self.ad_details.get('year_of_production', '2005'))
-                                print(f"✅ Filled Year of Production: {self.ad_details.get('year_of_production', '2005')}")
+                                logger.debug("✅ Filled Year of Production: %s", self.ad_details.get('year_of_production', '2005'))
                                 vehicle_fields_filled += 1
                             elif field_name == 'exf_24':  # Version
                                 field.clear()
@@ -660,19 +487,19 @@ class WorkingSeleniumAdPoster:
                                 if version is None:
                                     version = 'F'
                                 field.send_keys(version)
-                                print(f"✅ Filled Version: {version}")
+                                logger.debug("✅ Filled Version: %s", version)
                                 vehicle_fields_filled += 1
                     except Exception as e:
-                        print(f"⚠️  Error filling field {field_name}: {e}")
+                        logger.warning("⚠️  Error filling field %s: %s", field_name, e)
                         continue
                 
                 if vehicle_fields_filled > 0:
-                    print(f"✅ Successfully filled {vehicle_fields_filled} vehicle-specific fields")
+                    logger.info("✅ Successfully filled %s vehicle-specific fields", vehicle_fields_filled)
                 else:
-                    print("⚠️  No vehicle-specific fields were filled")
+                    logger.warning("⚠️  No vehicle-specific fields were filled")
                     
             except Exception as e:
-                print(f"⚠️  Error handling vehicle fields: {e}")
+                logger.warning("⚠️  Error handling vehicle fields: %s", e)
             
             # Take snapshot after filling all details
     
@@ -680,12 +507,13 @@ class WorkingSeleniumAdPoster:
             return True
             
         except Exception as e:
-            print(f"❌ Error filling form details: {e}")
+            logger.error("❌ Error filling form details: %s", e)
             return False
     
+    @timed('upload')
     def upload_images(self):
         """Upload images to the form"""
-        print("🖼️  Uploading images...")
+        logger.info("🖼️  Uploading images...")
         
         try:
             # Take snapshot before image upload
@@ -695,48 +523,47 @@ class WorkingSeleniumAdPoster:
             file_inputs = self.driver.find_elements(By.CSS_SELECTOR, "input[type='file']")
             
             if not file_inputs:
-                print("⚠️  No file upload inputs found")
+                logger.warning("⚠️  No file upload inputs found")
                 return False
             
             file_input = file_inputs[0]
-            print(f"📁 Found file input: {file_input.get_attribute('name')}")
+            logger.info("📁 Found file input: %s", file_input.get_attribute('name'))
             
-            # Download and upload images
+            # Fetch (through the local cache) and resize images up front
             if self.ad_details.get('images'):
-                for i, image_info in enumerate(self.ad_details['images']):
-                    image_url = image_info['src']
-                    print(f"📥 Processing image {i+1}: {image_url}")
+                image_urls = [image_info['src'] for image_info in self.ad_details['images']]
+                prepared_images = self.image_preprocessor.prepare_many(image_urls)
+                uploaded_digests = set()
+                for i, prepared in enumerate(prepared_images):
+                    logger.info("📥 Processing image %s: %s", i+1, prepared['url'])
                     
-                    # Download image
-                    response = requests.get(image_url)
-                    if response.status_code == 200:
-                        # Save as temporary file
-                        temp_image_path = f"temp_image_{i}.jpg"
-                        with open(temp_image_path, 'wb') as f:
-                            f.write(response.content)
-                        
-                        # Refresh file input element to avoid stale reference
-                        try:
-                            # Find fresh file input element
-                            fresh_file_inputs = self.driver.find_elements(By.CSS_SELECTOR, "input[type='file']")
-                            if fresh_file_inputs:
-                                fresh_file_input = fresh_file_inputs[0]
-                                
-                                # Upload image
-                                fresh_file_input.send_keys(os.path.abspath(temp_image_path))
-                                print(f"✅ Image {i+1} uploaded")
-                                
-                                # Wait for upload to process
-                                time.sleep(3)
-                            else:
-                                print(f"⚠️  No file input found for image {i+1}")
-                        except Exception as e:
-                            print(f"⚠️  Error uploading image {i+1}: {e}")
-                        
-                        # Clean up temp file
-                        os.remove(temp_image_path)
-                    else:
-                        print(f"❌ Failed to download image {i+1}")
+                    if prepared['error']:
+                        logger.error("❌ Failed to prepare image %s: %s", i+1, prepared['error'])
+                        continue
+                    
+                    digest, image_path = prepared['digest'], prepared['path']
+                    if digest in uploaded_digests:
+                        logger.info("⏭️  Image %s is a duplicate, skipping", i+1)
+                        continue
+                    
+                    # Refresh file input element to avoid stale reference
+                    try:
+                        # Find fresh file input element
+                        fresh_file_inputs = self.driver.find_elements(By.CSS_SELECTOR, "input[type='file']")
+                        if fresh_file_inputs:
+                            fresh_file_input = fresh_file_inputs[0]
+                            
+                            # Upload image
+                            fresh_file_input.send_keys(os.path.abspath(image_path))
+                            uploaded_digests.add(digest)
+                            logger.info("✅ Image %s uploaded", i+1)
+                            
+                            # Wait for upload to process
+                            time.sleep(3)
+                        else:
+                            logger.warning("⚠️  No file input found for image %s", i+1)
+                    except Exception as e:
+                        logger.warning("⚠️  Error uploading image %s: %s", i+1, e)
             
             # Take snapshot after image upload
     
@@ -744,12 +571,12 @@ class WorkingSeleniumAdPoster:
             return True
             
         except Exception as e:
-            print(f"❌ Error uploading images: {e}")
+            logger.error("❌ Error uploading images: %s", e)
             return False
 
     def agree_to_terms(self):
         """Agree to terms and conditions"""
-        print("📋 Looking for terms and conditions checkbox...")
+        logger.info("📋 Looking for terms and conditions checkbox...")
         
         try:
             # Take snapshot before agreeing to terms
@@ -761,7 +588,7 @@ class WorkingSeleniumAdPoster:
             # Strategy 1: Look for privacy checkbox by name
             try:
                 privacy_checkbox = self.driver.find_element(By.NAME, "privacy[]")
-                print("✅ Found privacy checkbox by name")
+                logger.info("✅ Found privacy checkbox by name")
             except:
                 pass
             
@@ -769,7 +596,7 @@ class WorkingSeleniumAdPoster:
             if not privacy_checkbox:
                 try:
                     privacy_checkbox = self.driver.find_element(By.ID, "privacy")
-                    print("✅ Found privacy checkbox by ID")
+                    logger.info("✅ Found privacy checkbox by ID")
                 except:
                     pass
             
@@ -784,7 +611,7 @@ class WorkingSeleniumAdPoster:
                             parent_text = parent.text.lower()
                             if "privacy" in parent_text or "terms" in parent_text or "agree" in parent_text:
                                 privacy_checkbox = checkbox
-                                print("✅ Found privacy checkbox by nearby text")
+                                logger.info("✅ Found privacy checkbox by nearby text")
                                 break
                         except:
                             continue
@@ -800,79 +627,99 @@ class WorkingSeleniumAdPoster:
                     
                     # Click the checkbox
                     privacy_checkbox.click()
-                    print("✅ Agreed to terms and conditions")
+                    logger.info("✅ Agreed to terms and conditions")
                 else:
-                    print("✅ Terms and conditions already agreed to")
+                    logger.info("✅ Terms and conditions already agreed to")
                 
                 # Take snapshot after agreeing to terms
         
                 return True
             else:
-                print("⚠️  No terms and conditions checkbox found - continuing anyway")
+                logger.warning("⚠️  No terms and conditions checkbox found - continuing anyway")
                 return True
                 
         except Exception as e:
-            print(f"⚠️  Error agreeing to terms: {e}")
-            print("Continuing anyway...")
+            logger.warning("⚠️  Error agreeing to terms: %s", e)
+            logger.info("Continuing anyway...")
             return True
 
+    def find_listed_ad(self, navigate=True):
+        """
+        (site ad ID, URL) of this ad on the user's ads listing, or None.
+        The current page is checked first (the save redirects to the
+        listing); the listing is only loaded if the ad is not on it.
+        """
+        entry = self.ledger.get(content_hash(self.ad_details))
+        claimed = self.ledger.site_ad_ids()
+        
+        index = MyAdsIndex(session=None)
+        index.absorb(self.driver.page_source)
+        match = find_entry_ad(index, entry, exclude=claimed)
+        if match or not navigate or not (entry and entry.get('upload_id')):
+            return match
+        
+        self.driver.get(MY_ADS_URL)
+        WebDriverWait(self.driver, 15).until(
+            lambda driver: driver.execute_script("return document.readyState") == "complete")
+        
+        # Check if we're still logged in
+        if "login" in self.driver.current_url.lower():
+            logger.error("❌ Not logged in - cannot look up ad")
+            return None
+        
+        index.absorb(self.driver.page_source)
+        return find_entry_ad(index, entry, exclude=claimed)
+    
+    @timed('verify')
     def verify_ad_posted(self):
         """Verify that the ad was posted successfully by checking user's ads page"""
-        print("🔍 Verifying ad was posted successfully...")
+        logger.info("🔍 Verifying ad was posted successfully...")
         
         try:
-            # Navigate to user's ads page
-            self.driver.get("https://november2024version01.dicewebfreelancers.com/index.php/my-ads/user")
-            time.sleep(5)
-            
-            # Take snapshot of user's ads page
-    
-            
-            # Check if we're still logged in
-            if "login" in self.driver.current_url.lower():
-                print("❌ Not logged in - cannot verify ad")
-                return False
-            
-            # Look for the newly posted ad
-            page_source = self.driver.page_source
             ad_title = self.ad_details.get('title', '')
-            
-            if ad_title and ad_title.lower() in page_source.lower():
-                print(f"✅ SUCCESS: Ad '{ad_title}' found on user's ads page!")
+            match = self.find_listed_ad()
+            if match:
+                site_ad_id, url = match
+                self.ledger.update(content_hash(self.ad_details), VERIFIED, site_ad_id)
+                logger.info("✅ SUCCESS: Ad '%s' found on user's ads page as ad %s!", ad_title, site_ad_id)
                 return True
-            else:
-                print(f"⚠️  Ad title '{ad_title}' not found on user's ads page")
-                print("This could mean the ad wasn't posted or there's a delay")
-                
-                # Let's also check for any recent ads
-                try:
-                    # Look for any ad elements on the page
-                    ad_elements = self.driver.find_elements(By.CSS_SELECTOR, "[class*='ad'], [class*='listing'], [class*='item']")
-                    if ad_elements:
-                        print(f"📋 Found {len(ad_elements)} ad elements on the page")
-                        # Check the first few for recent content
-                        for i, ad in enumerate(ad_elements[:3]):
-                            try:
-                                ad_text = ad.text[:100]  # First 100 characters
-                                print(f"   Ad {i+1}: {ad_text}...")
-                            except:
-                                pass
-                    else:
-                        print("📋 No ad elements found on the page")
-                except Exception as e:
-                    print(f"⚠️  Error checking page content: {e}")
-                
-                return False
+            
+            logger.warning("⚠️  Ad title '%s' not found on user's ads page", ad_title)
+            logger.info("This could mean the ad wasn't posted or there's a delay")
+            return False
                 
         except Exception as e:
-            print(f"❌ Error verifying ad: {e}")
+            logger.error("❌ Error verifying ad: %s", e)
             return False
 
+    def form_ad_id(self):
+        """The ad ID the site issued in the open post-ad form, or None"""
+        try:
+            return self.driver.find_element(By.NAME, "id").get_attribute("value") or None
+        except Exception as e:
+            logger.warning("⚠️  Could not read the form's ad ID: %s", e)
+            return None
 
-    
+    def already_posted(self):
+        """
+        True if the ledger shows this ad is on the site, or an earlier
+        attempt whose outcome is unknown turns out to have saved it
+        """
+        digest = content_hash(self.ad_details)
+        if self.ledger.is_posted(digest):
+            return True
+        entry = self.ledger.get(digest)
+        if entry and entry['status'] == PENDING:
+            match = self.find_listed_ad()
+            if match:
+                self.ledger.update(digest, VERIFIED, match[0])
+                return True
+        return False
+
+    @timed('save')
     def submit_form(self):
         """Submit the form"""
-        print("🚀 Submitting form...")
+        logger.info("🚀 Submitting form...")
         
         try:
             # Take snapshot before submission
@@ -884,7 +731,7 @@ class WorkingSeleniumAdPoster:
             # Strategy 1: Look specifically for the "Post Ad" button (avoid logout button)
             try:
                 submit_button = self.driver.find_element(By.CSS_SELECTOR, "button[type='submit'][onclick*='valJomclAddForm']")
-                print("✅ Found Post Ad button by specific selector")
+                logger.info("✅ Found Post Ad button by specific selector")
             except:
                 pass
             
@@ -896,7 +743,7 @@ class WorkingSeleniumAdPoster:
                         element_text = element.text.lower()
                         if 'post ad' in element_text or 'post' in element_text:
                             submit_button = element
-                            print(f"✅ Found Post Ad button by text: {element.text}")
+                            logger.info("✅ Found Post Ad button by text: %s", element.text)
                             break
                 except:
                     pass
@@ -905,7 +752,7 @@ class WorkingSeleniumAdPoster:
             if not submit_button:
                 try:
                     submit_button = self.driver.find_element(By.CSS_SELECTOR, "button.btn-success[type='submit']")
-                    print("✅ Found Post Ad button by btn-success class")
+                    logger.info("✅ Found Post Ad button by btn-success class")
                 except:
                     pass
             
@@ -920,7 +767,7 @@ class WorkingSeleniumAdPoster:
                         # Skip logout button
                         if 'log out' not in element_text and 'logout' not in element_value:
                             submit_button = element
-                            print(f"✅ Found submit button (excluding logout): {element.text}")
+                            logger.info("✅ Found submit button (excluding logout): %s", element.text)
                             break
                 except:
                     pass
@@ -935,10 +782,10 @@ class WorkingSeleniumAdPoster:
                 
                 # Click the submit button
                 submit_button.click()
-                print("✅ Form submitted")
+                logger.info("✅ Form submitted")
                 
                 # Wait for response - longer wait for form processing
-                print("⏳ Waiting for form submission response...")
+                logger.info("⏳ Waiting for form submission response...")
                 time.sleep(15)
                 
                 # Take snapshot after submission
@@ -949,53 +796,53 @@ class WorkingSeleniumAdPoster:
                 page_source = self.driver.page_source
                 page_title = self.driver.title
                 
-                print(f"📋 Current URL: {current_url}")
-                print(f"📋 Page Title: {page_title}")
+                logger.info("📋 Current URL: %s", current_url)
+                logger.info("📋 Page Title: %s", page_title)
                 
                 # Strategy 1: Check URL changes
                 if "success" in current_url.lower() or "posted" in current_url.lower():
-                    print("🎉 SUCCESS: URL indicates success!")
+                    logger.info("🎉 SUCCESS: URL indicates success!")
                     return True
                 
                 # Strategy 2: Check page content
                 if "success" in page_source.lower() or "posted" in page_source.lower():
-                    print("🎉 SUCCESS: Page content indicates success!")
+                    logger.info("🎉 SUCCESS: Page content indicates success!")
                     return True
                 
                 # Strategy 3: Check for error messages
                 if "error" in page_source.lower() or "failed" in page_source.lower():
-                    print("❌ ERROR: Error message found in response")
+                    logger.error("❌ ERROR: Error message found in response")
                     return False
                 
                 # Strategy 4: Check if we're redirected to a different page
                 if "post-free-ad" not in current_url.lower():
-                    print("🔄 Form submitted - redirected to different page")
+                    logger.info("🔄 Form submitted - redirected to different page")
                     return True
                 
                 # Strategy 5: Check if form is still present (indicates submission failed)
                 try:
                     form_elements = self.driver.find_elements(By.CSS_SELECTOR, "input[type='submit'], button[type='submit']")
                     if form_elements:
-                        print("⚠️  Form still present - submission may have failed")
+                        logger.warning("⚠️  Form still present - submission may have failed")
                         return False
                     else:
-                        print("✅ Form elements not found - likely submitted successfully")
+                        logger.info("✅ Form elements not found - likely submitted successfully")
                         return True
                 except:
-                    print("✅ Could not verify form elements - assuming success")
+                    logger.info("✅ Could not verify form elements - assuming success")
                     return True
                 
             else:
-                print("❌ No submit button found - cannot submit form")
+                logger.error("❌ No submit button found - cannot submit form")
                 return False
             
         except Exception as e:
-            print(f"❌ Error submitting form: {e}")
+            logger.error("❌ Error submitting form: %s", e)
             return False
     
     def run_complete_posting_process(self):
         """Run the complete ad posting process"""
-        print("🚀 === Starting Complete Ad Posting Process ===")
+        logger.info("🚀 === Starting Complete Ad Posting Process ===")
         
         try:
             # Step 1: Setup driver
@@ -1003,78 +850,89 @@ class WorkingSeleniumAdPoster:
             
             # Step 2: Load ad details
             if not self.load_ad_details():
-                print("❌ Failed to load ad details. Exiting.")
+                logger.error("❌ Failed to load ad details. Exiting.")
                 return False
             
             # Step 3: Try to use saved session, otherwise login
             if not self.try_session_reuse():
-                print("❌ Session reuse failed. Exiting.")
+                logger.error("❌ Session reuse failed. Exiting.")
                 return False
             
+            # Never post the same ad twice, even when a run is retried
+            if self.already_posted():
+                logger.info("⏭️  '%s' is already on the site, nothing to post", self.ad_details.get('title'))
+                return True
+            
             # Step 4: Navigate to post ad page
             if not self.navigate_to_post_ad_page():
-                print("❌ Failed to navigate to post ad page. Exiting.")
+                logger.error("❌ Failed to navigate to post ad page. Exiting.")
                 return False
             
             # Step 5: Select all category levels FIRST
-            print("\n🏷️  === Starting Category Selection Process ===")
+            logger.info("🏷️  === Starting Category Selection Process ===")
             if not self.select_categories():
-                print("❌ Failed to select categories. Exiting.")
+                logger.error("❌ Failed to select categories. Exiting.")
                 return False
             
             # Step 6: Fill all form details after category selection
-            print("\n✏️  === Filling All Form Details ===")
+            logger.info("✏️  === Filling All Form Details ===")
             if not self.fill_all_form_details():
-                print("❌ Failed to fill form details. Exiting.")
+                logger.error("❌ Failed to fill form details. Exiting.")
                 return False
             
             # Step 7: Upload images
-            print("\n🖼️  === Uploading Images ===")
+            logger.info("🖼️  === Uploading Images ===")
             self.upload_images()
             
             # Step 8: Agree to terms and conditions
-            print("\n📋 === Agreeing to Terms and Conditions ===")
+            logger.info("📋 === Agreeing to Terms and Conditions ===")
             if not self.agree_to_terms():
-                print("❌ Failed to agree to terms. Exiting.")
+                logger.error("❌ Failed to agree to terms. Exiting.")
                 return False
             
-            # Step 7: Submit form
+            # Step 7: Submit form (recorded first so a crash mid-save is not posted twice)
+            digest = content_hash(self.ad_details)
+            self.ledger.begin(digest, self.ad_details, self.form_ad_id())
             if not self.submit_form():
-                print("❌ Form submission failed. Exiting.")
+                logger.error("❌ Form submission failed. Exiting.")
                 return False
+            self.ledger.update(digest, POSTED)
             
             # Step 8: Verify ad was posted successfully
-            print("\n🔍 === Verifying Ad Posting Success ===")
+            logger.info("🔍 === Verifying Ad Posting Success ===")
             if self.verify_ad_posted():
-                print("🎉 === Ad Posting Process Completed Successfully! ===")
-                print("✅ Ad was posted and verified on user's ads page")
+                logger.info("🎉 === Ad Posting Process Completed Successfully! ===")
+                logger.info("✅ Ad was posted and verified on user's ads page")
             else:
-                print("⚠️  === Ad Posting Process Completed with Verification Warning ===")
-                print("📋 Ad was submitted but verification is unclear - check manually")
+                logger.warning("⚠️  === Ad Posting Process Completed with Verification Warning ===")
+                logger.info("📋 Ad was submitted but verification is unclear - check manually")
             
-            print("📋 Check the browser for final result")
+            logger.info("📋 Check the browser for final result")
             
-            # Keep browser open for inspection
-            input("Press Enter to close the browser...")
+            # Keep a visible browser open for inspection
+            if not self.headless:
+                input("Press Enter to close the browser...")
             
             return True
             
         except Exception as e:
-            print(f"❌ Error during posting process: {e}")
+            logger.error("❌ Error during posting process: %s", e)
             return False
         finally:
             if self.driver:
-                self.driver.quit()
+                quit_driver(self.driver)
 
+@profiled('selenium_poster')
 def main():
     """Main function"""
+    setup_logging()
     poster = WorkingSeleniumAdPoster()
     success = poster.run_complete_posting_process()
     
     if success:
-        print("\n🎉 SUCCESS: Ad was posted successfully!")
+        logger.info("🎉 SUCCESS: Ad was posted successfully!")
     else:
-        print("\n❌ FAILED: Ad posting failed")
+        logger.error("❌ FAILED: Ad posting failed")
 
 if __name__ == "__main__":
     main()